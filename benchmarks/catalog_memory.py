@@ -0,0 +1,85 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Measure the memory taken by a large catalog tree.
+
+Builds a synthetic catalog of spaces, folders and datasets through ``create()``, from json listings decoded the same
+way rest responses are, and reports the memory held by the tree per node.
+
+    python benchmarks/catalog_memory.py --spaces 100 --folders 10 --datasets 100
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from dremio_client.model.data import create
+
+
+def _listing(space, folders, datasets):
+    folder_items = list()
+    for f in range(folders):
+        folder_path = ['space_{}'.format(space), 'folder_{}'.format(f)]
+        folder_items.append({
+            'id': 'folder-{}-{}'.format(space, f), 'path': folder_path, 'tag': '0', 'type': 'CONTAINER',
+            'containerType': 'FOLDER',
+            'children': [{'id': 'dataset-{}-{}-{}'.format(space, f, d), 'path': folder_path + ['dataset_{}'.format(d)],
+                          'tag': '0', 'type': 'DATASET', 'datasetType': 'VIRTUAL'} for d in range(datasets)]})
+    item = {'id': 'space-{}'.format(space), 'path': ['space_{}'.format(space)], 'tag': '0', 'type': 'CONTAINER',
+            'containerType': 'SPACE', 'children': folder_items}
+    return json.dumps(item)
+
+
+def _build(spaces, folders, datasets):
+    tree = dict()
+    for s in range(spaces):
+        # decode each listing separately, as every rest response is
+        name, node = create(json.loads(_listing(s, folders, datasets)), 'token', 'http://localhost:9047', print)
+        tree[name] = node
+    return tree
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--spaces', type=int, default=100)
+    parser.add_argument('--folders', type=int, default=10)
+    parser.add_argument('--datasets', type=int, default=100)
+    args = parser.parse_args()
+    nodes = args.spaces * (1 + args.folders * (1 + args.datasets))
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.time()
+    tree = _build(args.spaces, args.folders, args.datasets)
+    elapsed = time.time() - start
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('{} nodes built in {:.2f}s, {:.1f} MB held, {:.0f} bytes per node'.format(
+        nodes, elapsed, size / 1024.0 ** 2, size / float(nodes)))
+    return tree
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Measure column lookups in a large ColumnIndex.
+
+Indexes a synthetic catalog of datasets with columns drawn from a shared vocabulary and reports the build time and
+the average time of exact, prefix and fuzzy lookups.
+
+    python benchmarks/column_index.py --datasets 100000 --columns 20 --vocabulary 20000
+"""
+import argparse
+import random
+import time
+
+from dremio_client.model.columns import ColumnIndex
+
+_WORDS = ['customer', 'order', 'id', 'key', 'date', 'amount', 'name', 'city', 'country', 'status', 'created', 'updated',
+          'product', 'price', 'qty', 'total', 'code', 'type', 'region', 'account', 'event', 'session', 'user', 'time']
+_TYPES = ['BIGINT', 'VARCHAR', 'DOUBLE', 'TIMESTAMP', 'BOOLEAN', 'DATE']
+
+
+def _vocabulary(size, rnd):
+    names = set()
+    while len(names) < size:
+        names.add('_'.join(rnd.choice(_WORDS) for _ in range(rnd.randint(1, 3))) + str(rnd.randint(0, 99)))
+    return sorted(names)
+
+
+def _time(fn, queries):
+    start = time.time()
+    found = sum(len(fn(q)) for q in queries)
+    return (time.time() - start) * 1000.0 / len(queries), found / float(len(queries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--datasets', type=int, default=100000)
+    parser.add_argument('--columns', type=int, default=20)
+    parser.add_argument('--vocabulary', type=int, default=20000)
+    args = parser.parse_args()
+    rnd = random.Random(42)
+    vocabulary = _vocabulary(args.vocabulary, rnd)
+
+    index = ColumnIndex()
+    start = time.time()
+    for d in range(args.datasets):
+        index.add(('space_{}'.format(d % 100), 'dataset_{}'.format(d)),
+                  [{'name': name, 'type': {'name': rnd.choice(_TYPES)}}
+                   for name in rnd.sample(vocabulary, args.columns)])
+    print('{} datasets indexed in {:.2f}s'.format(len(index), time.time() - start))
+
+    queries = rnd.sample(vocabulary, 100)
+    for label, fn in (('exact', lambda q: index.find(q, 'BIGINT')),
+                      ('prefix', lambda q: index.find(q[:6], match='prefix', limit=1000)),
+                      ('fuzzy', lambda q: index.find(q[:-1] + 'x', match='fuzzy', limit=1000))):
+        per_query, found = _time(fn, queries)
+        print('{:6}: {:.2f} ms per lookup, {:.0f} matches on average'.format(label, per_query, found))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Compare rest request rate with and without the pooled keep-alive session.
+
+Starts a stub Dremio catalog endpoint on localhost and calls ``catalog_item`` against it, first opening a new
+connection per call (the old behaviour) and then through the shared pooled session.
+
+    python benchmarks/http_session.py --requests 2000 --threads 4
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import requests
+
+from dremio_client.model.endpoints import catalog_item
+from dremio_client.session import make_session, set_session
+
+_BODY = json.dumps({'entityType': 'folder', 'id': 'abc', 'path': ['space', 'folder'], 'tag': '0',
+                    'children': []}).encode('utf-8')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(_BODY)))
+        self.end_headers()
+        self.wfile.write(_BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _NoPoolSession(object):
+    """issue each request through the module level requests functions, ie a new connection per call"""
+
+    def get(self, url, **kwargs):
+        return requests.get(url, **kwargs)
+
+
+def _rate(n, threads, base_url):
+    start = time.time()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(lambda i: catalog_item('token', base_url, 'abc'), range(n)))
+    return n / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    server = _Server(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+
+    set_session(_NoPoolSession())
+    before = _rate(args.requests, args.threads, base_url)
+    set_session(make_session(pool_maxsize=args.threads))
+    after = _rate(args.requests, args.threads, base_url)
+    server.shutdown()
+
+    print('new connection per request: {:8.1f} req/s'.format(before))
+    print('pooled keep-alive session:  {:8.1f} req/s'.format(after))
+    print('speedup:                    {:8.2f}x'.format(after / before))
+
+
+if __name__ == '__main__':
+    main()
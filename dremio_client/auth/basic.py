@@ -21,7 +21,7 @@
 # specific language governing permissions and limitations
 # under the License.
 #
-import requests
+from ..session import get_session
 
 
 def login(base_url, username, password, timeout=10, verify=True):
@@ -36,7 +36,7 @@ def login(base_url, username, password, timeout=10, verify=True):
     """
     url = base_url + '/apiv2/login'
 
-    r = requests.post(
+    r = get_session().post(
         url,
         json={
             "userName": username,
@@ -29,8 +29,13 @@ import os
 import click
 import simplejson as json
 
-from .conf import get_base_url_token
+from .conf import get_base_url, get_base_url_token, build_config
 from .util.query import run
+from .util.convert import RestStream
+from .util.export import export as _export
+from .util.search import SearchIndex, search_index_path
+from .model.data import Root
+from .flight import stream as _flight_stream, UNAVAILABLE_ERRORS as FLIGHT_UNAVAILABLE_ERRORS
 from .error import DremioNotFoundException
 from .model.endpoints import sql as _sql
 from .model.endpoints import job_status as _job_status
@@ -99,6 +104,84 @@ def query(args, sql):
     click.echo(json.dumps(results))
 
 
+@cli.command()
+@click.option('--sql', help='sql query to execute.', required=True)
+@click.option('-o', '--output', help='file to write results to.', required=True,
+              type=click.Path(dir_okay=False, writable=True))
+@click.option('-f', '--format', 'file_format', type=click.Choice(['parquet', 'arrow']), default='parquet',
+              help='output file format')
+@click.option('-c', '--compression', default='default',
+              help="compression codec, 'none' or 'default' (snappy for parquet, uncompressed for arrow)")
+@click.option('--row-group-size', type=int, default=64 * 1024, help='rows per parquet row group')
+@click.pass_obj
+def export(args, sql, output, file_format, compression, row_group_size):
+    """
+    execute a query given by sql and stream the results to a parquet or arrow file
+
+    results are fetched over flight if available, otherwise over the rest api
+
+    """
+    with _export_stream(args, sql) as batches:
+        rows = _export(batches, output, file_format, row_group_size=row_group_size, compression=compression)
+    click.echo('wrote {} rows to {}'.format(rows, output))
+
+
+def _export_stream(args, sql):
+    config = build_config(args)
+    try:
+        return _flight_stream(sql, hostname=config['hostname'].get(), port=config['flight']['port'].get(int),
+                              username=config['auth']['username'].get(), password=config['auth']['password'].get(),
+                              tls=config['ssl'].get(bool),
+                              verify=args.get('ssl_verify', True) and config['verify'].get(bool))
+    except (NotImplementedError,) + FLIGHT_UNAVAILABLE_ERRORS as e:
+        click.echo('flight is unavailable ({}), reading the results over rest'.format(e), err=True)
+        base_url, token = get_base_url_token(args)
+        return RestStream(run(token, base_url, sql, ssl_verify=args.get('ssl_verify', True)))
+
+
+@cli.command()
+@click.argument('terms', nargs=-1, required=True)
+@click.option('-l', '--limit', type=int, default=20, help='number of results to return')
+@click.option('-i', '--index', 'index_path', type=click.Path(dir_okay=False), help='search index file')
+@click.pass_obj
+def search(args, terms, limit, index_path):
+    """
+    search catalog entity names, tags and wiki
+
+    uses the local search index only, see index-catalog. A term ending in * matches words starting with it
+
+    """
+    base_url, config = get_base_url(args)
+    index = SearchIndex(index_path or search_index_path(base_url, config['auth']['username'].get()))
+    if not len(index):
+        click.echo('search index is empty, run index-catalog first', err=True)
+    click.echo(json.dumps([hit._asdict() for hit in index.search(' '.join(terms), limit)]))
+
+
+@cli.command()
+@click.option('--full', is_flag=True, help='index every entity again, changed or not')
+@click.option('--max-workers', type=int, default=8, help='maximum number of concurrent requests')
+@click.option('-i', '--index', 'index_path', type=click.Path(dir_okay=False), help='search index file')
+@click.option('--sources', is_flag=True, help='index the folders and physical datasets of sources too')
+@click.pass_obj
+def index_catalog(args, full, max_workers, index_path, sources):
+    """
+    build or update the local search index of the catalog
+
+    only entities whose catalog tag, tags or wiki changed since the last update are indexed again, unless --full
+    is given. sources are only descended into with --sources, physical datasets are not searchable without it
+
+    """
+    base_url, token = get_base_url_token(args)
+    user = build_config(args)['auth']['username'].get()
+    index = SearchIndex(index_path or search_index_path(base_url, user))
+    diff = index.refresh(Root(token, base_url, None, ssl_verify=args.get('ssl_verify', True), user=user),
+                         max_workers, full, sources)
+    index.save()
+    click.echo('indexed {} entities: {} added, {} modified, {} removed'.format(
+        len(index), len(diff.added), len(diff.modified), len(diff.removed)))
+
+
 @cli.command()
 @click.argument('sql-query', nargs=-1, required=True)
 @click.option('--context', help='context in which the sql query should execute.')
@@ -23,7 +23,7 @@
 #
 
 from .config_parser import build_config  # NOQA
-from .cli_helper import get_base_url_token  # NOQA
+from .cli_helper import get_base_url, get_base_url_token  # NOQA
 from six import StringIO
 import yaml
 
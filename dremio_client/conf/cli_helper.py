@@ -25,11 +25,15 @@ from .config_parser import build_config
 from ..auth import auth
 
 
-def get_base_url_token(args=None):
+def get_base_url(args=None):
     config = build_config(args)
     ssl = 's' if config['ssl'].get(bool) else ''
     host = config['hostname'].get()
     port = ":" + str(config['port'].get(int))
-    base_url = 'http{}://{}{}'.format(ssl, host, port)
+    return 'http{}://{}{}'.format(ssl, host, port), config
+
+
+def get_base_url_token(args=None):
+    base_url, config = get_base_url(args)
     token = auth(base_url, config)
     return base_url, token
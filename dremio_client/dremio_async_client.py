@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import asyncio
+
+from .auth import auth
+from .session import pool_settings
+from .model import async_endpoints as endpoints
+from .util.query import _done_job_states
+from .util.polling import ExponentialBackoff
+from .error import DremioException
+
+
+class AsyncSimpleClient(object):
+
+    def __init__(self, config, max_concurrency=64):
+        """
+        Create an asyncio Dremio Simple Client instance. This mirrors SimpleClient but every method is a coroutine.
+
+        All calls share one pooled aiohttp session and at most ``max_concurrency`` requests are in flight at once.
+        The session is opened on first use and must be closed with ``close`` or by using the client as an async
+        context manager.
+
+        .. note:: requires Python 3.5+ and aiohttp
+
+        :param config: config dict from confuse
+        :param max_concurrency: maximum number of concurrent requests against Dremio
+        """
+        port = config['port'].get(int)
+        self._hostname = config['hostname'].get()
+        self._base_url = ('https' if config['ssl'].get(bool) else 'http') + '://' + self._hostname + (
+            ':{}'.format(port) if port else '')
+        self._pool_connections, self._pool_maxsize, _ = pool_settings(config)
+        self._token = auth(self._base_url, config)
+        self._ssl_verify = config['verify'].get(bool)
+        self._max_concurrency = max_concurrency
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+            self._semaphore = None
+
+    async def _call(self, endpoint, *args, **kwargs):
+        if self._session is None:
+            self._session = endpoints.make_session(self._pool_connections, self._pool_maxsize)
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        async with self._semaphore:
+            return await endpoint(self._token, self._base_url, *args, ssl_verify=self._ssl_verify,
+                                  session=self._session, **kwargs)
+
+    async def catalog(self):
+        return await self._call(endpoints.catalog)
+
+    async def job_status(self, jobid):
+        return await self._call(endpoints.job_status, jobid)
+
+    async def catalog_item(self, cid, path):
+        return await self._call(endpoints.catalog_item, cid, path)
+
+    async def job_results(self, jobid, offset=0, limit=100):
+        return await self._call(endpoints.job_results, jobid, offset, limit)
+
+    async def sql(self, query, context=None):
+        return await self._call(endpoints.sql, query, context)
+
+    async def reflections(self, summary=False):
+        return await self._call(endpoints.reflections, summary)
+
+    async def reflection(self, reflectionid):
+        return await self._call(endpoints.reflection, reflectionid)
+
+    async def wlm_queues(self):
+        """ return details all workload management queues
+
+        https://docs.dremio.com/rest-api/wlm/get-wlm-queue.html
+        .. note:: can only be run by admin
+        .. note:: Enterprise only
+
+        :return: queues as a list of dicts
+        """
+        return await self._call(endpoints.wlm_queues)
+
+    async def wlm_rules(self):
+        """ return details all workload management rules
+
+        https://docs.dremio.com/rest-api/wlm/get-wlm-rule.html
+        .. note:: can only be run by admin
+        .. note:: Enterprise only
+
+        :return: rules as a list of dicts
+        """
+        return await self._call(endpoints.wlm_rules)
+
+    async def votes(self):
+        """ return details all reflection votes
+
+        https://docs.dremio.com/rest-api/votes/get-vote.html
+        .. note:: can only be run by admin
+
+        :return: votes as a list of dicts
+        """
+        return await self._call(endpoints.votes)
+
+    async def user(self, uid=None, name=None):
+        """ return details for a user
+
+        User must supply one of uid or name. uid takes precedence if both are supplied
+        .. note:: can only be run by admin
+
+        :param uid: group id
+        :param name: group name
+        :return: user info as a dict
+        """
+        return await self._call(endpoints.user, uid, name)
+
+    async def group(self, gid=None, name=None):
+        """ return details for a group
+
+        User must supply one of gid or name. gid takes precedence if both are supplied
+        .. note:: can only be run by admin
+
+        :param gid: group id
+        :param name: group name
+        :return: group info as a dict
+        """
+        return await self._call(endpoints.group, gid, name)
+
+    async def personal_access_token(self, uid):
+        """ return a list of personal access tokens for a user
+
+        .. note:: can only be run for the logged in user
+
+        :param uid: user id
+        :return: personal access token list
+        """
+        return await self._call(endpoints.personal_access_token, uid)
+
+    async def collaboration_tag(self, cid):
+        """ returns a list of tags for catalog entity
+
+        :param cid: catalog entity id
+        :return: list of tags
+        """
+        return await self._call(endpoints.collaboration_tags, cid)
+
+    async def collaboration_wiki(self, cid):
+        """ returns a wiki details for catalog entity
+
+        :param cid: catalog entity id
+        :return: wiki details
+        """
+        return await self._call(endpoints.collaboration_wiki, cid)
+
+    async def query(self, query, context=None, sleep_time=10, polling=None):
+        """ Run a single sql query
+
+        Submits the query, waits for the job to finish and fetches all result pages concurrently
+
+        :param query: valid sql query
+        :param context: optional context in which to execute the query
+        :param sleep_time: maximum seconds to sleep between checking for finished state
+        :param polling: optional PollingStrategy, defaults to exponential backoff capped at sleep_time
+        :raise: DremioException if job failed
+        :raise: DremioUnauthorizedException if token is incorrect or invalid
+        :return: list of json result pages
+
+        :example:
+
+        >>> await client.query('select * from sys.options')
+        [{'rowCount': 2, 'rows': [{'record':'1'}, {'record':'2'}]}]
+        """
+        assert sleep_time > 0
+        job = await self.sql(query, context)
+        job_id = job['id']
+        polling = polling or ExponentialBackoff(max_sleep=sleep_time)
+        delays = polling.delays()
+        polls = 0
+        try:
+            while True:
+                state = await self.job_status(job_id)
+                polls += 1
+                if state['jobState'] == 'COMPLETED':
+                    row_count = state.get('rowCount', 0)
+                    break
+                if state['jobState'] in _done_job_states:
+                    raise DremioException("job failed " + str(state), None)
+                await asyncio.sleep(next(delays))
+        finally:
+            polling.record(job_id, polls)
+        return await asyncio.gather(*[self.job_results(job_id, offset, 500) for offset in range(0, row_count, 500)])
+
+    async def refresh_metadata(self, table):
+        """ Refresh the metadata for a given physical dataset
+
+        :param table: the physical dataset to be refreshed
+        :raise: DremioException if job failed
+        :return: list of json result pages
+        """
+        return await self.query("ALTER PDS {} REFRESH METADATA FORCE UPDATE".format(table), sleep_time=2)
+
+    async def update_catalog(self, cid, json):
+        """ update a catalog entity
+
+        https://docs.dremio.com/rest-api/catalog/put-catalog-id.html
+
+        :param cid: id of catalog entity
+        :param json: json document for new catalog entity
+        :return: updated catalog entity
+        """
+        return await self._call(endpoints.update_catalog, cid, json)
+
+    async def delete_catalog(self, cid, tag):
+        """ remove a catalog item from Dremio
+
+        https://docs.dremio.com/rest-api/catalog/delete-catalog-id.html
+
+        :param cid: id of a catalog entity
+        :param tag: version tag of entity
+        :return: None
+        """
+        return await self._call(endpoints.delete_catalog, cid, tag)
+
+    async def set_catalog(self, json):
+        """ add a new catalog entity
+
+        https://docs.dremio.com/rest-api/catalog/post-catalog.html
+
+        :param json: json document for new catalog entity
+        :return: new catalog entity
+        """
+        return await self._call(endpoints.set_catalog, json)
+
+    async def refresh_pds(self, pid):
+        """ refresh a physical dataset and all its child reflections
+
+        https://docs.dremio.com/rest-api/catalog/post-catalog-id-refresh.html
+
+        :param pid: id of a catalog entity
+        :return: None
+        """
+        return await self._call(endpoints.refresh_pds, pid)
+
+    async def set_personal_access_token(self, uid, label, lifetime=24):
+        """ create a pat for a given user
+
+        https://docs.dremio.com/rest-api/user/post-user-uid-token.html
+
+        :param uid: id user
+        :param label: label of token
+        :param lifetime: lifetime in hours of token
+        :return: updated catalog entity
+        """
+        return await self._call(endpoints.set_personal_access_token, uid, label, lifetime)
+
+    async def delete_personal_access_token(self, uid):
+        """ create a pat for a given user
+
+        https://docs.dremio.com/rest-api/user/delete-user-uid-token.html
+
+        :param uid: id user
+        :return: updated catalog entity
+        """
+        return await self._call(endpoints.delete_personal_access_token, uid)
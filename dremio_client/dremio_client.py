@@ -25,13 +25,22 @@
 
 """Main module."""
 import logging
+from confuse import NotFoundError
 
 from .auth import auth
+from .session import configure_session
 from .model.catalog import catalog
+from .model.store import configure_store
 from .model.endpoints import reflections, wlm_queues, wlm_rules, votes, user, group, personal_access_token
 from .model.data import make_reflection, make_wlm_queue, make_wlm_rule, make_vote
-from .flight import query as _flight_query
+from .flight import query as _flight_query, stream as _flight_stream, FlightClientPool, \
+    UNAVAILABLE_ERRORS as FLIGHT_UNAVAILABLE_ERRORS
 from .util import run as _rest_query
+from .util.convert import to_arrow as _rest_to_arrow, table_to_pandas as _table_to_pandas, RestStream
+from .util.export import export as _export
+from .util.cache import ResultCache, dataset_tag, dataset_tags, is_read_only, normalise_sql
+from .util.singleflight import SingleFlight
+from .util.search import SearchIndex, search_index_path
 from .odbc import query as _odbc_query
 from .dremio_simple_client import SimpleClient
 
@@ -49,14 +58,23 @@ class DremioClient(object):
         self._hostname = config['hostname'].get()
         self._base_url = ('https' if config['ssl'].get(bool) else 'http') + '://' + self._hostname + (
             ':{}'.format(port) if port else '')
+        configure_session(config)
         self._flight_port = config['flight']['port'].get(int)
+        self._flight_tls = config['ssl'].get(bool)
+        self._flight_pool_size = _get_pool_size(config)
+        self._flight_pool = None
+        self._cache_settings = _get_cache_settings(config)
+        self._result_cache = None
+        self._inflight = SingleFlight()
+        self._search_index = None
         self._odbc_port = config['odbc']['port'].get(int)
 
         self._username = config['auth']['username'].get()
         self._password = config['auth']['password'].get()
         self._token = auth(self._base_url, config)
         self._ssl_verify = config['verify'].get(bool)
-        self._catalog = catalog(self._token, self._base_url, self.query, self._ssl_verify)
+        configure_store(config)
+        self._catalog = catalog(self._token, self._base_url, self.query, self._ssl_verify, self._username)
         self._reflections = list()
         self._wlm_queues = list()
         self._wlm_rules = list()
@@ -66,6 +84,15 @@ class DremioClient(object):
     def simple(self):
         return self._simple
 
+    @property
+    def flight_pool(self):
+        """ pool of authenticated flight clients shared by all flight queries of this client """
+        if self._flight_pool is None:
+            self._flight_pool = FlightClientPool(self._hostname, self._flight_port, self._username, self._password,
+                                                 max_size=self._flight_pool_size, tls=self._flight_tls,
+                                                 verify=self._ssl_verify)
+        return self._flight_pool
+
     @property
     def data(self):
         return self._catalog
@@ -114,18 +141,61 @@ class DremioClient(object):
         for ref in refs['data']:  # todo I think we should attach reflections to their catalog entries...
             self._votes.append(make_vote(ref))
 
-    def query(self, sql, pandas=True, method='flight'):
+    @property
+    def result_cache(self):
+        """ on-disk result cache used by ``query(..., cache=True)``, configured from the ``cache`` config section """
+        if self._result_cache is None:
+            self._result_cache = ResultCache(**self._cache_settings)
+        return self._result_cache
+
+    def query(self, sql, pandas=True, method='flight', stream=False, low_memory=False, memory_pool=None,
+              cache=False):
+        """ run an sql query and return the results
+
+        Queries are run via flight by default, downgrading to odbc and then the rest api if those are unavailable.
+        Rest results are converted using the column types of the job schema
+
+        With ``stream`` the results are not collected but returned as an iterator over record batches (or dataframe
+        chunks) with the schema available up front. Streaming is supported over flight and rest; the stream should be
+        closed (or used as a context manager) if it is not read to the end.
+
+        Identical read only queries (SELECT, WITH or VALUES) run concurrently on this client are executed once and
+        the results shared. Each caller still receives its own dataframe. Statements which write (eg INSERT, CTAS,
+        DROP) are always executed once per call.
+
+        :param sql: sql query to execute on dremio
+        :param pandas: return a pandas dataframe (default) or an arrow table
+        :param method: one of flight, odbc or rest
+        :param stream: return a stream of results rather than a single dataframe or table
+        :param low_memory: (pandas) release arrow memory while converting to pandas and turn strings into
+                           categoricals, see util.convert.table_to_pandas
+        :param memory_pool: (pandas) arrow memory pool the dataframe is allocated from
+        :param cache: read and store the results in the result cache. Either True for this client's result_cache or
+                      a ResultCache. Ignored when streaming
+        :return: pandas dataframe, arrow table or a stream of either
+        """
+        if stream:
+            return self._stream(sql, pandas, method)
+        if is_read_only(sql):
+            key = (method, normalise_sql(sql), cache)
+            result, shared = self._inflight.do(key, lambda: self._query(sql, method, cache))
+        else:
+            result, shared = self._query(sql, method, cache), False
+        if not hasattr(result, 'to_pandas'):  # odbc results are already dataframes
+            return result.copy() if shared else result
+        if pandas:
+            return _table_to_pandas(result, low_memory and not shared, memory_pool)
+        return result
+
+    def _query(self, sql, method, cache):
+        if cache:
+            return self._cached_query(sql, method, self.result_cache if cache is True else cache)
         failed = False
         if method == 'flight':
             try:
-                return _flight_query(sql,
-                                     hostname=self._hostname,
-                                     port=self._flight_port,
-                                     username=self._username,
-                                     password=self._password,
-                                     pandas=pandas)
-            except NotImplementedError:
-                logging.warning("Unable to run query as flight, downgrading to odbc")
+                return self.flight_pool.run(lambda client: _flight_query(sql, client=client, pandas=False))
+            except (NotImplementedError,) + FLIGHT_UNAVAILABLE_ERRORS as e:
+                logging.warning("Unable to run query as flight (%s), downgrading to odbc", e)
                 failed = True
         if method == 'odbc' or failed:
             try:
@@ -136,10 +206,87 @@ class DremioClient(object):
                                    password=self._password)
             except NotImplementedError:
                 logging.warning("Unable to run query as odbc, downgrading to rest")
-        results = _rest_query(self._token, self._base_url, sql, ssl_verify=self._ssl_verify)
-        if pandas:
-            return pandas.DataFrame(results)
-        return results
+        return _rest_to_arrow(_rest_query(self._token, self._base_url, sql, ssl_verify=self._ssl_verify))
+
+    def _stream(self, sql, pandas, method):
+        if method == 'flight':
+            try:
+                return self._flight_stream(sql, pandas)
+            except (NotImplementedError,) + FLIGHT_UNAVAILABLE_ERRORS as e:
+                logging.warning("Unable to stream query as flight (%s), downgrading to rest", e)
+        return RestStream(_rest_query(self._token, self._base_url, sql, ssl_verify=self._ssl_verify), pandas)
+
+    def export(self, sql, path, file_format='parquet', row_group_size=64 * 1024, compression='default',
+               method='flight'):
+        """ run an sql query and write the results straight to a parquet or arrow ipc file
+
+        Results are streamed to the file as they arrive and never collected in memory
+
+        :param sql: sql query to execute on dremio
+        :param path: file path or writable file object
+        :param file_format: one of parquet or arrow
+        :param row_group_size: (parquet) number of rows per row group
+        :param compression: codec name (eg snappy, gzip, zstd, lz4), none or default (snappy for parquet,
+            uncompressed for arrow). For arrow only lz4 and zstd are valid
+        :param method: one of flight or rest
+        :return: number of rows written
+        """
+        with self.query(sql, pandas=False, method=method, stream=True) as batches:
+            return _export(batches, path, file_format, row_group_size=row_group_size, compression=compression)
+
+    def _cached_query(self, sql, method, cache):
+        key = cache.key(self._base_url, sql, user=self._username)
+        table = cache.get(key, lambda path: dataset_tag(self._token, self._base_url, path, self._ssl_verify))
+        if table is not None:
+            return table
+        datasets = dataset_tags(self._token, self._base_url, sql, self._ssl_verify)
+        return cache.put(key, self._query(sql, method, False), datasets)
+
+    def _flight_stream(self, sql, pandas):
+        pool = self.flight_pool
+        pooled = pool.acquire()
+        try:
+            # a stream closed early or failing may leave the client mid-call, it is not reused
+            return _flight_stream(sql, client=pooled.client, pandas=pandas, on_close=lambda: pool.release(pooled),
+                                  on_abort=lambda: pool.release(pooled, discard=True))
+        except BaseException:
+            pool.release(pooled, discard=True)
+            raise
+
+    @property
+    def search_index(self):
+        """ local search index of the catalog, loaded from its file on first use """
+        if self._search_index is None:
+            self._search_index = SearchIndex(search_index_path(self._base_url, self._username))
+        return self._search_index
+
+    def search(self, query, limit=20):
+        """
+        search catalog entity names, collaboration tags and wiki without contacting the server
+
+        The local search index is filled by refresh_search_index (or the index-catalog command)
+
+        :param query: search terms, a term ending in * matches words starting with it
+        :param limit: maximum number of results
+        :return: list of SearchHit, best first
+        """
+        return self.search_index.search(query, limit)
+
+    def refresh_search_index(self, full=False, max_workers=8, sources=False):
+        """
+        update the local search index from the server and save it
+
+        Only entities whose catalog tag, tags or wiki changed since the last refresh are indexed again. Sources are
+        only descended into with ``sources``, so physical datasets are not searchable without it
+
+        :param full: index every entity again, changed or not
+        :param max_workers: maximum number of concurrent requests
+        :param sources: index the folders and physical datasets of sources too
+        :return: changes.CatalogDiff since the last refresh
+        """
+        diff = self.search_index.refresh(self.data, max_workers, full, sources)
+        self.search_index.save()
+        return diff
 
     def user(self, uid=None, name=None):
         """ return details for a user
@@ -183,3 +330,21 @@ class DremioClient(object):
         :return: personal access token list
         """
         return personal_access_token(self._token, self._base_url, uid, ssl_verify=self._ssl_verify)
+
+
+def _get_pool_size(config):
+    try:
+        return config['flight']['pool']['size'].get(int)
+    except NotFoundError:
+        return 4
+
+
+def _get_cache_settings(config):
+    try:
+        cache = config['cache']
+        return {'path': cache['path'].get() or None,
+                'ttl': cache['ttl'].get(int),
+                'max_size': cache['maxsize'].get(int),
+                'compression': None if cache['compression'].get() in (None, 'none') else cache['compression'].get()}
+    except NotFoundError:
+        return dict()
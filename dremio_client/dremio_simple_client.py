@@ -23,6 +23,7 @@
 # under the License.
 #
 from .auth import auth
+from .session import configure_session
 from .model.endpoints import catalog, job_results, job_status, sql, catalog_item, reflections, reflection, wlm_queues, \
     wlm_rules, votes, user, group, personal_access_token, collaboration_tags, collaboration_wiki, update_catalog, \
     delete_catalog, set_catalog, refresh_pds, set_personal_access_token, delete_personal_access_token
@@ -43,6 +44,7 @@ class SimpleClient(object):
         self._hostname = config['hostname'].get()
         self._base_url = ('https' if config['ssl'].get(bool) else 'http') + '://' + self._hostname + (
             ':{}'.format(port) if port else '')
+        configure_session(config)
         self._token = auth(self._base_url, config)
         self._ssl_verify = config['verify'].get(bool)
 
@@ -177,15 +179,16 @@ class SimpleClient(object):
         """
         return collaboration_wiki(self._token, self._base_url, cid, ssl_verify=self._ssl_verify)
 
-    def query(self, query, context=None, sleep_time=10, asynchronous=False):
+    def query(self, query, context=None, sleep_time=10, asynchronous=False, polling=None):
         """ Run a single sql query asynchronously
 
         This executes a single sql query against the rest api asynchronously and returns a future for the result
 
         :param query: valid sql query
         :param context: optional context in which to execute the query
-        :param sleep_time: seconds to sleep between checking for finished state
+        :param sleep_time: maximum seconds to sleep between checking for finished state
         :param asynchronous: boolean execute asynchronously
+        :param polling: optional PollingStrategy, defaults to exponential backoff capped at sleep_time
         :raise: DremioException if job failed
         :raise: DremioUnauthorizedException if token is incorrect or invalid
         :return: concurrent.futures.Future for the result
@@ -198,8 +201,10 @@ class SimpleClient(object):
         [{'record':'1'}, {'record':'2'}]
         """
         if asynchronous:
-            return run_async(self._token, self._base_url, query, context, sleep_time, ssl_verify=self._ssl_verify)
-        return run(self._token, self._base_url, query, context, sleep_time, ssl_verify=self._ssl_verify)
+            return run_async(self._token, self._base_url, query, context, sleep_time, ssl_verify=self._ssl_verify,
+                             polling=polling)
+        return run(self._token, self._base_url, query, context, sleep_time, ssl_verify=self._ssl_verify,
+                   polling=polling)
 
     def refresh_metadata(self, table):
         """ Refresh the metadata for a given physical dataset
@@ -47,3 +47,9 @@ class DremioNotFoundException(DremioException):
 
 class DremioBadRequestException(DremioException):
     pass
+
+
+class DremioConflictException(DremioException):
+    """
+    the entity changed on the server since it was read (its tag is stale) or already exists
+    """
@@ -22,15 +22,33 @@
 # under the License.
 #
 
+import threading
+import weakref
+from concurrent.futures.thread import ThreadPoolExecutor
+
+try:
+    from queue import Queue, Full
+except ImportError:
+    from Queue import Queue, Full
 
 try:
     import pyarrow as pa
     from pyarrow import flight
     from .flight_auth import HttpDremioClientAuthHandler
-    from pyarrow.compat import tobytes
+    from ..util.convert import table_to_pandas
+
+    try:
+        from pyarrow.compat import tobytes
+    except ImportError:
+        def tobytes(o):
+            return o.encode('utf-8') if not isinstance(o, bytes) else o
+
+    #: errors raised when the flight server can not be reached, callers may fall back to another method
+    UNAVAILABLE_ERRORS = (flight.FlightUnavailableError,)
 
     def connect(hostname='localhost', port=47470,
-                username='dremio', password='dremio123', tls_root_certs_filename=None):
+                username='dremio', password='dremio123', tls_root_certs_filename=None, tls_root_certs=None,
+                tls=False, verify=True):
         """
         Connect to and authenticate against Dremio's arrow flight server. Auth is skipped if username is None
 
@@ -39,13 +57,18 @@ try:
         :param username: Username on Dremio
         :param password: Password on Dremio
         :param tls_root_certs_filename: use ssl to connect with root certs from filename
+        :param tls_root_certs: use ssl to connect with the given root certs (instead of reading a file)
+        :param tls: use ssl to connect, with the system root certs unless root certs are given
+        :param verify: (ssl) verify the server certificate
         :return: arrow flight client
         """
-        if tls_root_certs_filename:
+        if tls_root_certs_filename and not tls_root_certs:
             with open(tls_root_certs_filename) as f:
                 tls_root_certs = f.read()
+        if tls_root_certs or tls:
             location = 'grpc+tls://{}:{}'.format(hostname, port)
-            c = flight.FlightClient(location, tls_root_certs=tls_root_certs)
+            options = dict(disable_server_verification=True) if not verify else dict()
+            c = flight.FlightClient(location, tls_root_certs=tls_root_certs, **options)
         else:
             location = 'grpc+tcp://{}:{}'.format(hostname, port)
             c = flight.FlightClient(location)
@@ -55,12 +78,16 @@ try:
         return c
 
     def query(sql, client=None, hostname='localhost', port=47470,
-              username='dremio', password='dremio123', pandas=True, tls_root_certs_filename=False):
+              username='dremio', password='dremio123', pandas=True, tls_root_certs_filename=False,
+              ordered=True, max_workers=None, low_memory=False, memory_pool=None):
         """
         Run an sql query against Dremio and return a pandas dataframe or arrow table
 
         Either host,port,user,pass tuple or a pre-connected client should be supplied. Not both
 
+        All endpoints returned by the server are read concurrently (through the same client). With ``ordered`` the
+        batches are combined in endpoint order, otherwise they are interleaved in the order they arrive
+
         :param sql: sql query to execute on dremio
         :param client: pre-connected client (optional)
         :param hostname: Dremio coordinator hostname (optional)
@@ -69,29 +96,215 @@ try:
         :param password: Password on Dremio (optional)
         :param pandas: return a pandas dataframe (default) or an arrow table
         :param tls_root_certs_filename: use ssl to connect with root certs from filename
+        :param ordered: keep the batches of each endpoint together and in endpoint order
+        :param max_workers: maximum number of endpoints read at once, defaults to all of them
+        :param low_memory: (pandas) release arrow memory during the conversion, see util.convert.table_to_pandas
+        :param memory_pool: (pandas) arrow memory pool the dataframe is allocated from
         :return:
         """
         if not client:
             client = connect(hostname, port, username, password, tls_root_certs_filename)
 
         info = client.get_flight_info(flight.FlightDescriptor.for_command(tobytes(sql)))
-        reader = client.do_get(info.endpoints[0].ticket)
-        batches = []
-        while True:
-            try:
-                batch, _ = reader.read_chunk()
-                batches.append(batch)
-            except StopIteration:
-                break
-        data = pa.Table.from_batches(batches)
+        with FlightStream(client, info, ordered=ordered, max_workers=max_workers, buffer_size=0) as batches:
+            data = _to_table(list(batches), info.schema)
         if pandas:
-            return data.to_pandas()
+            return table_to_pandas(data, low_memory, memory_pool)
         else:
             return data
 
+    def _to_table(batches, schema):
+        # the batch list must not outlive the table, a low memory conversion can only free unshared buffers
+        return pa.Table.from_batches(batches, schema=schema if not batches else None)
+
+    def stream(sql, client=None, hostname='localhost', port=47470,
+               username='dremio', password='dremio123', pandas=False, tls_root_certs_filename=False,
+               ordered=True, max_workers=None, buffer_size=8, on_close=None, on_abort=None, tls=False, verify=True):
+        """
+        Run an sql query against Dremio and stream the results as they arrive
+
+        Either host,port,user,pass tuple or a pre-connected client should be supplied. Not both
+
+        :param sql: sql query to execute on dremio
+        :param client: pre-connected client (optional)
+        :param hostname: Dremio coordinator hostname (optional)
+        :param port: Dremio coordinator port (optional)
+        :param username: Username on Dremio (optional)
+        :param password: Password on Dremio (optional)
+        :param pandas: yield pandas dataframes rather than arrow record batches
+        :param tls_root_certs_filename: use ssl to connect with root certs from filename
+        :param ordered: yield the batches of each endpoint together and in endpoint order
+        :param max_workers: maximum number of endpoints read at once, defaults to all of them
+        :param buffer_size: maximum number of batches buffered per endpoint before reading pauses
+        :param on_close: optional callable run once the stream is closed, eg to give back a pooled client
+        :param on_abort: optional callable run instead of on_close when the stream was not read to the end
+        :param tls: use ssl to connect, with the system root certs unless tls_root_certs_filename is given
+        :param verify: (ssl) verify the server certificate
+        :return: FlightStream
+
+        :example:
+
+        >>> with stream('select * from big_table') as s:
+        ...     print(s.schema)
+        ...     for batch in s:
+        ...         process(batch)
+        """
+        if not client:
+            client = connect(hostname, port, username, password, tls_root_certs_filename, tls=tls, verify=verify)
+            on_close = on_close or (client.close if hasattr(client, 'close') else None)
+        info = client.get_flight_info(flight.FlightDescriptor.for_command(tobytes(sql)))
+        return FlightStream(client, info, pandas, ordered, max_workers, buffer_size, on_close, on_abort)
+
+    class FlightStream(object):
+        """
+        iterator over the record batches of a flight query, in the order they arrive
+
+        The schema is available before the first batch is read. Endpoints are read on background threads into
+        bounded buffers: readers pause once ``buffer_size`` batches are waiting, so memory is bounded by the buffers
+        rather than by the size of the result. Closing the stream (or leaving its ``with`` block) stops the readers and
+        waits for them to exit. A stream dropped without being closed is closed once it is garbage collected.
+
+        :param client: connected flight client
+        :param info: FlightInfo of the query
+        :param pandas: yield pandas dataframes rather than arrow record batches
+        :param ordered: yield the batches of each endpoint together and in endpoint order
+        :param max_workers: maximum number of endpoints read at once, defaults to all of them
+        :param buffer_size: maximum number of batches buffered per endpoint, 0 for unbounded
+        :param on_close: optional callable run once the stream is closed
+        :param on_abort: optional callable run instead of on_close when the stream is closed before it was read to the
+                         end or after a read failed, defaults to on_close
+        """
+
+        def __init__(self, client, info, pandas=False, ordered=True, max_workers=None, buffer_size=8,
+                     on_close=None, on_abort=None):
+            self.schema = info.schema
+            self._endpoints = info.endpoints
+            self._pandas = pandas
+            self._ordered = ordered
+            self._max_workers = max_workers
+            self._buffer_size = buffer_size
+            # the readers and the finalizer only see the state, so an abandoned stream can still be collected
+            self._state = _StreamState(client, on_close, on_abort if on_abort is not None else on_close)
+            weakref.finalize(self, self._state.close)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc_val, exc_tb):
+            self.close()
+
+        def __iter__(self):
+            try:
+                for batch in self._batches():
+                    yield batch.to_pandas() if self._pandas else batch
+                self._state.complete = True
+            finally:
+                self.close()
+
+        @property
+        def complete(self):
+            """ True once every batch has been read """
+            return self._state.complete
+
+        def close(self):
+            self._state.close()
+
+        def _batches(self):
+            state = self._state
+            if len(self._endpoints) <= 1:
+                for endpoint in self._endpoints:
+                    for batch in _read(state, endpoint):
+                        yield batch
+                return
+            state.pool = ThreadPoolExecutor(max_workers=self._max_workers or len(self._endpoints))
+            if self._ordered:
+                queues = [Queue(self._buffer_size) for _ in self._endpoints]
+            else:
+                queues = [Queue(self._buffer_size * len(self._endpoints))]
+            for i, endpoint in enumerate(self._endpoints):
+                state.pool.submit(_fill, state, endpoint, queues[i if self._ordered else 0])
+            remaining = [1] * len(queues) if self._ordered else [len(self._endpoints)]
+            for q, count in zip(queues, remaining):
+                while count:
+                    item = q.get()
+                    if item is _DONE:
+                        count -= 1
+                    elif isinstance(item, Exception):
+                        raise item
+                    else:
+                        yield item
+
+    class _StreamState(object):
+        """ what a FlightStream shares with its reader threads """
+
+        def __init__(self, client, on_close, on_abort):
+            self.client = client
+            self.on_close = on_close
+            self.on_abort = on_abort
+            self.complete = False
+            self.closed = threading.Event()
+            self.readers = list()
+            self.threads = set()
+            self.pool = None
+            self._lock = threading.Lock()
+
+        def close(self):
+            with self._lock:
+                if self.closed.is_set():
+                    return
+                self.closed.set()
+            for reader in self.readers:
+                try:
+                    reader.cancel()
+                except Exception:  # NOQA
+                    pass
+            if self.pool is not None:
+                # the client may only be handed back once no reader uses it. A collection triggered on a reader
+                # thread can not wait for itself, the stream is aborted then and the client is not reused
+                self.pool.shutdown(wait=threading.current_thread() not in self.threads)
+            callback = self.on_close if self.complete else self.on_abort
+            if callback is not None:
+                callback()
+
+    def _read(state, endpoint):
+        reader = state.client.do_get(endpoint.ticket)
+        state.readers.append(reader)
+        while not state.closed.is_set():
+            try:
+                batch, _ = reader.read_chunk()
+            except StopIteration:
+                return
+            yield batch
+
+    def _fill(state, endpoint, q):
+        state.threads.add(threading.current_thread())
+        try:
+            for batch in _read(state, endpoint):
+                _put(state, q, batch)
+        except Exception as e:  # NOQA
+            _put(state, q, e)
+        _put(state, q, _DONE)
+
+    def _put(state, q, item):
+        while not state.closed.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except Full:
+                pass
+
+    _DONE = object()
+
 except ImportError:
+    UNAVAILABLE_ERRORS = ()
+
     def connect(*args, **kwargs):
         raise NotImplementedError("Python Flight bindings require Python 3 and pyarrow > 0.14.0")
 
     def query(*args, **kwargs):
         raise NotImplementedError("Python Flight bindings require Python 3 and pyarrow > 0.14.0")
+
+    def stream(*args, **kwargs):
+        raise NotImplementedError("Python Flight bindings require Python 3 and pyarrow > 0.14.0")
+
+from .pool import FlightClientPool  # NOQA
@@ -0,0 +1,193 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from . import connect
+
+try:
+    from pyarrow.flight import FlightUnauthenticatedError, FlightUnavailableError, FlightServerError
+
+    _RECONNECT_ERRORS = (FlightUnauthenticatedError, FlightUnavailableError)
+    _PROBE_ERRORS = (FlightServerError, NotImplementedError)
+except ImportError:
+    _RECONNECT_ERRORS = ()
+    _PROBE_ERRORS = ()
+
+
+class _PooledClient(object):
+    __slots__ = ('client', 'created', 'last_used')
+
+    def __init__(self, client):
+        self.client = client
+        self.created = time.time()
+        self.last_used = self.created
+
+
+class FlightClientPool(object):
+    """
+    thread safe pool of connected and authenticated flight clients
+
+    Clients are created on demand, up to ``max_size``, and reused across queries so they only pay the connect and
+    auth handshake once. Clients older than ``max_age`` seconds are re-created before their auth token expires and
+    clients idle for more than ``check_after`` seconds are health checked before being handed out. A query failing
+    with an authentication or unavailable error is retried once on a fresh client.
+
+    :param hostname: Dremio coordinator hostname
+    :param port: Dremio flight port
+    :param username: Username on Dremio
+    :param password: Password on Dremio
+    :param tls_root_certs_filename: use ssl to connect with root certs from filename (read once)
+    :param tls: use ssl to connect, with the system root certs unless tls_root_certs_filename is given
+    :param verify: (ssl) verify the server certificate
+    :param max_size: maximum number of clients, callers block when all are in use
+    :param max_age: seconds after which a client is re-authenticated
+    :param check_after: seconds a client may sit idle before it is health checked
+    """
+
+    def __init__(self, hostname='localhost', port=47470, username='dremio', password='dremio123',
+                 tls_root_certs_filename=None, max_size=4, max_age=60 * 60 * 10, check_after=60, tls=False,
+                 verify=True):
+        assert max_size > 0
+        self._hostname = hostname
+        self._port = port
+        self._username = username
+        self._password = password
+        self._tls_root_certs_filename = tls_root_certs_filename
+        self._tls_root_certs = None
+        self._tls = tls
+        self._verify = verify
+        self._max_age = max_age
+        self._check_after = check_after
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._available = threading.BoundedSemaphore(max_size)
+        self._closed = False
+
+    def _connect(self):
+        if self._tls_root_certs_filename and self._tls_root_certs is None:
+            with open(self._tls_root_certs_filename) as f:
+                self._tls_root_certs = f.read()
+        return _PooledClient(connect(self._hostname, self._port, self._username, self._password,
+                                     tls_root_certs=self._tls_root_certs, tls=self._tls, verify=self._verify))
+
+    def _healthy(self, pooled):
+        now = time.time()
+        if now - pooled.created > self._max_age:
+            return False
+        if now - pooled.last_used > self._check_after:
+            try:
+                list(pooled.client.list_actions())
+            except _RECONNECT_ERRORS:
+                return False
+            except _PROBE_ERRORS:
+                pass  # server is reachable but does not implement list_actions
+        return True
+
+    def acquire(self):
+        """ take a client out of the pool, connecting a new one if none are idle
+
+        :return: pooled client, to be given back with release
+        """
+        self._available.acquire()
+        try:
+            while True:
+                with self._lock:
+                    if self._closed:
+                        raise RuntimeError('flight client pool is closed')
+                    pooled = self._idle.pop() if self._idle else None
+                if pooled is None:
+                    return self._connect()
+                if self._healthy(pooled):
+                    return pooled
+                logging.debug('discarding expired or unhealthy flight client')
+                _close(pooled)
+        except BaseException:
+            self._available.release()
+            raise
+
+    def release(self, pooled, discard=False):
+        """ give a client back to the pool
+
+        :param pooled: client returned by acquire
+        :param discard: close the client rather than reuse it
+        """
+        with self._lock:
+            if discard or self._closed:
+                _close(pooled)
+            else:
+                pooled.last_used = time.time()
+                self._idle.append(pooled)
+        self._available.release()
+
+    @contextmanager
+    def client(self):
+        """ context manager yielding a connected flight client """
+        pooled = self.acquire()
+        try:
+            yield pooled.client
+        except _RECONNECT_ERRORS:
+            # the server restarted or the tokens expired: none of the idle clients can be trusted
+            self.release(pooled, discard=True)
+            self._discard_idle()
+            raise
+        except BaseException:
+            self.release(pooled)
+            raise
+        self.release(pooled)
+
+    def run(self, fn):
+        """ call fn with a pooled client, retrying once on a fresh client if auth expired or the server went away
+
+        :param fn: callable taking a flight client
+        :return: result of fn
+        """
+        try:
+            with self.client() as c:
+                return fn(c)
+        except _RECONNECT_ERRORS as e:
+            logging.info('flight client failed (%s), reconnecting', e)
+        with self.client() as c:
+            return fn(c)
+
+    def _discard_idle(self):
+        with self._lock:
+            while self._idle:
+                _close(self._idle.pop())
+
+    def close(self):
+        """ close all idle clients and stop handing out new ones """
+        with self._lock:
+            self._closed = True
+        self._discard_idle()
+
+
+def _close(pooled):
+    try:
+        pooled.client.close()
+    except Exception:  # NOQA
+        pass
@@ -0,0 +1,492 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""asyncio versions of the rest endpoints in :mod:`dremio_client.model.endpoints`
+
+Every function is a coroutine with the same arguments as its synchronous counterpart plus an optional ``session``.
+Pass a shared ``aiohttp.ClientSession`` (see :func:`make_session`) to pool connections, otherwise a new session is
+opened for the call.
+
+.. note:: requires Python 3.5+ and aiohttp
+"""
+from .endpoints import _get_headers, _raise_for_code
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+def make_session(pool_connections=10, pool_maxsize=10):
+    """ create an aiohttp session which pools keep-alive connections
+
+    Must be called from within a running event loop
+
+    :param pool_connections: number of hosts to keep connections open to
+    :param pool_maxsize: maximum number of connections to keep open per host
+    :return: aiohttp.ClientSession
+    """
+    if aiohttp is None:
+        raise NotImplementedError("Python asyncio bindings require Python 3.5+ and aiohttp")
+    connector = aiohttp.TCPConnector(limit=pool_connections * pool_maxsize, limit_per_host=pool_maxsize)
+    return aiohttp.ClientSession(connector=connector)
+
+
+async def _request(method, url, token, json=None, details='', ssl_verify=True, session=None):
+    if session is None:
+        async with make_session() as session:
+            return await _request(method, url, token, json, details, ssl_verify, session)
+    async with session.request(method, url, headers=_get_headers(token), json=json,
+                               ssl=None if ssl_verify else False) as r:
+        if r.status < 400:
+            return await r.json(content_type=None)
+        error = aiohttp.ClientResponseError(r.request_info, r.history, status=r.status, message=r.reason,
+                                            headers=r.headers)
+    _raise_for_code(r.status, error, details)
+
+
+async def _get(url, token, details='', ssl_verify=True, session=None):
+    return await _request('GET', url, token, details=details, ssl_verify=ssl_verify, session=session)
+
+
+async def _post(url, token, json=None, details='', ssl_verify=True, session=None):
+    return await _request('POST', url, token, json, details, ssl_verify, session)
+
+
+async def _delete(url, token, details='', ssl_verify=True, session=None):
+    return await _request('DELETE', url, token, details=details, ssl_verify=ssl_verify, session=session)
+
+
+async def _put(url, token, json=None, details='', ssl_verify=True, session=None):
+    return await _request('PUT', url, token, json, details, ssl_verify, session)
+
+
+async def catalog_item(token, base_url, cid=None, path=None, ssl_verify=True, session=None):
+    """fetch a specific catalog item by id or by path
+
+    https://docs.dremio.com/rest-api/catalog/get-catalog-id.html
+    https://docs.dremio.com/rest-api/catalog/get-catalog-path.html
+
+    :param token: auth token from previous login attempt
+    :param base_url: base Dremio url
+    :param cid: unique dremio id for resource
+    :param path: path (/adls/nyctaxi/filename) for a resource
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: json of resource
+    """
+    if cid is None and path is None:
+        raise TypeError(
+            "both id and path can't be None for a catalog_item call")
+    idpath = (cid if cid else '') + ', ' + ('.'.join(path) if path else '')
+    cpath = [i.replace('/', '%2F') for i in path] if path else ''
+    endpoint = '/{}'.format(cid) if cid else '/by-path/{}'.format(
+        '/'.join(cpath).replace('"', ''))
+    return await _get(base_url + "/api/v3/catalog{}".format(endpoint), token, idpath, ssl_verify=ssl_verify,
+                      session=session)
+
+
+async def catalog(token, base_url, ssl_verify=True, session=None):
+    """
+    https://docs.dremio.com/rest-api/catalog/get-catalog.html populate the root dremio catalog
+
+    :param token: auth token from previous login attempt
+    :param base_url: base Dremio url
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: json of root resource
+    """
+    return await _get(base_url + "/api/v3/catalog", token, ssl_verify=ssl_verify, session=session)
+
+
+async def sql(token, base_url, query, context=None, ssl_verify=True, session=None):
+    """submit job w/ given sql
+
+    https://docs.dremio.com/rest-api/sql/post-sql.html
+
+    :param token: auth token
+    :param base_url: base Dremio url
+    :param query: sql query
+    :param context: optional dremio context
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: job id json object
+    """
+    return await _post(base_url + '/api/v3/sql', token, ssl_verify=ssl_verify, session=session, json={
+        'sql': query,
+        'context': context})
+
+
+async def job_status(token, base_url, job_id, ssl_verify=True, session=None):
+    """fetch job status
+
+    https://docs.dremio.com/rest-api/jobs/get-job.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param job_id: job id (as returned by sql)
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: status object
+    """
+    return await _get(base_url + '/api/v3/job/{}'.format(job_id), token, ssl_verify=ssl_verify, session=session)
+
+
+async def job_results(token, base_url, job_id, offset=0, limit=100, ssl_verify=True, session=None):
+    """fetch job results
+
+    https://docs.dremio.com/rest-api/jobs/get-job.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param job_id: job id (as returned by sql)
+    :param offset: offset of result set to return
+    :param limit: number of results to return (max 500)
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: result object
+    """
+    return await _get(
+        base_url +
+        '/api/v3/job/{}/results?offset={}&limit={}'.format(
+            job_id,
+            offset,
+            limit),
+        token,
+        ssl_verify=ssl_verify,
+        session=session)
+
+
+async def reflections(token, base_url, summary=False, ssl_verify=True, session=None):
+    """fetch all reflections
+
+    https://docs.dremio.com/rest-api/reflections/get-reflection.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param summary: fetch only the reflection summary
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: result object
+    """
+    return await _get(base_url + "/api/v3/reflection" + ('/summary' if summary else ''), token,
+                      ssl_verify=ssl_verify, session=session)
+
+
+async def reflection(token, base_url, reflectionid, ssl_verify=True, session=None):
+    """fetch a single reflection by id
+
+    https://docs.dremio.com/rest-api/reflections/get-reflection.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param reflectionid: id of the reflection to fetch
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: result object
+    """
+    return await _get(base_url + "/api/v3/reflection/{}".format(reflectionid), token, ssl_verify=ssl_verify,
+                      session=session)
+
+
+async def wlm_queues(token, base_url, ssl_verify=True, session=None):
+    """fetch all wlm queues
+
+    https://docs.dremio.com/rest-api/reflections/get-wlm-queue.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: result object
+    """
+    return await _get(base_url + "/api/v3/wlm/queue", token, ssl_verify=ssl_verify, session=session)
+
+
+async def wlm_rules(token, base_url, ssl_verify=True, session=None):
+    """fetch all wlm rules
+
+    https://docs.dremio.com/rest-api/reflections/get-wlm-queue.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: result object
+    """
+    return await _get(base_url + "/api/v3/wlm/rule", token, ssl_verify=ssl_verify, session=session)
+
+
+async def votes(token, base_url, ssl_verify=True, session=None):
+    """fetch all votes
+
+    https://docs.dremio.com/rest-api/reflections/get-vote.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: result object
+    """
+    return await _get(base_url + "/api/v3/vote", token, ssl_verify=ssl_verify, session=session)
+
+
+async def user(token, base_url, uid=None, name=None, ssl_verify=True, session=None):
+    """
+    fetch user based on id or name
+    https://docs.dremio.com/rest-api/reflections/get-user.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param uid: unique dremio id for user
+    :param name: name for a user
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: result object
+    """
+    if uid is None and name is None:
+        raise TypeError(
+            "both id and name can't be None for a user call")
+    idpath = (uid if uid else '') + ', ' + ('.'.join(name) if name else '')
+    endpoint = '/{}'.format(uid) if uid else '/by-name/{}'.format(
+        '/'.join(name).replace('"', ''))
+    return await _get(base_url + "/api/v3/user{}".format(endpoint), token, idpath, ssl_verify=ssl_verify,
+                      session=session)
+
+
+async def group(token, base_url, gid=None, name=None, ssl_verify=True, session=None):
+    """fetch a group based on id or name
+
+    https://docs.dremio.com/rest-api/reflections/get-group.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param gid: unique dremio id for group
+    :param name: name for a group
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: result object
+    """
+    if gid is None and name is None:
+        raise TypeError(
+            "both id and name can't be None for a user call")
+    idpath = (gid if gid else '') + ', ' + ('.'.join(name) if name else '')
+    endpoint = '/{}'.format(gid) if gid else '/by-name/{}'.format(
+        '/'.join(name).replace('"', ''))
+    return await _get(base_url + "/api/v3/group{}".format(endpoint), token, idpath, ssl_verify=ssl_verify,
+                      session=session)
+
+
+async def personal_access_token(token, base_url, uid, ssl_verify=True, session=None):
+    """fetch a PAT for a user based on id
+
+    https://docs.dremio.com/rest-api/user/get-user-id-token.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param uid: id of a user
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: result object
+    """
+    return await _get(base_url + "/api/v3/user/{}/token".format(uid), token, ssl_verify=ssl_verify,
+                      session=session)
+
+
+async def collaboration_tags(token, base_url, cid, ssl_verify=True, session=None):
+    """fetch tags for a catalog entry
+
+    https://docs.dremio.com/rest-api/user/get-catalog-collaboration.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param cid: id of a catalog entity
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: result object
+    """
+    return await _get(base_url + "/api/v3/catalog/{}/collaboration/tag".format(cid), token, ssl_verify=ssl_verify,
+                      session=session)
+
+
+async def collaboration_wiki(token, base_url, cid, ssl_verify=True, session=None):
+    """fetch wiki for a catalog entry
+
+    https://docs.dremio.com/rest-api/user/get-catalog-collaboration.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param cid: id of a catalog entity
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: result object
+    """
+    return await _get(base_url + "/api/v3/catalog/{}/collaboration/wiki".format(cid), token, ssl_verify=ssl_verify,
+                      session=session)
+
+
+async def refresh_pds(token, base_url, pid, ssl_verify=True, session=None):
+    """ refresh a physical dataset and all its child reflections
+
+    https://docs.dremio.com/rest-api/catalog/post-catalog-id-refresh.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param pid: id of a catalog entity
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: None
+    """
+    return await _post(base_url + "/api/v3/catalog/{}/refresh".format(pid), token, ssl_verify=ssl_verify,
+                       session=session)
+
+
+async def set_collaboration_tags(token, base_url, cid, tags, ssl_verify=True, session=None):
+    """ set tags on a given catalog entity
+
+    https://docs.dremio.com/rest-api/catalog/post-catalog-collaboration.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param cid: id of a catalog entity
+    :param tags: list of strings for tags
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: None
+    """
+    json = {'tags': tags}
+    try:
+        old_tags = await collaboration_tags(token, base_url, cid, ssl_verify, session)
+        json['version'] = old_tags['version']
+    except:  # NOQA
+        pass
+    return await _post(base_url + "/api/v3/catalog/{}/collaboration/tag".format(cid), token, ssl_verify=ssl_verify,
+                       json=json, session=session)
+
+
+async def set_collaboration_wiki(token, base_url, cid, wiki, ssl_verify=True, session=None):
+    """ set wiki on a given catalog entity
+
+    https://docs.dremio.com/rest-api/catalog/post-catalog-collaboration.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param cid: id of a catalog entity
+    :param wiki: text representing markdown for entity
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: None
+    """
+    json = {'text': wiki}
+    try:
+        old_wiki = await collaboration_wiki(token, base_url, cid, ssl_verify, session)
+        json['version'] = old_wiki['version']
+    except:  # NOQA
+        pass
+    return await _post(base_url + "/api/v3/catalog/{}/collaboration/wiki".format(cid), token, ssl_verify=ssl_verify,
+                       json=json, session=session)
+
+
+async def delete_catalog(token, base_url, cid, tag, ssl_verify=True, session=None):
+    """ remove a catalog item from Dremio
+
+    https://docs.dremio.com/rest-api/catalog/delete-catalog-id.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param cid: id of a catalog entity
+    :param tag: version tag of entity
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: None
+    """
+    return await _delete(base_url + "/api/v3/catalog/{}?tag={}".format(cid, tag), token, ssl_verify=ssl_verify,
+                         session=session)
+
+
+async def set_catalog(token, base_url, json, ssl_verify=True, session=None):
+    """ add a new catalog entity
+
+    https://docs.dremio.com/rest-api/catalog/post-catalog.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param json: json document for new catalog entity
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: new catalog entity
+    """
+    return await _post(base_url + "/api/v3/catalog", token, json, ssl_verify=ssl_verify, session=session)
+
+
+async def update_catalog(token, base_url, cid, json, ssl_verify=True, session=None):
+    """ update a catalog entity
+
+    https://docs.dremio.com/rest-api/catalog/put-catalog-id.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param cid: id of catalog entity
+    :param json: json document for new catalog entity
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: updated catalog entity
+    """
+    return await _put(base_url + "/api/v3/catalog/{}".format(cid), token, json, ssl_verify=ssl_verify,
+                      session=session)
+
+
+async def set_personal_access_token(token, base_url, uid, label, lifetime=24, ssl_verify=True, session=None):
+    """ create a pat for a given user
+
+    https://docs.dremio.com/rest-api/user/post-user-uid-token.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param uid: id user
+    :param label: label of token
+    :param lifetime: lifetime in hours of token
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: updated catalog entity
+    """
+    return await _post(base_url + "/api/v3/user/{}/token".format(uid), token,
+                       {'label': label, 'lifeTime': 1000 * 60 * 60 * lifetime}, ssl_verify=ssl_verify,
+                       session=session)
+
+
+async def delete_personal_access_token(token, base_url, uid, tid=None, ssl_verify=True, session=None):
+    """ create a pat for a given user
+
+    https://docs.dremio.com/rest-api/user/delete-user-uid-token.html
+
+    :param token: auth token
+    :param base_url: sql query
+    :param uid: id user
+    :param tid: label of token (optional)
+    :param ssl_verify: ignore ssl errors if False
+    :param session: optional aiohttp session
+    :return: updated catalog entity
+    """
+    return await _delete(base_url + "/api/v3/user/{}/token{}".format(uid, ('/' + tid) if tid else ''), token,
+                         ssl_verify=ssl_verify, session=session)
@@ -0,0 +1,130 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Commit many catalog entities as one batch
+
+Inside a ``with root.batch():`` block ``Catalog.commit()`` only records the entity (if it has changes). When the
+block exits the recorded entities are sent concurrently, shallower paths first so new parents exist before their
+children.
+"""
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from ..error import DremioConflictException
+
+CommitResult = namedtuple('CommitResult', ['node', 'status', 'error'])
+CommitResult.__doc__ = """
+outcome of committing one entity
+
+``status`` is one of 'created', 'updated', 'conflict' (the entity changed on the server since it was read, or
+already exists), 'failed' or 'skipped' (an ancestor in the same batch was not committed). ``error`` is the
+exception for conflicts and failures.
+"""
+
+_local = threading.local()
+
+
+def current_batch():
+    """ the innermost active batch of this thread, or None """
+    batches = getattr(_local, 'batches', None)
+    return batches[-1] if batches else None
+
+
+class CommitBatch(object):
+    """
+    unit of work collecting dirty catalog entities and committing them concurrently
+
+    Use as a context manager (see Root.batch): commits inside the block are recorded and flushed on a clean exit,
+    the results are then in ``results``. Entities can also be added and flushed explicitly.
+
+    :param max_workers: maximum number of concurrent requests
+    """
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self.results = None
+        self._nodes = list()
+        self._recorded = set()
+
+    def add(self, node):
+        """ record an entity to commit, whether or not it is marked as changed """
+        node._dirty = True
+        if id(node) not in self._recorded:
+            self._recorded.add(id(node))
+            self._nodes.append(node)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def flush(self):
+        """
+        commit all recorded entities
+
+        :return: list of CommitResult, one per entity
+        """
+        nodes, self._nodes, self._recorded = self._nodes, list(), set()
+        levels = dict()
+        for node in nodes:
+            levels.setdefault(len(node.meta.path), list()).append(node)
+        results = list()
+        failed = set()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for depth in sorted(levels):
+                todo = list()
+                for node in levels[depth]:
+                    path = tuple(node.meta.path)
+                    if any(path[:i] in failed for i in range(1, len(path))):
+                        results.append(CommitResult(node, 'skipped', None))
+                        failed.add(path)
+                    else:
+                        todo.append(node)
+                for result in pool.map(_commit, todo):
+                    results.append(result)
+                    if result.error is not None:
+                        failed.add(tuple(result.node.meta.path))
+        self.results = results
+        return results
+
+    def __enter__(self):
+        if getattr(_local, 'batches', None) is None:
+            _local.batches = list()
+        _local.batches.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _local.batches.remove(self)
+        if exc_type is None:
+            self.flush()
+        return False
+
+
+def _commit(node):
+    status = 'updated' if node.meta.id else 'created'
+    try:
+        node._commit()
+    except DremioConflictException as e:
+        return CommitResult(node, 'conflict', e)
+    except Exception as e:  # NOQA
+        return CommitResult(node, 'failed', e)
+    return CommitResult(node, status, None)
@@ -22,12 +22,12 @@
 # under the License.
 #
 from .data import Root
-from .endpoints import catalog as _catalog
+from .store import catalog as _catalog
 
 
-def catalog(token, base_url, flight_endpoint, ssl_verify=True):
-    cat = Root(token, base_url, flight_endpoint, ssl_verify=ssl_verify)
-    data = _catalog(token, base_url, ssl_verify=ssl_verify)
+def catalog(token, base_url, flight_endpoint, ssl_verify=True, user=None):
+    cat = Root(token, base_url, flight_endpoint, ssl_verify=ssl_verify, user=user)
+    data = _catalog(token, base_url, ssl_verify=ssl_verify, user=user)
     for item in data['data']:
         cat.add(item)
     return cat
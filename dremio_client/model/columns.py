@@ -0,0 +1,182 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Search datasets by column
+
+An inverted index from column name (and type) to the datasets which have that column. Nested fields are indexed by
+their dotted name, eg ``address.city``. Names are matched case insensitively, exactly, by prefix or fuzzily (by
+the similarity of their sets of trigrams, as postgres' pg_trgm does).
+"""
+import bisect
+import threading
+from collections import Counter, namedtuple
+from itertools import chain
+
+ColumnMatch = namedtuple('ColumnMatch', ['path', 'name', 'type'])
+ColumnMatch.__doc__ = """
+a dataset column found in a ColumnIndex: dataset path (tuple), column name and type name
+"""
+
+
+def flatten_fields(fields, prefix=''):
+    """
+    the columns of a dataset, nested fields included
+
+    :param fields: ``fields`` of a dataset entity
+    :param prefix: name of the enclosing field
+    :return: generator of (name, type name)
+    """
+    for field in fields or list():
+        name = prefix + field.get('name', '')
+        field_type = field.get('type') or dict()
+        yield name, field_type.get('name')
+        if field_type.get('subSchema'):
+            for column in flatten_fields(field_type['subSchema'], name + '.'):
+                yield column
+
+
+def _trigrams(name):
+    padded = '  ' + name + ' '
+    return set(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class ColumnIndex(object):
+    """
+    inverted index of dataset columns by name and type
+
+    The index is safe to use from several threads, eg the crawler's workers adding datasets as they load
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = dict()  # lower case column name -> {dataset path: (name, type)}
+        self._datasets = dict()  # dataset path -> lower case column names
+        self._trigram_index = dict()  # trigram -> lower case column names
+        self._trigram_counts = dict()  # lower case column name -> number of distinct trigrams
+        self._sorted = None  # lower case column names in order, built on demand for prefix lookups
+
+    def add(self, path, fields):
+        """
+        index (or reindex) the columns of a dataset
+
+        :param path: dataset path
+        :param fields: ``fields`` of the dataset entity
+        """
+        self.add_columns(path, flatten_fields(fields))
+
+    def add_columns(self, path, columns):
+        """
+        index (or reindex) a dataset by an iterable of (name, type name)
+        """
+        path = tuple(path)
+        columns = list(columns)
+        with self._lock:
+            self.remove(path)
+            names = list()
+            for name, column_type in columns:
+                key = name.lower()
+                postings = self._postings.get(key)
+                if postings is None:
+                    postings = self._postings[key] = dict()
+                    trigrams = _trigrams(key)
+                    for trigram in trigrams:
+                        self._trigram_index.setdefault(trigram, set()).add(key)
+                    self._trigram_counts[key] = len(trigrams)
+                    self._sorted = None
+                postings[path] = (name, column_type)
+                names.append(key)
+            if names:
+                self._datasets[path] = names
+
+    def remove(self, path):
+        """ drop a dataset from the index """
+        with self._lock:
+            for key in self._datasets.pop(tuple(path), list()):
+                postings = self._postings.get(key)
+                if postings is None:
+                    continue
+                postings.pop(tuple(path), None)
+                if not postings:
+                    del self._postings[key]
+                    del self._trigram_counts[key]
+                    for trigram in _trigrams(key):
+                        names = self._trigram_index.get(trigram)
+                        names.discard(key)
+                        if not names:
+                            del self._trigram_index[trigram]
+                    self._sorted = None
+
+    def find(self, name, column_type=None, match='exact', limit=None, cutoff=0.5):
+        """
+        find the datasets having a column
+
+        :param name: column name, case insensitive
+        :param column_type: only columns of this type (eg BIGINT)
+        :param match: 'exact', 'prefix' or 'fuzzy'
+        :param limit: maximum number of matches
+        :param cutoff: minimum similarity (0 to 1) of fuzzy matches
+        :return: list of ColumnMatch, closest names first for fuzzy matches
+        """
+        key = name.lower()
+        column_type = column_type.upper() if column_type else None
+        matches = list()
+        with self._lock:
+            if match == 'exact':
+                names = [key] if key in self._postings else list()
+            elif match == 'prefix':
+                names = self._prefixed(key)
+            elif match == 'fuzzy':
+                names = self._similar(key, cutoff)
+            else:
+                raise ValueError('unknown match ' + match)
+            for key in names:
+                for path, (column, found_type) in sorted(self._postings[key].items()):
+                    if column_type is None or found_type == column_type:
+                        matches.append(ColumnMatch(path, column, found_type))
+                        if limit is not None and len(matches) >= limit:
+                            return matches
+        return matches
+
+    def _prefixed(self, key):
+        if self._sorted is None:
+            self._sorted = sorted(self._postings)
+        start = bisect.bisect_left(self._sorted, key)
+        end = bisect.bisect_left(self._sorted, key + u'\uffff', start)
+        return self._sorted[start:end]
+
+    def _similar(self, key, cutoff):
+        trigrams = _trigrams(key)
+        shared = Counter(chain.from_iterable(self._trigram_index.get(t, ()) for t in trigrams))
+        scored = list()
+        for candidate, count in shared.items():
+            # dice coefficient of the trigram sets
+            score = 2.0 * count / (len(trigrams) + self._trigram_counts[candidate])
+            if score >= cutoff:
+                scored.append((-score, candidate))
+        return [candidate for _, candidate in sorted(scored)]
+
+    def __contains__(self, path):
+        return tuple(path) in self._datasets
+
+    def __len__(self):
+        return len(self._datasets)
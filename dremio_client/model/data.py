@@ -21,11 +21,25 @@
 # specific language governing permissions and limitations
 # under the License.
 #
+import re
+import threading
+import time
+import weakref
+
+try:
+    from sys import intern as _intern
+except ImportError:  # python 2, where intern is a builtin
+    _intern = intern  # NOQA
+
 from recordclass import recordclass
 import simplejson as json
 
-from .endpoints import catalog_item, collaboration_tags, collaboration_wiki, refresh_pds, delete_catalog, \
-    update_catalog, set_catalog
+from .endpoints import collaboration_tags, collaboration_wiki, refresh_pds, delete_catalog, update_catalog, \
+    set_catalog
+from .batch import CommitBatch, current_batch
+from .columns import ColumnIndex
+from .prefetch import Prefetcher
+from .store import catalog_item, columns as _stored_columns, invalidate as _invalidate_stored
 from ..util import refresh_metadata
 from ..error import DremioException
 
@@ -217,24 +231,100 @@ def create(item, token, base_url, flight_endpoint, trim_path=0, ssl_verify=True,
     raise KeyError("unsupported type")
 
 
+class MissingAttribute(KeyError, AttributeError):
+    """ raised for a name which is not a child of a catalog entity. Both a KeyError and an AttributeError """
+
+
+class _Context(object):
+    """ connection details shared by all entities of a catalog tree """
+    __slots__ = ('token', 'base_url', 'flight_endpoint', 'ssl_verify', 'user', '__weakref__')
+
+    def __init__(self, token, base_url, flight_endpoint, ssl_verify):
+        self.token = token
+        self.base_url = base_url
+        self.flight_endpoint = flight_endpoint
+        self.ssl_verify = ssl_verify
+        self.user = None
+
+    def catalog_item(self, cid, path, tag=None):
+        try:
+            return catalog_item(self.token, self.base_url, cid, tag=tag, ssl_verify=self.ssl_verify, user=self.user)
+        except Exception:  # NOQA
+            return catalog_item(self.token, self.base_url, path=path, tag=tag, ssl_verify=self.ssl_verify,
+                                user=self.user)
+
+
+_contexts = weakref.WeakValueDictionary()
+
+
+def _context(token, base_url, flight_endpoint, ssl_verify):
+    try:
+        key = (token, base_url, flight_endpoint, ssl_verify)
+        context = _contexts.get(key)
+    except TypeError:  # unhashable flight endpoint
+        return _Context(token, base_url, flight_endpoint, ssl_verify)
+    if context is None:
+        context = _contexts.setdefault(key, _Context(token, base_url, flight_endpoint, ssl_verify))
+    return context
+
+
+def _intern_path(path):
+    # path elements repeat across every entity below them, share one copy of each. Python 2 can only intern byte
+    # strings and json returns unicode there, so paths are not shared on python 2
+    return [_intern(p) if isinstance(p, str) else p for p in path] if path else path
+
+
+_FETCHED_TYPES = frozenset(('source', 'home', 'space', 'folder', 'root', 'dataset'))
+_CONTAINER_TYPES = frozenset(('source', 'home', 'space', 'folder'))
+
+
 class Catalog(dict):
+    __slots__ = ('_context', '_dirty', '_index', '_loaded', '_missing', 'meta')
+
+    #: seconds for which a fetched entity is not refetched to look for a missing child, and names found missing are
+    #: not looked up again
+    memo_ttl = 60
 
     def __init__(self, token=None, base_url=None, flight_endpoint=None, ssl_verify=True, dirty=False):
         dict.__init__(self)
-        self._base_url = base_url
-        self._token = token
-        self._flight_endpoint = flight_endpoint
-        self._ssl_verify = ssl_verify
+        self._context = _context(token, base_url, flight_endpoint, ssl_verify)
         self._dirty = dirty
+        self._index = None
+        self._loaded = None
+        self._missing = None
         self.meta = None
 
-        def try_id_and_path(x, y):
-            try:
-                return catalog_item(token, base_url, x, ssl_verify=ssl_verify)
-            except Exception:  # NOQA
-                return catalog_item(token, base_url, path=y, ssl_verify=ssl_verify)
+    @property
+    def _token(self):
+        return self._context.token
 
-        self._catalog_item = try_id_and_path
+    @property
+    def _base_url(self):
+        return self._context.base_url
+
+    @property
+    def _flight_endpoint(self):
+        return self._context.flight_endpoint
+
+    @property
+    def _ssl_verify(self):
+        return self._context.ssl_verify
+
+    @property
+    def _prefetcher(self):
+        return self._index.prefetcher if self._index is not None else None
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        if self._index is not None and isinstance(value, Catalog):
+            value._register(self._index)
+
+    def _register(self, index):
+        self._index = index
+        index.add(self)
+        for child in dict.values(self):
+            if isinstance(child, Catalog):
+                child._register(index)
 
     def keys(self):
         keys = dict.keys(self)
@@ -242,6 +332,14 @@ class Catalog(dict):
             '_catalog_item', '_base_url', '_token', '_flight_endpoint'}]
 
     def commit(self):
+        batch = current_batch()
+        if batch is not None:
+            if self._dirty:
+                batch.add(self)
+        else:
+            self._commit()
+
+    def _commit(self):
         if self._dirty:
             if self.meta.id:
                 self.meta = _put(self)
@@ -250,19 +348,80 @@ class Catalog(dict):
             self._dirty = False
 
     def get(self):
-        dir(self)
+        self._load()
         return self
 
+    def invalidate(self):
+        """ forget what is known about this entity's children, the next lookup refetches it """
+        self._loaded = 0
+        self._missing = None
+        if self._prefetcher is not None:
+            self._prefetcher.discard(self)
+        _invalidate_stored(self._base_url, getattr(self.meta, 'id', None), getattr(self.meta, 'path', None))
+
+    def _should_fetch(self):
+        if self._loaded == 0:
+            return True
+        if len(self.keys()) != 0:
+            return False
+        return self._loaded is None or time.time() - self._loaded > self.memo_ttl
+
+    def _fetchable(self):
+        entity_type = getattr(self.meta, 'entityType', None)
+        return self.meta is not None and entity_type in _FETCHED_TYPES and self._should_fetch()
+
+    def _fetch(self):
+        self._apply(self._request())
+
+    def _request(self):
+        # only reads this entity, safe to run on a background thread
+        result = self._context.catalog_item(self.meta.id if hasattr(self.meta, 'id') else None,
+                                            self.meta.path if hasattr(self.meta, 'path') else None,
+                                            self.meta.tag if hasattr(self.meta, 'tag') else None)
+        _, obj = create(result, self._token,
+                        self._base_url, self._flight_endpoint, ssl_verify=self._ssl_verify)
+        return obj
+
+    def _apply(self, obj):
+        self.update(obj)
+        self.meta = self.meta._replace(**{k: v for k, v in obj.meta._asdict().items() if v})
+        if self._index is not None:
+            self._register(self._index)
+        self._loaded = time.time()
+        self._missing = None
+
+    def _load(self):
+        """ fetch this entity's children if needed, waiting for a background fetch already in flight """
+        prefetcher = self._prefetcher
+        if prefetcher is not None and prefetcher.collect(self):
+            return True
+        if not self._fetchable():
+            return False
+        if prefetcher is None:
+            self._fetch()
+        else:
+            prefetcher.load(self)
+        return True
+
+    def _unloaded_containers(self, limit):
+        children = list()
+        for child in dict.values(self):
+            if len(children) >= limit:
+                break
+            if isinstance(child, Catalog) and getattr(child.meta, 'entityType', None) in _CONTAINER_TYPES \
+                    and child._should_fetch():
+                children.append(child)
+        return children
+
     def __dir__(self):
-        if len(self.keys()) == 0 and 'meta' in self.__dict__:
-            if self.meta.entityType in {'source', 'home', 'space', 'folder', 'root', 'dataset'}:
-                result = self._catalog_item(self.meta.id if hasattr(self.meta, 'id') else None,
-                                            self.meta.path if hasattr(self.meta, 'path') else None)
-                _, obj = create(result, self._token,
-                                self._base_url, self._flight_endpoint, ssl_verify=self._ssl_verify)
-                self.update(obj)
-                self.meta = self.meta._replace(**{k: v for k, v in obj.meta._asdict().items() if v})
-                return list(self.keys())
+        prefetcher = self._prefetcher
+        if prefetcher is not None:
+            # never block tab completion for longer than the deadline, the rest fills in in the background
+            prefetcher.collect(self)
+            if self._fetchable():
+                prefetcher.load(self, wait=prefetcher.deadline)
+        elif self._load():
+            return list(self.keys())
         return list(self.keys()) + ['_repr_html_']
 
     def to_json(self):
@@ -288,8 +447,24 @@ class Catalog(dict):
                 raise KeyError()
             return value
         except KeyError:
-            self.__dir__()
-            return dict.__getitem__(self, item)
+            if item.startswith('__') or self._known_missing(item):
+                raise MissingAttribute(item)
+            self._load()
+            try:
+                value = dict.__getitem__(self, item)
+            except KeyError:
+                if self._missing is None:
+                    self._missing = dict()
+                self._missing[item] = time.time()
+                raise MissingAttribute(item)
+        prefetcher = self._prefetcher
+        if prefetcher is not None and isinstance(value, Catalog):
+            prefetcher.touch(value)
+        return value
+
+    def _known_missing(self, item):
+        missing = self._missing.get(item) if self._missing else None
+        return missing is not None and time.time() - missing <= self.memo_ttl
 
     def wiki(self):
         result = collaboration_wiki(self._token, self._base_url, self.meta.id, ssl_verify=self._ssl_verify)
@@ -324,11 +499,15 @@ class Catalog(dict):
         return self.remove()
 
     def remove(self):
+        _invalidate_stored(self._base_url, self.meta.id, self.meta.path)
+        if self._index is not None:
+            self._index.remove(self)
         return delete_catalog(self._token, self._base_url, self.meta.id, self.meta.tag, self._ssl_verify)
 
 
 def _put(self):
     cid = self.meta.id
+    _invalidate_stored(self._base_url, cid, self.meta.path)
     result = update_catalog(self._token, self._base_url, cid, self.meta._asdict(), self._ssl_verify)
 
     _, obj = create(result, self._token,
@@ -341,17 +520,174 @@ def _post(self):
     for i in ('state', 'id', 'tag', 'createdAt'):
         if i in json:
             del json[i]
+    _invalidate_stored(self._base_url, path=self.meta.path)
     result = set_catalog(self._token, self._base_url, json, self._ssl_verify)
     _, obj = create(result, self._token,
                     self._base_url, self._flight_endpoint, ssl_verify=self._ssl_verify)
     return obj.meta
 
 
+class CatalogIndex(object):
+    """
+    index of the loaded entities of a catalog tree by id, by path and by cleaned (attribute name) path
+
+    The index is filled as entities are added to the tree or their children are fetched; it never makes requests.
+    The columns of loaded datasets are indexed in ``columns``. The tree's Prefetcher, if any, is kept here too
+    """
+
+    def __init__(self):
+        # entities are added from the crawler's and prefetcher's threads too
+        self._lock = threading.RLock()
+        self._ids = dict()
+        self._paths = dict()
+        self._clean_paths = dict()
+        self.columns = ColumnIndex()
+        self.stored_columns_read = False
+        self.prefetcher = None
+
+    def add(self, node):
+        meta = node.meta
+        cid = getattr(meta, 'id', None)
+        path = getattr(meta, 'path', None)
+        with self._lock:
+            if cid:
+                self._ids[cid] = node
+            if path:
+                self._paths[_unquote(path)] = node
+                self._clean_paths[tuple(_clean(p) for p in path)] = node
+        if path and getattr(meta, 'fields', None):
+            self.columns.add(_unquote(path), meta.fields)
+
+    def remove(self, node):
+        path = getattr(node.meta, 'path', None)
+        if path and getattr(node.meta, 'fields', None):
+            self.columns.remove(_unquote(path))
+        with self._lock:
+            for index in (self._ids, self._paths, self._clean_paths):
+                for key in [k for k, v in index.items() if v is node]:
+                    del index[key]
+
+    def get(self, key, default=None):
+        """
+        find a loaded entity
+
+        :param key: entity id, path as a list or a dotted path string (eg ``space.folder."my.dataset"``). Path
+                    elements may be the original names or the cleaned attribute names
+        :param default: returned if no loaded entity matches
+        :return: Catalog entity
+        """
+        if isinstance(key, (list, tuple)):
+            path = _unquote(key)
+        else:
+            if key in self._ids:
+                return self._ids[key]
+            path = _split_path(key)
+        with self._lock:
+            if path in self._paths:
+                return self._paths[path]
+            return self._clean_paths.get(tuple(_clean(p) for p in path), default)
+
+    def __len__(self):
+        return len(self._ids)
+
+
+def _unquote(path):
+    # listings quote some path elements, eg ["adls", "\"nyctaxi\""]
+    return tuple(p[1:-1] if len(p) > 1 and p[0] == p[-1] == '"' else p for p in path)
+
+
+def _split_path(path):
+    return tuple(quoted.replace('""', '"') if quoted else plain for quoted, plain in _PATH_PART.findall(path))
+
+
+_PATH_PART = re.compile(r'"((?:[^"]|"")*)"|([^.]+)')
+
+
 class Root(Catalog):
+    __slots__ = ()
 
-    def __init__(self, token=None, base_url=None, flight_endpoint=None, ssl_verify=True, dirty=False):
+    def __init__(self, token=None, base_url=None, flight_endpoint=None, ssl_verify=True, dirty=False, user=None):
         Catalog.__init__(self, token, base_url, flight_endpoint, ssl_verify, dirty)
+        if user is not None:
+            # the context is shared by all entities of this token, which all belong to the same user
+            self._context.user = user
         self.meta = RootMetaData('root')
+        self._index = CatalogIndex()
+
+    def enable_prefetch(self, depth=1, deadline=0.2, max_workers=4, limit=100):
+        """
+        load entities in the background as they are touched, so tab completion never blocks for long
+
+        :param depth: levels of child containers loaded after an entity is touched: 1 for its children, 2 for its
+                      grandchildren too
+        :param deadline: seconds tab completion waits before returning what is already known
+        :param max_workers: maximum number of concurrent requests
+        :param limit: maximum number of children loaded per entity
+        :return: Prefetcher
+        """
+        self.disable_prefetch()
+        self._index.prefetcher = Prefetcher(depth, deadline, max_workers, limit)
+        self._index.prefetcher.touch(self)
+        return self._index.prefetcher
+
+    def disable_prefetch(self):
+        """ go back to loading entities synchronously when they are looked up """
+        prefetcher, self._index.prefetcher = self._index.prefetcher, None
+        if prefetcher is not None:
+            prefetcher.shutdown()
+
+    def batch(self, max_workers=8):
+        """
+        collect the commits of a block and send them concurrently when it exits
+
+        usage::
+
+            with client.data.batch() as batch:
+                for dataset in datasets:
+                    dataset.meta.sql = rewrite(dataset.meta.sql)
+                    batch.add(dataset)
+            conflicts = [r for r in batch.results if r.status == 'conflict']
+
+        :param max_workers: maximum number of concurrent requests
+        :return: CommitBatch
+        """
+        return CommitBatch(max_workers)
+
+    def find_columns(self, name, column_type=None, match='exact', limit=None):
+        """
+        find the datasets having a column
+
+        Covers the datasets loaded in this catalog and those in the catalog store, if there is one. Stored columns
+        are read on the first call
+
+        :param name: column name, case insensitive. Nested fields are named by their dotted path
+        :param column_type: only columns of this type (eg BIGINT)
+        :param match: 'exact', 'prefix' or 'fuzzy'
+        :param limit: maximum number of matches
+        :return: list of ColumnMatch
+        """
+        index = self._index
+        if not index.stored_columns_read and self._base_url is not None:
+            index.stored_columns_read = True
+            for path, columns in _stored_columns(self._token, self._base_url, self._context.user):
+                if _unquote(path) not in index.columns:  # loaded in this catalog, which is as new or newer
+                    index.columns.add_columns(_unquote(path), columns)
+        return index.columns.find(name, column_type, match, limit)
+
+    def find(self, key):
+        """
+        look up a loaded entity by id or path without any requests
+
+        Only entities already fetched (eg by tab completion, ``get()`` or a crawl) can be found
+
+        :param key: entity id, path as a list or a dotted path string (eg ``space.folder.dataset``)
+        :raise: KeyError if no loaded entity matches
+        :return: Catalog entity
+        """
+        node = self._index.get(key)
+        if node is None:
+            raise KeyError(key)
+        return node
 
     def add(self, item):
         name, obj = create(item, self._token, self._base_url,
@@ -367,6 +703,10 @@ class Root(Catalog):
         if new_entity:
             item['id'] = cid  # NOQA
             item['tag'] = tag  # NOQA
+        base = self._index.get(obj.meta.path[:-1]) if len(obj.meta.path) > 1 else self
+        if base is not None:
+            base[_clean(obj.meta.path[-1])] = obj
+            return
         base = self
         subpath = list()
         for p in obj.meta.path[:-1]:
@@ -398,6 +738,7 @@ def _get_acls(acl):
 
 
 class Space(Catalog):
+    __slots__ = ()
 
     def __init__(self, token=None, base_url=None,
                  flight_endpoint=None, ssl_verify=True, dirty=False, **kwargs):
@@ -407,7 +748,7 @@ class Space(Catalog):
             id=kwargs.get('id'),
             tag=kwargs.get('tag'),
             name=kwargs.get('name'),
-            path=kwargs.get('path'),
+            path=_intern_path(kwargs.get('path')),
             accessControlList=_get_acls(kwargs.get('accessControlList'))
         )
         for child in kwargs.get('children', list()):
@@ -417,6 +758,7 @@ class Space(Catalog):
 
 
 class Home(Space):
+    __slots__ = ()
 
     def __init__(self, token=None, base_url=None,
                  flight_endpoint=None, ssl_verify=True, dirty=False, **kwargs):
@@ -425,6 +767,7 @@ class Home(Space):
 
 
 class Folder(Catalog):
+    __slots__ = ()
 
     def __init__(self, token=None, base_url=None,
                  flight_endpoint=None, ssl_verify=True, dirty=False, **kwargs):
@@ -433,7 +776,7 @@ class Folder(Catalog):
             entityType='folder',
             id=kwargs.get('id', None),
             tag=kwargs.get('tag', None),
-            path=kwargs.get('path', None),
+            path=_intern_path(kwargs.get('path')),
             accessControlList=_get_acls(kwargs.get('accessControlList'))
         )
         for child in kwargs.get('children', list()):
@@ -443,6 +786,7 @@ class Folder(Catalog):
 
 
 class File(Catalog):
+    __slots__ = ()
 
     def __init__(self, token=None, base_url=None,
                  flight_endpoint=None, ssl_verify=True, dirty=False, **kwargs):
@@ -450,7 +794,7 @@ class File(Catalog):
         self.meta = FileMetaData(
             entityType='file',
             id=kwargs.get('id', None),
-            path=kwargs.get('path', None),
+            path=_intern_path(kwargs.get('path')),
             accessControlList=_get_acls(kwargs.get('accessControlList'))
         )
 
@@ -500,12 +844,14 @@ def _get_source_meta(kwargs):
         accelerationRefreshPeriodMs=kwargs.get('accelerationRefreshPeriodMs'),
         accelerationNeverExpire=kwargs.get('accelerationNeverExpire'),
         accelerationNeverRefresh=kwargs.get('accelerationNeverRefresh'),
-        path=kwargs.get('path'),
+        path=_intern_path(kwargs.get('path')),
         accessControlList=_get_acls(kwargs.get('accessControlList'))
     )
 
 
 class Source(Catalog):
+    __slots__ = ()
+
     def __init__(self, token=None, base_url=None,
                  flight_endpoint=None, ssl_verify=True, dirty=False, **kwargs):
         Catalog.__init__(self, token, base_url, flight_endpoint, ssl_verify, dirty)
@@ -519,18 +865,20 @@ class Source(Catalog):
 
 
 class Dataset(Catalog):
+    __slots__ = ()
+
     def __init__(self, token=None, base_url=None,
                  flight_endpoint=None, ssl_verify=True, dirty=False, **kwargs):
         Catalog.__init__(self, token, base_url, flight_endpoint, ssl_verify, dirty)
         self.meta = DatasetMetaData(
             entityType='dataset',
             id=kwargs.get('id'),
-            path=kwargs.get('path'),
+            path=_intern_path(kwargs.get('path')),
             tag=kwargs.get('tag'),
             type=kwargs.get('type'),
             fields=kwargs.get('fields'),
-            createdAt=kwargs.get('path'),
-            accelerationRefreshPolicy=kwargs.get('path'),
+            createdAt=kwargs.get('createdAt'),
+            accelerationRefreshPolicy=kwargs.get('accelerationRefreshPolicy'),
             sql=kwargs.get('sql'),
             sqlContext=kwargs.get('sqlContext'),
             format=kwargs.get('format'),
@@ -546,6 +894,8 @@ class Dataset(Catalog):
 
 
 class PhysicalDataset(Dataset):
+    __slots__ = ()
+
     def __init__(self, token=None, base_url=None,
                  flight_endpoint=None, ssl_verify=True, dirty=False, **kwargs):
         Dataset.__init__(self, token, base_url, flight_endpoint, ssl_verify, dirty, **kwargs)
@@ -559,6 +909,8 @@ class PhysicalDataset(Dataset):
 
 
 class VirtualDataset(Dataset):
+    __slots__ = ()
+
     def __init__(self, token=None, base_url=None,
                  flight_endpoint=None, ssl_verify=True, dirty=False, **kwargs):
         Dataset.__init__(self, token, base_url, flight_endpoint, ssl_verify, dirty, **kwargs)
@@ -21,10 +21,10 @@
 # specific language governing permissions and limitations
 # under the License.
 #
-import requests
 from requests.exceptions import HTTPError
+from ..session import get_session
 from ..error import DremioUnauthorizedException, DremioNotFoundException, DremioPermissionException, DremioException, \
-    DremioBadRequestException
+    DremioBadRequestException, DremioConflictException
 
 
 def _get_headers(token):
@@ -34,12 +34,12 @@ def _get_headers(token):
 
 
 def _get(url, token, details='', ssl_verify=True):
-    r = requests.get(url, headers=_get_headers(token), verify=ssl_verify)
+    r = get_session().get(url, headers=_get_headers(token), verify=ssl_verify)
     return _check_error(r, details)
 
 
 def _post(url, token, json=None, details='', ssl_verify=True):
-    r = requests.post(
+    r = get_session().post(
         url,
         headers=_get_headers(token),
         verify=ssl_verify,
@@ -48,7 +48,7 @@ def _post(url, token, json=None, details='', ssl_verify=True):
 
 
 def _delete(url, token, details='', ssl_verify=True):
-    r = requests.delete(
+    r = get_session().delete(
         url,
         headers=_get_headers(token),
         verify=ssl_verify)
@@ -56,7 +56,7 @@ def _delete(url, token, details='', ssl_verify=True):
 
 
 def _put(url, token, json=None, details='', ssl_verify=True):
-    r = requests.put(
+    r = get_session().put(
         url,
         headers=_get_headers(token),
         verify=ssl_verify,
@@ -69,6 +69,10 @@ def _check_error(r, details=''):
     if not error:
         data = r.json()
         return data
+    _raise_for_code(code, error, details)
+
+
+def _raise_for_code(code, error, details=''):
     if code == 400:
         raise DremioBadRequestException("Requested object does not exist on entity " + details, error)
     if code == 401:
@@ -77,6 +81,8 @@ def _check_error(r, details=''):
         raise DremioPermissionException("Not permissioned to view entity at " + details, error)
     if code == 404:
         raise DremioNotFoundException("No entity exists at " + details, error)
+    if code == 409:
+        raise DremioConflictException("Conflicting version of entity at " + details, error)
     raise DremioException('unknown error', error)
 
 
@@ -419,7 +425,7 @@ def update_catalog(token, base_url, cid, json, ssl_verify=True):
     :param ssl_verify: ignore ssl errors if False
     :return: updated catalog entity
     """
-    return _post(base_url + "/api/v3/catalog/{}".format(cid), token, json, ssl_verify=ssl_verify)
+    return _put(base_url + "/api/v3/catalog/{}".format(cid), token, json, ssl_verify=ssl_verify)
 
 
 def set_personal_access_token(token, base_url, uid, label, lifetime=24, ssl_verify=True):
@@ -0,0 +1,144 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Background loading of catalog entities
+
+With prefetching enabled, touching a catalog entity starts loading it (and its child containers) on background
+threads. Tab completion (``__dir__``) waits for a short deadline and then returns whatever is already known, the
+rest fills in as it arrives. Attribute lookups still wait for the entity to load, sharing a fetch already in flight.
+
+Background threads only make requests: a loaded entity is applied to the catalog tree by the thread which next
+touches it, so the tree is never changed behind the back of a caller reading it.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+
+class Prefetcher(object):
+    """
+    loads the entities of one catalog tree on a pool of background threads
+
+    Loads are keyed by entity path, forgotten once applied or when the entity is invalidated.
+
+    :param depth: levels of child containers to load after an entity is touched: 1 for its children, 2 for its
+                  grandchildren too
+    :param deadline: seconds tab completion waits for an entity to load before returning what is known
+    :param max_workers: maximum number of concurrent requests
+    :param limit: maximum number of children loaded per entity
+    """
+
+    def __init__(self, depth=1, deadline=0.2, max_workers=4, limit=100):
+        self.depth = depth
+        self.deadline = deadline
+        self.limit = limit
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._pending = dict()
+        self._expanded = set()
+
+    def load(self, node, wait=None):
+        """
+        load an entity in the background, wait for it and apply it
+
+        :param node: catalog entity
+        :param wait: seconds to wait, or None to wait until it is loaded and raise any error
+        """
+        future = self._submit(node, self.depth)
+        if wait is None:
+            future.result()
+        else:
+            try:
+                future.result(timeout=wait)
+            except TimeoutError:
+                return
+            except Exception:  # NOQA
+                pass  # reported by _run, the entity is refetched on the next lookup
+        self.collect(node)
+
+    def touch(self, node):
+        """ start loading an entity and its child containers, unless that has already been done """
+        self.collect(node)
+        if node._should_fetch():
+            self._submit(node, self.depth)
+        elif self.depth > 0:
+            with self._lock:
+                key = _key(node)
+                if key in self._expanded:
+                    return
+                self._expanded.add(key)
+            for child in node._unloaded_containers(self.limit):
+                self._submit(child, self.depth - 1)
+
+    def collect(self, node):
+        """ apply a finished background load of an entity to it
+
+        :return: True if a load was applied
+        """
+        key = _key(node)
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None or not future.done():
+                return False
+            del self._pending[key]
+        if future.cancelled() or future.exception() is not None:
+            return False
+        node._apply(future.result())
+        return True
+
+    def discard(self, node):
+        """ forget a load of an entity, eg once it has been invalidated """
+        key = _key(node)
+        with self._lock:
+            self._pending.pop(key, None)
+            self._expanded.discard(key)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+    def _submit(self, node, depth):
+        key = _key(node)
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pool.submit(self._run, node, depth)
+                self._pending[key] = future
+        return future
+
+    def _run(self, node, depth):
+        try:
+            loaded = node._request()
+        except Exception as e:  # NOQA
+            logging.debug('background load of %s failed: %s', getattr(node.meta, 'path', None), e)
+            with self._lock:
+                self._pending.pop(_key(node), None)
+            raise
+        if depth > 0:
+            # the children are loaded from the fetched copy, the tree itself only changes once it is collected
+            for child in loaded._unloaded_containers(self.limit):
+                self._submit(child, depth - 1)
+        return loaded
+
+
+def _key(node):
+    return tuple(getattr(node.meta, 'path', None) or ())
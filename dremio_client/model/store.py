@@ -0,0 +1,314 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Local store of catalog metadata shared between processes
+
+Catalog listings and entities fetched over rest are kept in a sqlite database keyed by server, user and by id and
+path. Users never share entries as what they see depends on their permissions.
+A stored entity is served without a request while it is younger than the staleness budget. After that a dataset is
+still served locally if its parent's listing reports the same ``tag`` (dataset tags change whenever the dataset
+does); anything else is refetched.
+
+The store is disabled unless configured, either with set_store or from the ``catalog.cache`` config section.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from confuse import NotFoundError
+
+from .columns import flatten_fields
+from .endpoints import catalog as _catalog, catalog_item as _catalog_item
+
+_ROOT = ''
+_store = None
+_lock = threading.Lock()
+
+_VERSION = 2
+_SCHEMA = """
+create table if not exists entities (
+    server text not null,
+    user text not null,
+    id text not null,
+    path text,
+    tag text,
+    fetched real not null,
+    data text not null,
+    primary key (server, user, id)
+);
+create index if not exists entities_path on entities (server, user, path);
+create table if not exists columns (
+    server text not null,
+    user text not null,
+    path text not null,
+    name text not null,
+    type text
+);
+create index if not exists columns_path on columns (server, user, path);
+"""
+_TABLES = ('entities', 'columns')
+
+
+class CatalogStore(object):
+    """
+    sqlite store of catalog entities
+
+    Entries are stored per server and user. Invalidating an entity drops it for all users
+
+    :param path: database file, defaults to ~/.cache/dremio_client/catalog.sqlite
+    :param max_age: staleness budget, seconds for which a stored entity is served without any check
+    """
+
+    def __init__(self, path=None, max_age=300):
+        self.path = path or os.path.join(os.path.expanduser('~'), '.cache', 'dremio_client', 'catalog.sqlite')
+        self.max_age = max_age
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        if self._conn.execute('pragma user_version').fetchone()[0] != _VERSION:
+            # the store only holds copies of server data, an older layout is simply dropped
+            for table in _TABLES:
+                self._conn.execute('drop table if exists ' + table)
+            self._conn.execute('pragma user_version = {}'.format(_VERSION))
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, server, cid=None, path=None, user=''):
+        """
+        look up a stored entity by id or, failing that, by path
+
+        :param server: base url of the Dremio instance
+        :param cid: entity id
+        :param path: entity path as a list
+        :param user: user the entity was fetched as
+        :return: tuple of entity json, tag and fetch time, or None
+        """
+        with self._lock:
+            row = None
+            if cid is not None:
+                row = self._conn.execute('select data, tag, fetched from entities '
+                                         'where server = ? and user = ? and id = ?', (server, user, cid)).fetchone()
+            if row is None and path:
+                row = self._conn.execute('select data, tag, fetched from entities '
+                                         'where server = ? and user = ? and path = ?',
+                                         (server, user, _path(path))).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def put(self, server, data, cid=None, user=''):
+        """
+        store an entity
+
+        :param server: base url of the Dremio instance
+        :param data: entity json as returned by catalog_item (or the catalog listing)
+        :param cid: id to store the entity under, defaults to its own id
+        :param user: user the entity was fetched as
+        """
+        cid = data.get('id') if cid is None else cid
+        path = _path(data['path']) if data.get('path') else None
+        with self._lock:
+            self._conn.execute('insert or replace into entities (server, user, id, path, tag, fetched, data) '
+                               'values (?, ?, ?, ?, ?, ?, ?)',
+                               (server, user, cid, path, data.get('tag'), time.time(), json.dumps(data)))
+            if path is not None and data.get('fields'):
+                self._conn.execute('delete from columns where server = ? and user = ? and path = ?',
+                                   (server, user, path))
+                self._conn.executemany('insert into columns (server, user, path, name, type) values (?, ?, ?, ?, ?)',
+                                       [(server, user, path, name, column_type)
+                                        for name, column_type in flatten_fields(data['fields'])])
+
+    def columns(self, server, user=''):
+        """
+        the stored columns of the datasets of a server
+
+        Columns are only returned while their dataset is within the staleness budget
+
+        :param server: base url of the Dremio instance
+        :param user: user the datasets were fetched as
+        :return: generator of dataset path (as a list) and list of (column name, type name)
+        """
+        with self._lock:
+            rows = self._conn.execute('select c.path, c.name, c.type from columns c join entities e '
+                                      'on e.server = c.server and e.user = c.user and e.path = c.path '
+                                      'where c.server = ? and c.user = ? and e.fetched >= ? order by c.path, c.rowid',
+                                      (server, user, time.time() - self.max_age)).fetchall()
+        path, columns = None, list()
+        for row in rows:
+            if row[0] != path:
+                if columns:
+                    yield json.loads(path), columns
+                path, columns = row[0], list()
+            columns.append((row[1], row[2]))
+        if columns:
+            yield json.loads(path), columns
+
+    def invalidate(self, server, cid=None, path=None):
+        """
+        remove an entity and its parent's listing for all users, eg after it was changed
+
+        :param server: base url of the Dremio instance
+        :param cid: entity id
+        :param path: entity path as a list
+        """
+        with self._lock:
+            if cid is not None:
+                self._conn.execute('delete from columns where server = ? and path in '
+                                   '(select path from entities where server = ? and id = ?)', (server, server, cid))
+                self._conn.execute('delete from entities where server = ? and id = ?', (server, cid))
+            if path:
+                self._conn.execute('delete from entities where server = ? and path in (?, ?)',
+                                   (server, _path(path), _path(path[:-1])))
+                self._conn.execute('delete from columns where server = ? and path = ?', (server, _path(path)))
+                if len(path) == 1:
+                    self._conn.execute('delete from entities where server = ? and id = ?', (server, _ROOT))
+
+    def clear(self, server=None):
+        """ remove all entities, or those of one server """
+        with self._lock:
+            for table in _TABLES:
+                if server is None:
+                    self._conn.execute('delete from ' + table)
+                else:
+                    self._conn.execute('delete from ' + table + ' where server = ?', (server,))
+
+    def fresh(self, fetched):
+        """ True if an entity fetched at the given time is within the staleness budget """
+        return time.time() - fetched <= self.max_age
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _path(path):
+    return json.dumps([p.replace('"', '') for p in path])
+
+
+def get_store():
+    """ return the catalog store in use, or None if catalog metadata is not stored """
+    return _store
+
+
+def set_store(store):
+    """ replace the catalog store used by all catalogs
+
+    :param store: CatalogStore or None to disable the store
+    :return: the previous store or None
+    """
+    global _store
+    with _lock:
+        old, _store = _store, store
+    return old
+
+
+def configure_store(config):
+    """ set up the catalog store from the ``catalog.cache`` section of a config
+
+    The store is only created if ``catalog.cache.enabled`` is set. An existing store for the same file is kept
+
+    :param config: config dict from confuse
+    :return: CatalogStore or None
+    """
+    global _store
+    try:
+        settings = config['catalog']['cache']
+        if not settings['enabled'].get(bool):
+            return _store
+        path = settings['path'].get() or None
+        max_age = settings['maxage'].get(int)
+    except NotFoundError:
+        return _store
+    with _lock:
+        if _store is None or (path is not None and _store.path != path):
+            _store = CatalogStore(path, max_age)
+        _store.max_age = max_age
+        return _store
+
+
+def catalog(token, base_url, ssl_verify=True, user=None):
+    """ the root catalog listing, served from the catalog store while it is within the staleness budget
+
+    see endpoints.catalog
+
+    :param user: name of the user the token belongs to, entries are only shared by the same user. Without a user
+                 they are only shared by the same token
+    """
+    store = _store
+    if store is not None:
+        stored = store.get(base_url, _ROOT, user=_user(token, user))
+        if stored is not None and store.fresh(stored[2]):
+            return stored[0]
+    data = _catalog(token, base_url, ssl_verify=ssl_verify)
+    if store is not None:
+        store.put(base_url, data, _ROOT, _user(token, user))
+    return data
+
+
+def catalog_item(token, base_url, cid=None, path=None, tag=None, ssl_verify=True, user=None):
+    """ a catalog entity, served from the catalog store if it is still valid
+
+    see endpoints.catalog_item
+
+    :param tag: tag of the entity as reported by its parent, used to revalidate datasets
+    :param user: name of the user the token belongs to, see catalog
+    """
+    store = _store
+    if store is not None:
+        stored = store.get(base_url, cid, path, _user(token, user))
+        if stored is not None:
+            data, stored_tag, fetched = stored
+            if store.fresh(fetched) or \
+                    (tag is not None and tag == stored_tag and data.get('entityType') == 'dataset'):
+                return data
+    data = _catalog_item(token, base_url, cid, path, ssl_verify=ssl_verify)
+    if store is not None:
+        store.put(base_url, data, user=_user(token, user))
+    return data
+
+
+def _user(token, user):
+    # the token itself is not written to disk
+    return user if user is not None else 'token:' + hashlib.sha256((token or '').encode('utf-8')).hexdigest()
+
+
+def columns(token, base_url, user=None):
+    """ the stored columns of the datasets of a server, see CatalogStore.columns. Nothing if there is no store
+
+    :param user: name of the user the token belongs to, see catalog
+    """
+    store = _store
+    if store is None:
+        return iter(())
+    return store.columns(base_url, _user(token, user))
+
+
+def invalidate(base_url, cid=None, path=None):
+    """ drop an entity (and its parent's listing) from the catalog store, if there is one """
+    store = _store
+    if store is not None:
+        store.invalidate(base_url, cid, path)
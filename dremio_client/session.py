@@ -0,0 +1,121 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from confuse import NotFoundError
+
+_DEFAULT_POOL_CONNECTIONS = 10
+_DEFAULT_POOL_MAXSIZE = 10
+_DEFAULT_MAX_RETRIES = 0
+
+_session = None
+_settings = None
+_custom = object()
+_lock = threading.Lock()
+
+
+def make_session(pool_connections=_DEFAULT_POOL_CONNECTIONS, pool_maxsize=_DEFAULT_POOL_MAXSIZE,
+                 max_retries=_DEFAULT_MAX_RETRIES):
+    """ create a requests session which pools keep-alive connections
+
+    Connections are pooled per host. ``pool_connections`` is the number of hosts to keep pools for and
+    ``pool_maxsize`` the number of connections kept open to each host.
+
+    :param pool_connections: number of per-host connection pools to cache
+    :param pool_maxsize: maximum number of connections to keep open per host
+    :param max_retries: number of retries for failed connections
+    :return: requests.Session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=max_retries)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session():
+    """ return the shared session used by all rest endpoints
+
+    The session is created on first use with the default pool sizes
+
+    :return: requests.Session
+    """
+    global _session, _settings
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = make_session()
+                _settings = (_DEFAULT_POOL_CONNECTIONS, _DEFAULT_POOL_MAXSIZE, _DEFAULT_MAX_RETRIES)
+    return _session
+
+
+def set_session(session):
+    """ replace the shared session used by all rest endpoints
+
+    A session set here is not replaced when a client is created from config. Pass None to go back to the default
+
+    :param session: requests.Session (or compatible object) to use for all requests
+    :return: the previous session or None
+    """
+    global _session, _settings
+    with _lock:
+        old, _session, _settings = _session, session, (_custom if session is not None else None)
+    return old
+
+
+def configure_session(config):
+    """ set up the shared session from the ``http`` section of a config
+
+    The existing session (and its warm connections) is kept if the pool settings are unchanged
+
+    :param config: config dict from confuse
+    :return: requests.Session
+    """
+    global _session, _settings
+    settings = pool_settings(config)
+    with _lock:
+        if _settings is not _custom and settings != _settings:
+            _session = make_session(*settings)
+            _settings = settings
+        return _session
+
+
+def pool_settings(config):
+    """ read the connection pool settings from the ``http`` section of a config
+
+    :param config: config dict from confuse
+    :return: tuple of pool_connections, pool_maxsize, max_retries
+    """
+    return (_get_int(config['http']['pool'], 'connections', _DEFAULT_POOL_CONNECTIONS),
+            _get_int(config['http']['pool'], 'maxsize', _DEFAULT_POOL_MAXSIZE),
+            _get_int(config['http'], 'retries', _DEFAULT_MAX_RETRIES))
+
+
+def _get_int(config, key, default):
+    try:
+        return config[key].get(int)
+    except NotFoundError:
+        return default
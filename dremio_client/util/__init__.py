@@ -22,6 +22,10 @@
 # under the License.
 #
 
-from .query import run, run_async, refresh_metadata
+from .query import run, run_async, refresh_metadata, wait_for_job
+from .polling import PollingStrategy, FixedPolling, ExponentialBackoff
+from .jobs import JobTracker, get_tracker
+from .cache import ResultCache
 
-__all__ = ['run', 'run_async', 'refresh_metadata']
+__all__ = ['run', 'run_async', 'refresh_metadata', 'wait_for_job', 'PollingStrategy', 'FixedPolling',
+           'ExponentialBackoff', 'JobTracker', 'get_tracker', 'ResultCache']
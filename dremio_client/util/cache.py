@@ -0,0 +1,389 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""On-disk cache of query results
+
+Results are stored as arrow ipc files, one per query, keyed by the server, the user, the normalised sql and the
+query context. Each entry records the catalog ``tag`` of the datasets the query reads from; the entry is dropped
+once any of those tags change, once it is older than the ttl, or when it is the least recently used entry and the
+cache has grown beyond its size limit.
+"""
+import base64
+import datetime
+import decimal
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from ..error import DremioException
+from ..model.endpoints import catalog_item
+from .compat import replace
+from .convert import combine_batches, page_to_batch, to_arrow_schema
+from .export import check_ipc_compression, ipc_file_writer
+
+_WHITESPACE = re.compile(r'\s+')
+_LITERAL = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+_IDENTIFIER = r'(?:"(?:[^"]|"")+"|[\w$@-]+)'
+_TABLE_REF = re.compile(r'\b(?:FROM|JOIN)\s+({0}(?:\s*\.\s*{0})*)'.format(_IDENTIFIER), re.IGNORECASE)
+_PATH_PART = re.compile(_IDENTIFIER)
+# functions taking a FROM argument, eg EXTRACT(YEAR FROM col), whose FROM does not start a table reference
+_FROM_FUNCTIONS = re.compile(r'\b(?:EXTRACT|TRIM|SUBSTRING|OVERLAY)\s*\($', re.IGNORECASE)
+_CTE_NAME = re.compile(r'(?:\bWITH|,)\s*({0})\s+AS\s*\('.format(_IDENTIFIER), re.IGNORECASE)
+_NUMBER = re.compile(r'^[0-9.]+$')
+_COMMENT = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+_READ_STATEMENT = re.compile(r'^[\s(]*(?:SELECT|WITH|VALUES)\b', re.IGNORECASE)
+_WRITE_KEYWORD = re.compile(r'\b(?:INSERT|CREATE|DROP|ALTER|UPDATE|DELETE|MERGE|TRUNCATE|REFRESH)\b', re.IGNORECASE)
+_METADATA_KEY = b'dremio_client.cache'
+_SCHEMA_KEY = b'dremio_client.schema'
+
+
+def normalise_sql(sql):
+    """
+    normalise an sql statement for use as a cache key
+
+    Whitespace outside of string literals and quoted identifiers is collapsed and a trailing semicolon removed.
+    Case is preserved as literals and quoted identifiers are case sensitive
+
+    :param sql: sql statement
+    :return: normalised sql
+    """
+    parts = _LITERAL.split(sql.strip().rstrip(';').strip())
+    return ''.join(p if i % 2 else _WHITESPACE.sub(' ', p) for i, p in enumerate(parts))
+
+
+def is_read_only(sql):
+    """
+    whether an sql statement only reads, ie is a SELECT, WITH or VALUES statement which does not write anything
+
+    Best effort: a statement is only considered read only if it starts with one of those keywords and no write
+    keyword (INSERT, CREATE, DROP...) appears outside string literals and quoted identifiers
+
+    :param sql: sql statement
+    :return: bool
+    """
+    unquoted = _COMMENT.sub(' ', ''.join(p if i % 2 == 0 else "''" for i, p in enumerate(_LITERAL.split(sql))))
+    return bool(_READ_STATEMENT.match(unquoted)) and not _WRITE_KEYWORD.search(unquoted)
+
+
+def referenced_datasets(sql):
+    """
+    best effort list of the datasets an sql statement reads from
+
+    Any dotted (and possibly quoted) name following FROM or JOIN is returned, except for common table expression
+    names, numbers and the FROM arguments of functions such as EXTRACT and TRIM
+
+    :param sql: sql statement
+    :return: list of dataset paths, each a list of path elements
+    """
+    unquoted = ''.join(p if i % 2 == 0 or p.startswith('"') else "''"
+                       for i, p in enumerate(_LITERAL.split(sql)))
+    ctes = set(_unquote(name).lower() for name in _CTE_NAME.findall(unquoted))
+    paths = list()
+    for match in _TABLE_REF.finditer(unquoted):
+        path = [_unquote(p) for p in _PATH_PART.findall(match.group(1))]
+        if len(path) == 1 and (path[0].lower() in ctes or _NUMBER.match(path[0])):
+            continue
+        if _in_from_function(unquoted, match.start()):
+            continue
+        if path not in paths:
+            paths.append(path)
+    return paths
+
+
+def _unquote(part):
+    return part[1:-1].replace('""', '"') if part.startswith('"') else part
+
+
+def _in_from_function(sql, position):
+    # find the innermost parenthesis open at position and check whether a FROM function opened it
+    depth = 0
+    for i in range(position - 1, -1, -1):
+        if sql[i] == ')':
+            depth += 1
+        elif sql[i] == '(':
+            if not depth:
+                return bool(_FROM_FUNCTIONS.search(sql[:i + 1]))
+            depth -= 1
+    return False
+
+
+def dataset_tag(token, base_url, path, ssl_verify=True):
+    """
+    current catalog tag of a dataset
+
+    :param token: API token from auth
+    :param base_url: base url of Dremio instance
+    :param path: dataset path as a list of path elements
+    :param ssl_verify: verify ssl on web requests
+    :return: tag, or None if the path does not resolve to a catalog entry
+    """
+    try:
+        return catalog_item(token, base_url, path=path, ssl_verify=ssl_verify).get('tag')
+    except DremioException:
+        return None
+
+
+def dataset_tags(token, base_url, sql, ssl_verify=True):
+    """
+    catalog tags of all datasets an sql statement reads from
+
+    :param token: API token from auth
+    :param base_url: base url of Dremio instance
+    :param sql: sql statement
+    :param ssl_verify: verify ssl on web requests
+    :return: list of [path, tag] pairs for the datasets which resolve in the catalog
+    """
+    tags = [[path, dataset_tag(token, base_url, path, ssl_verify)] for path in referenced_datasets(sql)]
+    return [t for t in tags if t[1] is not None]
+
+
+try:
+    import pyarrow as pa
+
+    class ResultCache(object):
+        """
+        on-disk cache of query results stored as arrow ipc files
+
+        Cached tables are memory mapped when read. Uncompressed entries (the default) are read without copying, the
+        data is paged in from disk as it is accessed. Compressed entries take less space but are decompressed in full
+        when read. The cache may be shared by several processes.
+
+        :param path: cache directory, defaults to ~/.cache/dremio_client
+        :param ttl: seconds an entry stays valid
+        :param max_size: maximum total size of the cache in bytes, least recently used entries are evicted first
+        :param compression: ipc compression codec (zstd or lz4) or None. Compression needs pyarrow 2.0 or later
+        :raise: NotImplementedError if compression is requested from an older pyarrow
+        """
+
+        def __init__(self, path=None, ttl=24 * 3600, max_size=1024 ** 3, compression=None):
+            self.path = path or os.path.join(os.path.expanduser('~'), '.cache', 'dremio_client')
+            self.ttl = ttl
+            self.max_size = max_size
+            check_ipc_compression(compression)
+            self.compression = compression
+            self._lock = threading.Lock()
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+
+        @staticmethod
+        def key(base_url, sql, context=None, user=None):
+            """
+            cache key of a query
+
+            Results depend on the permissions of the user running the query, so users never share entries
+
+            :param base_url: base url of the Dremio instance the query runs on
+            :param sql: sql statement
+            :param context: optional query context
+            :param user: name of the user running the query
+            :return: key string
+            """
+            data = json.dumps([base_url, user, normalise_sql(sql), list(context or [])])
+            return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+        def get(self, key, tag=None):
+            """
+            fetch a cached result
+
+            :param key: cache key
+            :param tag: optional callable returning the current catalog tag of a dataset path. Entries recorded with
+                        different tags are invalidated
+            :return: memory mapped pyarrow.Table, or None on a miss
+            """
+            filename = self._filename(key)
+            try:
+                source = pa.memory_map(filename)
+            except (IOError, OSError):
+                return None
+            try:
+                reader = pa.ipc.open_file(source)
+                meta = json.loads(reader.schema.metadata[_METADATA_KEY].decode('utf-8'))
+                valid = time.time() - meta['created'] <= self.ttl and \
+                    (tag is None or all(tag(path) == t for path, t in meta['datasets']))
+                table = reader.read_all() if valid else None
+            except (pa.ArrowInvalid, KeyError, TypeError, ValueError):
+                table = None
+            if table is None:
+                source.close()
+                logging.debug('dropping expired or invalid cache entry %s', key)
+                self._remove(filename)
+                return None
+            try:
+                os.utime(filename, None)
+            except OSError:
+                pass
+            return table.replace_schema_metadata(_strip(table.schema.metadata))
+
+        def put(self, key, table, datasets=None):
+            """
+            store a result
+
+            :param key: cache key
+            :param table: pyarrow.Table or pandas dataframe
+            :param datasets: list of [path, tag] pairs of the datasets the result was read from
+            :return: the stored pyarrow.Table
+            """
+            if not isinstance(table, pa.Table):
+                table = pa.Table.from_pandas(table, preserve_index=False)
+            meta = dict(table.schema.metadata or {})
+            meta[_METADATA_KEY] = json.dumps({'created': time.time(), 'datasets': datasets or []}).encode('utf-8')
+            stored = table.replace_schema_metadata(meta)
+            filename = self._filename(key)
+            tmp = '{}.{}.{}.tmp'.format(filename, os.getpid(), threading.current_thread().ident)
+            with pa.OSFile(tmp, 'wb') as sink:
+                writer = ipc_file_writer(sink, stored.schema, self.compression)
+                try:
+                    writer.write_table(stored)
+                finally:
+                    writer.close()
+            replace(tmp, filename)
+            self._evict()
+            return table
+
+        def invalidate(self, key):
+            """ remove a single entry """
+            self._remove(self._filename(key))
+
+        def clear(self):
+            """ remove all entries """
+            for filename, _, _ in self._entries():
+                self._remove(filename)
+
+        def size(self):
+            """ total size of the cached entries in bytes """
+            return sum(size for _, size, _ in self._entries())
+
+        def _filename(self, key):
+            return os.path.join(self.path, key + '.arrow')
+
+        def _entries(self):
+            entries = list()
+            for name in os.listdir(self.path):
+                if not name.endswith('.arrow'):
+                    continue
+                filename = os.path.join(self.path, name)
+                try:
+                    stat = os.stat(filename)
+                except OSError:
+                    continue
+                entries.append((filename, stat.st_size, stat.st_mtime))
+            return entries
+
+        def _evict(self):
+            with self._lock:
+                entries = sorted(self._entries(), key=lambda e: e[2])
+                total = sum(size for _, size, _ in entries)
+                for filename, size, _ in entries:
+                    if total <= self.max_size:
+                        break
+                    logging.debug('evicting cache entry %s', filename)
+                    self._remove(filename)
+                    total -= size
+
+        @staticmethod
+        def _remove(filename):
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+
+    def cached_pages(cache, run, token, base_url, query, context=None, ssl_verify=True, page_size=500, user=None):
+        """
+        rest result pages of a query, served from the cache when possible
+
+        Results are only stored once all pages have been consumed. Pages read from the cache hold the same json
+        values as the pages of the rest api: temporal values are strings, decimals are numbers and null values are
+        left out of their row
+
+        :param cache: ResultCache
+        :param run: callable returning the result pages of the query when it is not cached
+        :param token: API token from auth
+        :param base_url: base url of Dremio instance
+        :param query: valid sql query
+        :param context: optional context in which to execute the query
+        :param ssl_verify: verify ssl on web requests
+        :param page_size: number of rows per page read from the cache
+        :param user: name of the user the token belongs to. Entries are only shared by the same user, without a user
+                     they are only shared by the same token
+        :return: generator of json result pages
+        """
+        key = cache.key(base_url, query, context, user if user is not None else token)
+        table = cache.get(key, lambda path: dataset_tag(token, base_url, path, ssl_verify))
+        metadata = (table.schema.metadata or {}) if table is not None else {}
+        if _SCHEMA_KEY in metadata:
+            schema = json.loads(metadata[_SCHEMA_KEY].decode('utf-8'))
+            for batch in table.to_batches(max_chunksize=page_size):
+                yield {'rowCount': table.num_rows, 'schema': schema, 'rows': _json_rows(batch)}
+            return
+        datasets = dataset_tags(token, base_url, query, ssl_verify)
+        schema, arrow_schema, batches = list(), None, list()
+        for page in run():
+            if arrow_schema is None:
+                schema, arrow_schema = page['schema'], to_arrow_schema(page['schema'])
+            batches.append(page_to_batch(page, arrow_schema))
+            yield page
+        table = combine_batches(batches, arrow_schema)
+        table = table.replace_schema_metadata({_SCHEMA_KEY: json.dumps(schema).encode('utf-8')})
+        cache.put(key, table, datasets)
+
+    def _json_rows(batch):
+        names = batch.schema.names
+        columns = [[_json_value(v) for v in column.to_pylist()] for column in batch.columns]
+        return [dict((name, v) for name, v in zip(names, row) if v is not None) for row in zip(*columns)]
+
+    def _json_value(value):
+        # the inverse of page_to_batch: back to the values found in a rest result page
+        if isinstance(value, datetime.datetime):
+            return value.strftime('%Y-%m-%d %H:%M:%S.') + '{:03d}'.format(value.microsecond // 1000)
+        if isinstance(value, datetime.date):
+            return value.isoformat()
+        if isinstance(value, datetime.time):
+            return value.strftime('%H:%M:%S.') + '{:03d}'.format(value.microsecond // 1000)
+        if isinstance(value, decimal.Decimal):
+            return int(value) if value.as_tuple().exponent >= 0 else float(value)
+        if isinstance(value, bytes):
+            try:
+                return value.decode('utf-8')
+            except UnicodeDecodeError:
+                return base64.b64encode(value).decode('ascii')
+        if isinstance(value, dict):
+            return dict((k, _json_value(v)) for k, v in value.items() if v is not None)
+        if isinstance(value, list):
+            return [_json_value(v) for v in value]
+        return value
+
+    def _strip(metadata):
+        metadata = dict(metadata or {})
+        metadata.pop(_METADATA_KEY, None)
+        return metadata or None
+
+except ImportError:
+    def ResultCache(*args, **kwargs):
+        raise NotImplementedError("The result cache requires pyarrow")
+
+    def cached_pages(*args, **kwargs):
+        raise NotImplementedError("The result cache requires pyarrow")
@@ -0,0 +1,173 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Find what changed in a catalog since a snapshot
+
+A snapshot maps entity ids to their path, tag and type, it is a plain dict which can be stored as json. Comparing
+it to the live catalog costs one request per space and folder: dataset tags are read from their parent's listing and
+a dataset is only fetched when the listing does not include its tag.
+
+Sources are not descended into unless asked for (``sources=True``), so by default physical datasets, which all live
+in sources, are never reported. Walking sources costs a request per source folder and usually one per dataset too,
+as source listings carry no tags.
+"""
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from ..error import DremioNotFoundException
+from ..model.endpoints import catalog as _catalog, catalog_item
+from ..model.store import invalidate
+
+Change = namedtuple('Change', ['kind', 'id', 'path', 'entity_type', 'tag'])
+Change.__doc__ = """
+a change to a catalog entity, ``kind`` is 'added', 'removed' or 'modified' (new tag or moved)
+"""
+
+CatalogDiff = namedtuple('CatalogDiff', ['added', 'removed', 'modified', 'snapshot'])
+CatalogDiff.__doc__ = """
+changes between a snapshot and the live catalog, ``snapshot`` is the new snapshot to diff against next time
+"""
+
+_EXPANDED = ('space', 'folder')
+_SKIPPED = ('home', 'file')
+
+
+def diff_catalog(catalog, snapshot=None, max_workers=8, prune=False, sources=False):
+    """
+    compare a snapshot of id -> tag against the live catalog
+
+    By default the walk covers what serialize_catalog exports: homes and files are skipped and sources are not
+    descended into, so physical datasets are not compared. Pass ``sources`` to compare the folders and (promoted)
+    datasets of sources too. Entries of the catalog store for changed entities are invalidated.
+
+    :param catalog: dremio data catalog (or sub-catalog) to compare
+    :param snapshot: snapshot from a previous diff, None to treat every entity as added
+    :param max_workers: maximum number of concurrent requests
+    :param prune: skip containers whose tag is the same as in the snapshot, keeping their subtree from the snapshot.
+                  Dremio only changes a container's tag when the container itself is edited, so this misses changes
+                  below it; only turn on for servers known to propagate tags to their parents
+    :param sources: descend into sources to compare physical datasets as well. Use the same value for every diff
+                    of a snapshot, otherwise all source entities are reported as added (or removed)
+    :return: CatalogDiff
+    """
+    old = snapshot or dict()
+    below = dict()
+    for cid, entry in old.items():
+        below.setdefault(tuple(entry['path'][:-1]), list()).append(cid)
+    token, base_url, ssl_verify = catalog._token, catalog._base_url, catalog._ssl_verify
+    expanded = _EXPANDED + ('source',) if sources else _EXPANDED
+    entity_type = getattr(catalog.meta, 'entityType', None)
+    if entity_type in _EXPANDED + ('source',):
+        entries = [{'id': catalog.meta.id, 'path': catalog.meta.path, 'entityType': entity_type}]
+    else:
+        entries = _catalog(token, base_url, ssl_verify=ssl_verify)['data']
+
+    def fetch(entry):
+        try:
+            return catalog_item(token, base_url, cid=entry['id'], ssl_verify=ssl_verify)
+        except DremioNotFoundException:  # removed while walking
+            return None
+
+    new = dict()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while entries:
+            fetched = list()
+            for entry in entries:
+                kind = _entity_type(entry)
+                if kind in _SKIPPED:
+                    continue
+                before = old.get(entry['id'])
+                tag = entry.get('tag')
+                if kind in expanded and prune and tag is not None and before is not None \
+                        and before['tag'] == tag and before['path'] == entry['path']:
+                    _keep(entry['id'], old, below, new)
+                elif kind in expanded or tag is None:
+                    fetched.append(entry)
+                else:
+                    new[entry['id']] = {'path': entry['path'], 'tag': tag, 'type': kind}
+            entries = list()
+            for entry, item in zip(fetched, pool.map(fetch, fetched)):
+                if item is None:
+                    continue
+                kind = _entity_type(entry)
+                new[entry['id']] = {'path': item.get('path', entry['path']), 'tag': item.get('tag'), 'type': kind}
+                if kind in expanded:
+                    entries.extend(item.get('children') or list())
+
+    added, removed, modified = list(), list(), list()
+    for cid, entry in new.items():
+        before = old.get(cid)
+        if before is None:
+            added.append(_change('added', cid, entry))
+        elif before['tag'] != entry['tag'] or before['path'] != entry['path']:
+            modified.append(_change('modified', cid, entry))
+    for cid, entry in old.items():
+        if cid not in new:
+            removed.append(_change('removed', cid, entry))
+    for change in removed + modified:
+        invalidate(base_url, change.id, change.path)
+    return CatalogDiff(*[sorted(c, key=lambda i: i.path) for c in (added, removed, modified)], snapshot=new)
+
+
+def watch_catalog(catalog, snapshot=None, interval=60, max_workers=8, prune=False, sources=False):
+    """
+    poll a catalog for changes
+
+    Changes to physical datasets are only seen with ``sources``, see diff_catalog
+
+    :param catalog: dremio data catalog (or sub-catalog) to watch
+    :param snapshot: snapshot to report changes against, None to start from the current state of the catalog
+    :param interval: seconds between polls
+    :param max_workers: maximum number of concurrent requests
+    :param prune: see diff_catalog
+    :param sources: descend into sources to watch physical datasets as well, see diff_catalog
+    :return: never ending generator of Change, close it to stop watching
+    """
+    if snapshot is None:
+        snapshot = diff_catalog(catalog, None, max_workers, prune, sources).snapshot
+        time.sleep(interval)
+    while True:
+        diff = diff_catalog(catalog, snapshot, max_workers, prune, sources)
+        snapshot = diff.snapshot
+        for change in diff.removed + diff.modified + diff.added:
+            yield change
+        time.sleep(interval)
+
+
+def _entity_type(entry):
+    if entry.get('entityType'):
+        return entry['entityType']
+    if entry.get('type') == 'CONTAINER':
+        return (entry.get('containerType') or '').lower()
+    return (entry.get('type') or '').lower()
+
+
+def _keep(cid, old, below, new):
+    new[cid] = old[cid]
+    for child in below.get(tuple(old[cid]['path']), list()):
+        _keep(child, old, below, new)
+
+
+def _change(kind, cid, entry):
+    return Change(kind, cid, entry['path'], entry['type'], entry['tag'])
@@ -0,0 +1,317 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Convert rest job results into typed arrow tables or pandas dataframes
+
+The rest api returns result pages as ``{'rowCount': n, 'schema': [...], 'rows': [...]}``. The schema is used to
+build each column with its proper arrow type. Pages are converted to record batches one at a time so only a single
+page of json rows is alive at once.
+"""
+import datetime
+import decimal
+import itertools
+import json
+import logging
+import threading
+
+try:
+    import pyarrow as pa
+
+    _SIMPLE_TYPES = {
+        'BOOLEAN': pa.bool_(),
+        'TINYINT': pa.int8(),
+        'SMALLINT': pa.int16(),
+        'INTEGER': pa.int32(),
+        'BIGINT': pa.int64(),
+        'FLOAT': pa.float32(),
+        'DOUBLE': pa.float64(),
+        'VARCHAR': pa.string(),
+        'VARBINARY': pa.binary(),
+        'DATE': pa.date32(),
+        'TIME': pa.time32('ms'),
+        'TIMESTAMP': pa.timestamp('ms'),
+        'NULL': pa.null(),
+    }
+    _STRING_TYPES = (pa.string(), pa.binary())
+
+    def to_arrow_type(field_type):
+        """
+        map a Dremio type (as found in a rest result or catalog schema) to an arrow type
+
+        Types without an arrow equivalent (eg intervals) map to string
+
+        :param field_type: dict with at least a ``name`` key
+        :return: pyarrow.DataType
+        """
+        name = field_type.get('name')
+        if name in _SIMPLE_TYPES:
+            return _SIMPLE_TYPES[name]
+        if name == 'DECIMAL':
+            return pa.decimal128(field_type.get('precision', 38), field_type.get('scale', 0))
+        if name == 'STRUCT':
+            return pa.struct([pa.field(f['name'], to_arrow_type(f['type'])) for f in field_type.get('subSchema', [])])
+        if name == 'LIST':
+            children = field_type.get('subSchema', [])
+            return pa.list_(to_arrow_type(children[0]['type']) if children else pa.string())
+        return pa.string()
+
+    def to_arrow_schema(schema):
+        """
+        build an arrow schema from a Dremio result schema
+
+        :param schema: list of ``{'name': ..., 'type': {...}}`` dicts
+        :return: pyarrow.Schema
+        """
+        return pa.schema([pa.field(f['name'], to_arrow_type(f['type'])) for f in schema])
+
+    def _to_array(values, arrow_type):
+        if arrow_type not in _STRING_TYPES:
+            values = [None if v == '' else v for v in values]
+        if pa.types.is_decimal(arrow_type):
+            values = [None if v is None else decimal.Decimal(str(v)) for v in values]
+        if pa.types.is_time(arrow_type):
+            # the rest api returns times as 'HH:MM:SS.fff' strings which arrow can not cast
+            values = [_to_time(v) for v in values]
+        try:
+            return pa.array(values, type=arrow_type)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError):
+            pass
+        strings = pa.array([_to_string(v) for v in values], type=pa.string())
+        try:
+            return strings.cast(arrow_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            return strings
+
+    def _to_time(value):
+        if value is None or isinstance(value, datetime.time):
+            return value
+        try:
+            hms, _, fraction = str(value).partition('.')
+            hours, minutes, seconds = (int(part) for part in hms.split(':'))
+            return datetime.time(hours, minutes, seconds, int((fraction + '000000')[:6]))
+        except (ValueError, TypeError):
+            return value
+
+    def page_to_batch(page, schema=None):
+        """
+        convert a single rest result page to an arrow record batch
+
+        :param page: json result page as returned by job_results
+        :param schema: optional arrow schema, built from the page if not supplied
+        :return: pyarrow.RecordBatch
+        """
+        schema = schema or to_arrow_schema(page['schema'])
+        rows = page.get('rows', [])
+        arrays = [_to_array([row.get(field.name) for row in rows], field.type) for field in schema]
+        return pa.RecordBatch.from_arrays(arrays, schema=pa.schema([
+            pa.field(field.name, array.type) for field, array in zip(schema, arrays)]))
+
+    def to_arrow(pages):
+        """
+        convert rest result pages to an arrow table
+
+        Pages are consumed lazily, so passing the generator returned by ``run`` keeps a single page in memory
+
+        :param pages: iterable of json result pages as returned by job_results/run
+        :return: pyarrow.Table
+        """
+        schema = None
+        batches = list()
+        for page in pages:
+            if schema is None:
+                schema = to_arrow_schema(page['schema'])
+            batches.append(page_to_batch(page, schema))
+        return combine_batches(batches, schema)
+
+    def combine_batches(batches, schema):
+        """
+        combine record batches built by page_to_batch into a single table
+
+        Columns which fell back to string in some pages are converted to string in all of them
+
+        :param batches: list of record batches
+        :param schema: arrow schema the batches were built with
+        :return: pyarrow.Table
+        """
+        if not batches:
+            return pa.Table.from_batches([], schema=schema or pa.schema([]))
+        target = pa.schema([field if all(b.schema.field(i).type == field.type for b in batches)
+                            else pa.field(field.name, pa.string()) for i, field in enumerate(schema)])
+        return pa.Table.from_batches([b if b.schema == target else _cast(b, target) for b in batches])
+
+    def _cast(batch, schema):
+        # columns which could not be converted to their Dremio type in some page fall back to string in all pages
+        return pa.RecordBatch.from_arrays([c if c.type == f.type else _string_array(c)
+                                           for c, f in zip(batch.columns, schema)], schema=schema)
+
+    def _string_array(column):
+        try:
+            return column.cast(pa.string())
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            # arrow can not cast nested (struct, list) columns to string, they are written as json instead
+            return pa.array([_to_string(v) for v in column.to_pylist()], type=pa.string())
+
+    def _to_string(value):
+        if value is None:
+            return None
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, default=str, sort_keys=True)
+        return str(value)
+
+    def _conform(batch, schema):
+        # a stream can not change its schema once batches are out, columns which fell back to string are converted
+        # back to their type value by value
+        if batch.schema == schema:
+            return batch
+        return pa.RecordBatch.from_arrays([c if c.type == f.type else _coerce(c, f)
+                                           for c, f in zip(batch.columns, schema)], schema=schema)
+
+    def _coerce(column, field):
+        try:
+            return column.cast(field.type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            pass
+        values = list()
+        invalid = 0
+        for value in column.to_pylist():
+            array = _to_array([value], field.type)
+            if array.type == field.type:
+                values.append(array[0].as_py())
+            else:
+                values.append(None)
+                invalid += 1
+        if invalid:
+            logging.warning('%d values of column %s are not valid %s, they are read as null',
+                            invalid, field.name, field.type)
+        return pa.array(values, type=field.type)
+
+    class RestStream(object):
+        """
+        iterator over rest result pages converted to arrow record batches (or pandas dataframes)
+
+        The first page is fetched on construction so the schema is available before iterating. Every batch has that
+        schema: values a later page can not convert to their column's Dremio type are yielded as nulls
+
+        :param pages: iterable of json result pages as returned by job_results/run
+        :param pandas: yield pandas dataframes rather than arrow record batches
+        """
+
+        def __init__(self, pages, pandas=False):
+            self._pages = iter(pages)
+            self._first = next(self._pages, None)
+            self.schema = to_arrow_schema(self._first['schema']) if self._first else pa.schema([])
+            self._pandas = pandas
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc_val, exc_tb):
+            self.close()
+
+        def __iter__(self):
+            first, self._first = self._first, None
+            pages = itertools.chain([first], self._pages) if first else self._pages
+            for page in pages:
+                batch = _conform(page_to_batch(page, self.schema), self.schema)
+                yield batch.to_pandas() if self._pandas else batch
+
+        def close(self):
+            if hasattr(self._pages, 'close'):
+                self._pages.close()
+
+    def to_pandas(pages, low_memory=False, memory_pool=None):
+        """
+        convert rest result pages to a pandas dataframe via arrow
+
+        :param pages: iterable of json result pages as returned by job_results/run
+        :param low_memory: use the low memory conversion, see table_to_pandas
+        :param memory_pool: arrow memory pool to allocate the dataframe from
+        :return: pandas.DataFrame
+        """
+        return table_to_pandas(to_arrow(pages), low_memory, memory_pool)
+
+    def table_to_pandas(table, low_memory=False, memory_pool=None):
+        """
+        convert an arrow table to a pandas dataframe
+
+        With ``low_memory`` each column's arrow buffers are released as soon as it has been converted
+        (``self_destruct``), columns are not consolidated into 2d blocks (``split_blocks``) and string columns become
+        categoricals. This roughly halves the peak memory of the conversion but leaves the table unusable, so the
+        caller must not hold any other reference to it or its batches.
+
+        The peak memory allocated by the conversion, in bytes, is recorded in the dataframe's ``attrs`` under
+        ``conversion_peak_memory`` (and logged at debug level).
+
+        :param table: pyarrow.Table
+        :param low_memory: use the low memory conversion
+        :param memory_pool: arrow memory pool to allocate from, defaults to pyarrow's default pool
+        :return: pandas.DataFrame
+        """
+        # a proxy pool tracks the peak of this conversion alone
+        pool = pa.proxy_memory_pool(memory_pool or pa.default_memory_pool())
+        rows, nbytes = table.num_rows, table.nbytes
+        if low_memory:
+            df = table.to_pandas(memory_pool=pool, split_blocks=True, self_destruct=True, strings_to_categorical=True)
+        else:
+            df = table.to_pandas(memory_pool=pool)
+        peak = pool.max_memory()
+        logging.debug('converted %d rows (%d arrow bytes) to pandas, peak conversion memory %d bytes',
+                      rows, nbytes, peak)
+        if hasattr(df, 'attrs'):  # pandas >= 1.0
+            df.attrs['conversion_peak_memory'] = peak
+        _keep_alive(pool)
+        return df
+
+    _proxy_pools = list()
+    _proxy_pools_lock = threading.Lock()
+
+    def _keep_alive(pool):
+        # the dataframe may still own buffers from the proxy, which must not be freed before they are
+        with _proxy_pools_lock:
+            _proxy_pools[:] = [p for p in _proxy_pools if p.bytes_allocated()]
+            _proxy_pools.append(pool)
+
+except ImportError:
+    def to_arrow_type(*args, **kwargs):
+        raise NotImplementedError("Arrow conversion requires pyarrow")
+
+    def to_arrow_schema(*args, **kwargs):
+        raise NotImplementedError("Arrow conversion requires pyarrow")
+
+    def page_to_batch(*args, **kwargs):
+        raise NotImplementedError("Arrow conversion requires pyarrow")
+
+    def to_arrow(*args, **kwargs):
+        raise NotImplementedError("Arrow conversion requires pyarrow")
+
+    def combine_batches(*args, **kwargs):
+        raise NotImplementedError("Arrow conversion requires pyarrow")
+
+    def to_pandas(*args, **kwargs):
+        raise NotImplementedError("Arrow conversion requires pyarrow")
+
+    def table_to_pandas(*args, **kwargs):
+        raise NotImplementedError("Arrow conversion requires pyarrow")
+
+    def RestStream(*args, **kwargs):
+        raise NotImplementedError("Arrow conversion requires pyarrow")
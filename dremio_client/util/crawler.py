@@ -0,0 +1,164 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Walk a catalog tree concurrently
+
+A full walk of a large catalog makes several blocking requests per entity: the entity itself (which lists its
+children) and, for sources and datasets, its tags and wiki. The crawler runs these requests on a bounded pool of
+workers and yields each entity as soon as it has been fetched.
+"""
+import threading
+from collections import namedtuple
+
+try:
+    from queue import Queue, LifoQueue
+except ImportError:
+    from Queue import Queue, LifoQueue
+
+from ..error import DremioBadRequestException, DremioNotFoundException
+
+CrawledEntity = namedtuple('CrawledEntity', ['position', 'item', 'tags', 'wiki'])
+CrawledEntity.__doc__ = """
+a fully fetched catalog entity
+
+``position`` is a tuple of child indexes giving the place of the entity in a depth first walk, sorting by it
+restores the order of a serial walk. ``tags`` and ``wiki`` are None if they were not fetched or do not exist.
+"""
+
+_DONE = object()
+
+
+def crawl(catalog, max_workers=8, with_extra=True):
+    """
+    walk a catalog (or sub-catalog) concurrently, yielding entities as they are discovered
+
+    Fetched containers (spaces, folders) are expanded; homes and files are skipped and sources and datasets are
+    not descended into. The same walk as serialize_catalog has always done.
+
+    Pending requests sit on a single frontier shared by all workers: an idle worker takes the next request whichever
+    branch of the tree it belongs to. Newest requests are taken first so the walk stays roughly depth first and the
+    frontier small. Closing the generator stops the walk.
+
+    :param catalog: dremio data catalog (or sub-catalog)
+    :param max_workers: maximum number of concurrent requests
+    :param with_extra: also fetch tags and wiki of sources and datasets
+    :return: generator of CrawledEntity, in no particular order
+    """
+    return _Crawler(max_workers, with_extra).run(catalog)
+
+
+class _Entity(object):
+    __slots__ = ('position', 'item', 'tags', 'wiki', 'pending')
+
+    def __init__(self, position, item, pending):
+        self.position = position
+        self.item = item
+        self.tags = None
+        self.wiki = None
+        self.pending = pending
+
+
+class _Crawler(object):
+
+    def __init__(self, max_workers, with_extra):
+        self._max_workers = max_workers
+        self._with_extra = with_extra
+        self._frontier = LifoQueue()
+        self._results = Queue()
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._stopped = threading.Event()
+
+    def run(self, catalog):
+        self._expand(catalog, ())
+        if not self._outstanding:
+            return
+        workers = [threading.Thread(target=self._work) for _ in range(self._max_workers)]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+        try:
+            while True:
+                result = self._results.get()
+                if result is _DONE:
+                    return
+                if isinstance(result, Exception):
+                    raise result
+                yield result
+        finally:
+            self._stopped.set()
+            for _ in workers:
+                self._frontier.put(None)
+
+    def _push(self, fn, *args):
+        with self._lock:
+            self._outstanding += 1
+        self._frontier.put((fn, args))
+
+    def _work(self):
+        while True:
+            task = self._frontier.get()
+            if task is None or self._stopped.is_set():
+                return
+            fn, args = task
+            try:
+                fn(*args)
+            except Exception as e:  # NOQA
+                self._results.put(e)
+            with self._lock:
+                self._outstanding -= 1
+                done = self._outstanding == 0
+            if done:
+                self._results.put(_DONE)
+
+    def _expand(self, catalog, position):
+        for i, name in enumerate(list(catalog)):
+            self._push(self._fetch, catalog[name], position + (i,))
+
+    def _fetch(self, node, position):
+        item = node.get()
+        entity_type = item.meta.entityType
+        if entity_type in ('home', 'file'):
+            return
+        if entity_type in ('source', 'dataset') and self._with_extra:
+            entity = _Entity(position, item, 2)
+            self._push(self._extra, entity, 'tags')
+            self._push(self._extra, entity, 'wiki')
+            return
+        self._emit(_Entity(position, item, 0))
+        if entity_type not in ('source', 'dataset'):
+            self._expand(item, position)
+
+    def _extra(self, entity, kind):
+        try:
+            setattr(entity, kind, getattr(entity.item, kind)())
+        except (DremioBadRequestException, DremioNotFoundException):
+            pass
+        with self._lock:
+            entity.pending -= 1
+            done = entity.pending == 0
+        if done:
+            self._emit(entity)
+
+    def _emit(self, entity):
+        self._results.put(CrawledEntity(entity.position, entity.item, entity.tags, entity.wiki))
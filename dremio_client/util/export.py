@@ -0,0 +1,140 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Write streamed query results straight to parquet or arrow ipc files
+
+Batches are written as they arrive so memory stays bounded by a row group (parquet) or a batch (arrow) rather than
+by the size of the result.
+"""
+_FORMATS = ('parquet', 'arrow')
+_DEFAULT_COMPRESSION = {'parquet': 'snappy', 'arrow': None}
+_ARROW_COMPRESSION = ('lz4', 'zstd')
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # compressed ipc files can only be written by pyarrow 2.0 and later
+    _IPC_COMPRESSION = hasattr(pa.ipc, 'IpcWriteOptions')
+
+    def export(batches, path, file_format='parquet', schema=None, row_group_size=64 * 1024, compression='default'):
+        """
+        write a stream of record batches to a parquet or arrow ipc file
+
+        :param batches: iterable of record batches, eg a stream from ``flight.stream`` or ``DremioClient.query``
+        :param path: file path or writable file object
+        :param file_format: one of parquet or arrow
+        :param schema: arrow schema of the batches, defaults to ``batches.schema``
+        :param row_group_size: (parquet) number of rows buffered per row group
+        :param compression: codec name (eg snappy, gzip, zstd, lz4), none or default (snappy for parquet,
+            uncompressed for arrow). For arrow only lz4 and zstd are valid
+        :return: number of rows written
+        """
+        if file_format not in _FORMATS:
+            raise ValueError('unsupported export format {}, expected one of {}'.format(file_format, _FORMATS))
+        if compression == 'default':
+            compression = _DEFAULT_COMPRESSION[file_format]
+        if compression == 'none':
+            compression = None
+        if file_format == 'arrow' and compression not in (None,) + _ARROW_COMPRESSION:
+            raise ValueError('unsupported arrow compression {}, expected one of {} or none'.format(
+                compression, _ARROW_COMPRESSION))
+        schema = schema or batches.schema
+        if file_format == 'parquet':
+            return _write_parquet(batches, path, schema, row_group_size, compression)
+        return _write_arrow(batches, path, schema, compression)
+
+    def _write_parquet(batches, path, schema, row_group_size, compression):
+        rows = 0
+        buffered = list()
+        buffered_rows = 0
+        writer = pq.ParquetWriter(path, schema, compression=compression or 'none')
+        try:
+            for batch in batches:
+                buffered.append(batch)
+                buffered_rows += batch.num_rows
+                if buffered_rows >= row_group_size:
+                    written, buffered = _flush(writer, buffered, schema, row_group_size)
+                    rows += written
+                    buffered_rows -= written
+            if buffered_rows:
+                rows += _flush(writer, buffered, schema, row_group_size, final=True)[0]
+        finally:
+            writer.close()
+        return rows
+
+    def _flush(writer, batches, schema, row_group_size, final=False):
+        # only whole row groups are written, the remaining rows are carried over to the next group
+        table = pa.Table.from_batches(batches, schema=schema)
+        full = table.num_rows if final else table.num_rows - table.num_rows % row_group_size
+        writer.write_table(table.slice(0, full), row_group_size=row_group_size)
+        return full, table.slice(full).to_batches()
+
+    def _write_arrow(batches, path, schema, compression):
+        rows = 0
+        writer = ipc_file_writer(path, schema, compression)
+        try:
+            for batch in batches:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        finally:
+            writer.close()
+        return rows
+
+    def ipc_file_writer(sink, schema, compression=None):
+        """
+        open an arrow ipc file writer, compressed if a codec is given
+
+        Compressed ipc files need pyarrow 2.0 or later, uncompressed files are written by older versions too
+
+        :param sink: file path or writable file object
+        :param schema: arrow schema of the file
+        :param compression: codec name (lz4 or zstd) or None
+        :raise: NotImplementedError if compression is requested from a pyarrow older than 2.0
+        :return: pyarrow.ipc.RecordBatchFileWriter
+        """
+        if not compression:
+            return pa.ipc.new_file(sink, schema)
+        check_ipc_compression(compression)
+        return pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(compression=compression))
+
+    def check_ipc_compression(compression):
+        """
+        check that this pyarrow can write ipc files compressed with a codec
+
+        :param compression: codec name (lz4 or zstd) or None
+        :raise: NotImplementedError if compression is requested from a pyarrow older than 2.0
+        """
+        if compression and not _IPC_COMPRESSION:
+            raise NotImplementedError('{} compressed arrow files require pyarrow 2.0 or later, found {}'.format(
+                compression, pa.__version__))
+
+except ImportError:
+    def export(*args, **kwargs):
+        raise NotImplementedError("Exporting results requires pyarrow")
+
+    def ipc_file_writer(*args, **kwargs):
+        raise NotImplementedError("Exporting results requires pyarrow")
+
+    def check_ipc_compression(*args, **kwargs):
+        raise NotImplementedError("Exporting results requires pyarrow")
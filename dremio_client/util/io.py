@@ -22,50 +22,49 @@
 # specific language governing permissions and limitations
 # under the License.
 #
+import gzip
+import io
+from contextlib import contextmanager
+
 import simplejson as json
-from dremio_client.error import DremioNotFoundException, DremioBadRequestException
+from .crawler import crawl
+
+_GZIP_MAGIC = b'\x1f\x8b'
+# text streams take unicode on python 2, where json.dumps returns (ascii) str
+_text = type(u'')
 
 
-def _recursve_catalog(catalog):
+def _recursve_catalog(catalog, with_extra=True, max_workers=8):
     data = []
     acls = []
     collabs = {'tags': list(), 'wiki': list()}
-    for name in catalog:
-        item = catalog[name].get()
-        if item.meta.entityType == 'home':
-            continue
-        if item.meta.entityType != 'file':
-            if item.meta.entityType == 'source' or item.meta.entityType == 'dataset':
-                data.append(item)
-                acls.append(item.meta['accessControlList'])
-                try:
-                    collabs['tags'].append(item.tags())
-                except (DremioBadRequestException, DremioNotFoundException):
-                    pass
-                try:
-                    collabs['wiki'].append(item.wiki())
-                except (DremioBadRequestException, DremioNotFoundException):
-                    pass
-            else:
-                data.append(item)
-                d, a, c = _recursve_catalog(item)
-                data.extend(d)
-                acls.extend(a)
-                collabs['tags'].extend(c['tags'])
-                collabs['wiki'].extend(c['wiki'])
+    for entity in sorted(crawl(catalog, max_workers, with_extra), key=lambda e: e.position):
+        item = entity.item
+        data.append(item)
+        if item.meta.entityType == 'source' or item.meta.entityType == 'dataset':
+            acls.append(item.meta.accessControlList)
+            if entity.tags is not None:
+                collabs['tags'].append(entity.tags)
+            if entity.wiki is not None:
+                collabs['wiki'].append(entity.wiki)
     return data, acls, collabs
 
 
-def serialize_catalog(catalog, with_extra=False):
+def serialize_catalog(catalog, with_extra=False, max_workers=8):
     """
     export a catalog as json
 
+    The catalog is fetched concurrently, see crawler.crawl. The whole catalog is held in memory, use dump_catalog
+    to stream large catalogs to a file instead
+
     :note: Enterprise only: optionally include acl and collaboration data
     :param catalog: dremio data catalog (or sub-catalog)
     :param with_extra: export acl and collaboration data
+    :param max_workers: maximum number of concurrent requests to Dremio
     :return: json string
     """
-    data, acls, collabs = _recursve_catalog(catalog)
+    data, acls, collabs = _recursve_catalog(catalog, with_extra, max_workers)
+    data = [item.to_json() for item in data]
     if with_extra:
         return json.dumps(data), json.dumps(acls), json.dumps(collabs)
     else:
@@ -76,6 +75,8 @@ def deserialize_catalog(catalog, client):
     """
     turn a json string into a catalog/sub-catalog for a given client
 
+    Entities are only added to the local catalog, see restore.restore_catalog to create them on the server
+
     :param catalog: json document representing output
     :param client: client for a dremio host
     :return: fully reconstituted catalog
@@ -87,3 +88,96 @@ def deserialize_catalog(catalog, client):
     for item in data:
         client.data.add_by_path(json.loads(item))
     return client
+
+
+def dump_catalog(catalog, fp, with_extra=False, max_workers=8, compression=None):
+    """
+    stream a catalog to JSON Lines, one entity per line
+
+    Each entity is written as soon as the crawl has fetched it, nothing is held back to build one document. A parent
+    is always written before its children. Every line is an object with the entity under ``entity``, its place in a
+    serial walk under ``position`` and, with ``with_extra``, its ``tags`` and ``wiki``.
+
+    :note: Enterprise only: optionally include acl and collaboration data
+    :param catalog: dremio data catalog (or sub-catalog)
+    :param fp: file name or writable text stream (binary if compressing a stream)
+    :param with_extra: export acl and collaboration data
+    :param max_workers: maximum number of concurrent requests to Dremio
+    :param compression: 'gzip' or None. Defaults to gzip for file names ending in .gz
+    :return: number of entities written
+    """
+    count = 0
+    with _writer(fp, compression) as out:
+        for entity in crawl(catalog, max_workers, with_extra):
+            record = {'position': list(entity.position), 'entity': entity.item.meta._asdict()}
+            if with_extra:
+                record['tags'] = entity.tags
+                record['wiki'] = entity.wiki
+            out.write(_text(json.dumps(record)))
+            out.write(u'\n')
+            count += 1
+    return count
+
+
+def load_catalog(fp, client, compression=None):
+    """
+    read a catalog written by dump_catalog into the catalog of a given client, one line at a time
+
+    :param fp: file name or readable stream
+    :param client: client for a dremio host
+    :param compression: 'gzip' or None. Detected from the content for file names
+    :return: client with the reconstituted catalog
+    """
+    for entity in iter_catalog(fp, compression):
+        client.data.add_by_path(entity)
+    return client
+
+
+def iter_catalog(fp, compression=None):
+    """
+    read the entities of a catalog written by dump_catalog, one line at a time
+
+    :param fp: file name or readable stream
+    :param compression: 'gzip' or None. Detected from the content for file names
+    :return: generator of entities, parents before their children
+    """
+    with _reader(fp, compression) as lines:
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)['entity']
+
+
+@contextmanager
+def _writer(fp, compression):
+    if hasattr(fp, 'write'):
+        if compression != 'gzip':
+            yield fp
+            return
+        # closing the text wrapper closes the gzip stream, which writes its trailer but leaves fp open
+        out = io.TextIOWrapper(gzip.GzipFile(fileobj=fp, mode='wb'), encoding='utf-8')
+    elif compression == 'gzip' or (compression is None and fp.endswith('.gz')):
+        out = io.TextIOWrapper(gzip.open(fp, 'wb'), encoding='utf-8')
+    else:
+        out = io.open(fp, 'w', encoding='utf-8')
+    try:
+        yield out
+    finally:
+        out.close()
+
+
+@contextmanager
+def _reader(fp, compression):
+    if hasattr(fp, 'read'):
+        if compression != 'gzip':
+            yield fp
+            return
+        lines = io.TextIOWrapper(gzip.GzipFile(fileobj=fp, mode='rb'), encoding='utf-8')
+    else:
+        with io.open(fp, 'rb') as f:
+            compressed = f.read(2) == _GZIP_MAGIC
+        lines = io.TextIOWrapper(gzip.open(fp, 'rb'), encoding='utf-8') if compressed \
+            else io.open(fp, 'r', encoding='utf-8')
+    try:
+        yield lines
+    finally:
+        lines.close()
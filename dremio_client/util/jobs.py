@@ -0,0 +1,248 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures.thread import ThreadPoolExecutor
+from collections import deque
+
+from ..model.endpoints import job_status, sql
+from ..error import DremioException
+from .polling import ExponentialBackoff
+from .query import fetch_results, _MAX_PAGE_SIZE
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+class _Job(object):
+    __slots__ = ('future', 'token', 'base_url', 'query', 'context', 'ssl_verify', 'page_size', 'prefetch',
+                 'polling', 'delays', 'id', 'polls')
+
+    def __init__(self, token, base_url, query, context, ssl_verify, page_size, prefetch, polling):
+        self.future = Future()
+        self.token = token
+        self.base_url = base_url
+        self.query = query
+        self.context = context
+        self.ssl_verify = ssl_verify
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.polling = polling
+        self.delays = polling.delays()
+        self.id = None
+        self.polls = 0
+
+
+class JobTracker(object):
+    """
+    track many rest jobs with a single background poller
+
+    Submitted queries are sent to Dremio as long as fewer than ``max_running`` jobs are outstanding, the rest wait
+    in a queue. One poller thread wakes up whenever a job is due for a status check (as decided by the job's
+    polling strategy) and hands all due jobs to a small worker pool, without waiting for the checks. Finished jobs
+    have their results downloaded on a separate pool, so long downloads never delay status checks, and their futures
+    resolved, freeing a slot for the next queued query.
+
+    :param max_running: maximum number of jobs running on Dremio at once
+    :param polling: PollingStrategy used to schedule status checks, defaults to exponential backoff
+    :param workers: number of threads used to submit jobs and check status
+    :param fetch_workers: number of results downloaded at once, defaults to max_running
+    """
+
+    def __init__(self, max_running=8, polling=None, workers=4, fetch_workers=None):
+        assert max_running > 0 and workers > 0
+        self._max_running = max_running
+        self._polling = polling or ExponentialBackoff()
+        self._workers = workers
+        self._fetch_workers = fetch_workers or max_running
+        self._cond = threading.Condition()
+        self._queued = deque()
+        self._scheduled = list()
+        self._counter = itertools.count()
+        self._running = 0
+        self._closed = False
+        self._pool = None
+        self._fetch_pool = None
+        self._thread = None
+
+    @property
+    def max_running(self):
+        return self._max_running
+
+    @max_running.setter
+    def max_running(self, value):
+        assert value > 0
+        with self._cond:
+            self._max_running = value
+            self._cond.notify()
+
+    @property
+    def running(self):
+        """number of jobs currently submitted to Dremio and not yet resolved"""
+        return self._running
+
+    @property
+    def queued(self):
+        """number of queries waiting for a free slot"""
+        return len(self._queued)
+
+    def submit(self, token, base_url, query, context=None, ssl_verify=True, polling=None,
+               page_size=_MAX_PAGE_SIZE, prefetch=4):
+        """ submit a query to be run and tracked
+
+        :param token: API token from auth
+        :param base_url: base url of Dremio instance
+        :param query: valid sql query
+        :param context: optional context in which to execute the query
+        :param ssl_verify: verify ssl on web requests
+        :param polling: optional PollingStrategy for this job, defaults to the tracker's strategy
+        :param page_size: number of rows to fetch per request (max 500)
+        :param prefetch: number of result pages to download concurrently
+        :return: concurrent.futures.Future resolving to a list of json result pages
+        """
+        job = _Job(token, base_url, query, context, ssl_verify, page_size, prefetch, polling or self._polling)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('cannot submit to a tracker after shutdown')
+            self._queued.append(job)
+            if self._thread is None:
+                self._pool = ThreadPoolExecutor(max_workers=self._workers)
+                self._fetch_pool = ThreadPoolExecutor(max_workers=self._fetch_workers)
+                self._thread = threading.Thread(target=self._poll_loop, name='dremio-job-tracker')
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify()
+        return job.future
+
+    def shutdown(self, wait=True):
+        """ stop the tracker once all submitted jobs are resolved
+
+        :param wait: block until the outstanding jobs are done
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if wait and thread is not None:
+            thread.join()
+            self._pool.shutdown(wait=True)
+            self._fetch_pool.shutdown(wait=True)
+
+    def _poll_loop(self):
+        while True:
+            with self._cond:
+                starting, due = self._next_batch()
+                if starting is None:
+                    return
+            for job in starting:
+                self._pool.submit(self._start, job)
+            for job in due:
+                self._pool.submit(self._check, job)
+
+    def _next_batch(self):
+        while True:
+            starting = list()
+            while self._queued and self._running < self._max_running:
+                job = self._queued.popleft()
+                if job.future.set_running_or_notify_cancel():
+                    self._running += 1
+                    starting.append(job)
+            due = list()
+            now = time.time()
+            while self._scheduled and self._scheduled[0][0] <= now:
+                due.append(heapq.heappop(self._scheduled)[2])
+            if starting or due:
+                return starting, due
+            if self._closed and not self._queued and not self._running:
+                return None, None
+            self._cond.wait(self._scheduled[0][0] - now if self._scheduled else None)
+
+    def _schedule(self, job, delay):
+        with self._cond:
+            heapq.heappush(self._scheduled, (time.time() + delay, next(self._counter), job))
+            self._cond.notify()
+
+    def _release(self, job, result=None, exception=None):
+        if job.id is not None:
+            job.polling.record(job.id, job.polls)
+            logging.debug('job %s finished after %d status checks', job.id, job.polls)
+        if exception is not None:
+            job.future.set_exception(exception)
+        else:
+            job.future.set_result(result)
+        with self._cond:
+            self._running -= 1
+            self._cond.notify()
+
+    def _start(self, job):
+        try:
+            job.id = sql(job.token, job.base_url, job.query, job.context, ssl_verify=job.ssl_verify)['id']
+        except Exception as e:  # NOQA
+            self._release(job, exception=e)
+            return
+        self._schedule(job, 0)
+
+    def _check(self, job):
+        try:
+            state = job_status(job.token, job.base_url, job.id, ssl_verify=job.ssl_verify)
+        except Exception as e:  # NOQA
+            state = e
+        self._handle(job, state)
+
+    def _handle(self, job, state):
+        job.polls += 1
+        if isinstance(state, Exception):
+            self._release(job, exception=state)
+        elif state['jobState'] == 'COMPLETED':
+            self._fetch_pool.submit(self._fetch, job, state.get('rowCount', 0))
+        elif state['jobState'] in {'CANCELED', 'FAILED'}:
+            self._release(job, exception=DremioException("job failed " + str(state), None))
+        else:
+            self._schedule(job, next(job.delays))
+
+    def _fetch(self, job, row_count):
+        try:
+            results = list(fetch_results(job.token, job.base_url, job.id, row_count, job.page_size, job.prefetch,
+                                         job.ssl_verify))
+        except Exception as e:  # NOQA
+            self._release(job, exception=e)
+            return
+        self._release(job, results)
+
+
+def get_tracker():
+    """ return the shared job tracker used by run_async
+
+    :return: JobTracker
+    """
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = JobTracker()
+    return _tracker
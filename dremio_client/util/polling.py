@@ -0,0 +1,95 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import random
+import threading
+from collections import OrderedDict
+
+
+class PollingStrategy(object):
+    """
+    base class for strategies deciding how long to wait between job status checks
+
+    Subclasses implement ``delays`` which returns a fresh iterator of sleep times (in seconds) for a single job.
+    The number of status checks each job needed is recorded in ``polls`` (job id -> count) for the most recent
+    ``history`` jobs.
+    """
+
+    def __init__(self, history=1000):
+        self.polls = OrderedDict()
+        self._history = history
+        self._lock = threading.Lock()
+
+    def delays(self):
+        raise NotImplementedError
+
+    def record(self, job_id, polls):
+        with self._lock:
+            self.polls[job_id] = polls
+            while len(self.polls) > self._history:
+                self.polls.popitem(last=False)
+
+
+class FixedPolling(PollingStrategy):
+    """
+    wait the same amount of time between every status check
+
+    :param interval: seconds to sleep between status checks
+    """
+
+    def __init__(self, interval=10, history=1000):
+        PollingStrategy.__init__(self, history)
+        assert interval > 0
+        self.interval = interval
+
+    def delays(self):
+        while True:
+            yield self.interval
+
+
+class ExponentialBackoff(PollingStrategy):
+    """
+    start polling quickly and back off exponentially up to a cap
+
+    Each delay is randomised by up to ``jitter`` (a fraction of the delay) so many jobs started together do not
+    poll in lock step.
+
+    :param initial: seconds to sleep after the first status check
+    :param factor: multiplier applied to the delay after each check
+    :param max_sleep: maximum seconds to sleep between status checks
+    :param jitter: fraction of each delay to randomise by
+    """
+
+    def __init__(self, initial=0.005, factor=2.0, max_sleep=10, jitter=0.2, history=1000):
+        PollingStrategy.__init__(self, history)
+        assert 0 < initial and factor >= 1 and max_sleep > 0 and 0 <= jitter < 1
+        self.initial = min(initial, max_sleep)
+        self.factor = factor
+        self.max_sleep = max_sleep
+        self.jitter = jitter
+
+    def delays(self):
+        delay = self.initial
+        while True:
+            yield min(self.max_sleep, delay * random.uniform(1 - self.jitter, 1 + self.jitter))
+            delay = min(self.max_sleep, delay * self.factor)
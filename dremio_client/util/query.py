@@ -21,13 +21,19 @@
 # specific language governing permissions and limitations
 # under the License.
 #
+import logging
 import time
+from collections import deque
 from concurrent.futures.thread import ThreadPoolExecutor
+from itertools import islice
 
 from ..model.endpoints import job_results, job_status, sql
 from ..error import DremioException
+from .polling import ExponentialBackoff
+from .cache import cached_pages, is_read_only, normalise_sql
+from .singleflight import SingleFlight
 
-executor = ThreadPoolExecutor(max_workers=8)
+_MAX_PAGE_SIZE = 500
 
 _job_states = {
     'NOT_SUBMITTED',
@@ -40,18 +46,29 @@ _job_states = {
     'ENQUEUED'}
 _done_job_states = {'COMPLETED', 'CANCELED', 'FAILED'}
 
+# identical read only queries submitted concurrently by the same user share one job
+_inflight = SingleFlight()
 
-def run(token, base_url, query, context=None, sleep_time=10, ssl_verify=True):
+
+def run(token, base_url, query, context=None, sleep_time=10, ssl_verify=True, polling=None,
+        page_size=_MAX_PAGE_SIZE, prefetch=4, cache=None, user=None):
     """ Run a single sql query
 
-    This runs a single sql query against the rest api and returns a json document of the results
+    This runs a single sql query against the rest api and returns a json document of the results. Identical
+    read only queries (SELECT, WITH or VALUES) run concurrently with the same token share a single job, each reading
+    the results independently. Statements which write (eg INSERT, CTAS, DROP) always run as their own job
 
     :param token: API token from auth
     :param base_url: base url of Dremio instance
     :param query: valid sql query
     :param context: optional context in which to execute the query
-    :param sleep_time: seconds to sleep between checking for finished state
+    :param sleep_time: maximum seconds to sleep between checking for finished state
     :param ssl_verify: verify ssl on web requests
+    :param polling: optional PollingStrategy, defaults to exponential backoff capped at sleep_time
+    :param page_size: number of rows to fetch per request (max 500)
+    :param prefetch: number of result pages to download concurrently ahead of the consumer
+    :param cache: optional ResultCache the results are read from and stored in
+    :param user: (cache) name of the user the token belongs to, cached results are only shared by the same user
     :raise: DremioException if job failed
     :raise: DremioUnauthorizedException if token is incorrect or invalid
     :return: json array of result rows
@@ -62,38 +79,126 @@ def run(token, base_url, query, context=None, sleep_time=10, ssl_verify=True):
     [{'record':'1'}, {'record':'2'}]
     """
     assert sleep_time > 0
-    job = sql(token, base_url, query, context, ssl_verify=ssl_verify)
-    job_id = job['id']
-    while True:
-        state = job_status(token, base_url, job_id, ssl_verify=ssl_verify)
-        if state['jobState'] == 'COMPLETED':
-            row_count = state.get('rowCount', 0)
-            break
-        if state['jobState'] in {'CANCELED', 'FAILED'}:
-            # todo add info about why did it fail
-            raise DremioException("job failed " + str(state), None)
-        time.sleep(sleep_time)
-    count = 0
-    while count < row_count:
-        result = job_results(token, base_url, job_id, count, ssl_verify=ssl_verify)
-        count += 100
+    if cache is not None:
+        pages = cached_pages(cache, lambda: _run(token, base_url, query, context, sleep_time, ssl_verify, polling,
+                                                 page_size, prefetch),
+                             token, base_url, query, context, ssl_verify, page_size, user)
+    else:
+        pages = _run(token, base_url, query, context, sleep_time, ssl_verify, polling, page_size, prefetch)
+    for page in pages:
+        yield page
+
+
+def _run(token, base_url, query, context, sleep_time, ssl_verify, polling, page_size, prefetch):
+    def submit():
+        job_id = sql(token, base_url, query, context, ssl_verify=ssl_verify)['id']
+        return job_id, wait_for_job(token, base_url, job_id, polling or ExponentialBackoff(max_sleep=sleep_time),
+                                    ssl_verify)
+
+    if is_read_only(query):
+        key = (base_url, token, normalise_sql(query), tuple(context or ()))
+        (job_id, state), _ = _inflight.do(key, submit)
+    else:
+        job_id, state = submit()
+    for result in fetch_results(token, base_url, job_id, state.get('rowCount', 0), page_size, prefetch, ssl_verify):
         yield result
 
 
-def run_async(token, base_url, query, context=None, sleep_time=10, ssl_verify=True):
+def fetch_results(token, base_url, job_id, row_count, page_size=_MAX_PAGE_SIZE, prefetch=4, ssl_verify=True):
+    """ Fetch all result pages of a finished job
+
+    Up to ``prefetch`` pages are downloaded concurrently while earlier pages are consumed. Pages are yielded in
+    order and at most ``prefetch`` pages are held in memory at once.
+
+    :param token: API token from auth
+    :param base_url: base url of Dremio instance
+    :param job_id: job id (as returned by sql)
+    :param row_count: number of rows in the result (as returned by job_status)
+    :param page_size: number of rows to fetch per request (max 500)
+    :param prefetch: number of result pages to download concurrently ahead of the consumer
+    :param ssl_verify: verify ssl on web requests
+    :raise: DremioUnauthorizedException if token is incorrect or invalid
+    :return: generator of json result pages, at least one even when there are no rows
+    """
+    page_size = max(1, min(page_size, _MAX_PAGE_SIZE))
+    # an empty result still has a page, it carries the schema
+    offsets = iter(range(0, max(row_count, 1), page_size))
+    if prefetch <= 1 or row_count <= page_size:
+        for offset in offsets:
+            yield job_results(token, base_url, job_id, offset, page_size, ssl_verify=ssl_verify)
+        return
+    pool = ThreadPoolExecutor(max_workers=prefetch)
+    pending = deque()
+
+    def submit(count):
+        for offset in islice(offsets, count):
+            pending.append(pool.submit(job_results, token, base_url, job_id, offset, page_size, ssl_verify))
+
+    try:
+        submit(prefetch)
+        while pending:
+            result = pending.popleft().result()
+            submit(1)
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+
+def wait_for_job(token, base_url, job_id, polling=None, ssl_verify=True):
+    """ Wait for a job to finish
+
+    Checks the job status, sleeping between checks for the times given by the polling strategy. The number of
+    checks is recorded on the strategy.
+
+    :param token: API token from auth
+    :param base_url: base url of Dremio instance
+    :param job_id: job id (as returned by sql)
+    :param polling: optional PollingStrategy, defaults to exponential backoff
+    :param ssl_verify: verify ssl on web requests
+    :raise: DremioException if job failed
+    :return: final job status
+    """
+    polling = polling or ExponentialBackoff()
+    delays = polling.delays()
+    polls = 0
+    try:
+        while True:
+            state = job_status(token, base_url, job_id, ssl_verify=ssl_verify)
+            polls += 1
+            if state['jobState'] == 'COMPLETED':
+                return state
+            if state['jobState'] in {'CANCELED', 'FAILED'}:
+                # todo add info about why did it fail
+                raise DremioException("job failed " + str(state), None)
+            time.sleep(next(delays))
+    finally:
+        polling.record(job_id, polls)
+        logging.debug('job %s finished after %d status checks', job_id, polls)
+
+
+def run_async(token, base_url, query, context=None, sleep_time=10, ssl_verify=True, polling=None,
+              page_size=_MAX_PAGE_SIZE, prefetch=4, tracker=None):
     """ Run a single sql query asynchronously
 
-    This executes a single sql query against the rest api asynchronously and returns a future for the result
+    This executes a single sql query against the rest api asynchronously and returns a future for the result.
+    The job is tracked by a JobTracker, which polls all outstanding jobs from a single thread and limits how many
+    run at once (8 by default, see ``get_tracker().max_running``)
 
     :param token: API token from auth
     :param base_url: base url of Dremio instance
     :param query: valid sql query
     :param context: optional context in which to execute the query
-    :param sleep_time: seconds to sleep between checking for finished state
+    :param sleep_time: maximum seconds to sleep between checking for finished state
     :param ssl_verify: verify ssl on web requests
+    :param polling: optional PollingStrategy, defaults to exponential backoff capped at sleep_time
+    :param page_size: number of rows to fetch per request (max 500)
+    :param prefetch: number of result pages to download concurrently ahead of the consumer
+    :param tracker: optional JobTracker, defaults to the shared tracker
     :raise: DremioException if job failed
     :raise: DremioUnauthorizedException if token is incorrect or invalid
-    :return: concurrent.futures.Future for the result
+    :return: concurrent.futures.Future for the list of json result pages
 
     :example:
 
@@ -101,7 +206,10 @@ def run_async(token, base_url, query, context=None, sleep_time=10, ssl_verify=Tr
     >>> f.result()
     [{'record':'1'}, {'record':'2'}]
     """
-    return executor.submit(run, token, base_url, query, context, sleep_time, ssl_verify)
+    from .jobs import get_tracker
+    tracker = tracker or get_tracker()
+    polling = polling or ExponentialBackoff(max_sleep=sleep_time)
+    return tracker.submit(token, base_url, query, context, ssl_verify, polling, page_size, prefetch)
 
 
 def refresh_metadata(token, base_url, table, ssl_verify=True):
@@ -0,0 +1,205 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Create the entities of a serialized catalog on a Dremio server
+
+Entities are ordered by a dependency graph: every entity depends on its closest ancestor being restored with it and
+every virtual dataset on the datasets its sql reads from. Entities whose dependencies are all in place are created
+together, a level at a time, on a bounded pool of workers.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import simplejson as json
+
+from .cache import referenced_datasets
+from .polling import ExponentialBackoff
+from ..error import DremioException, DremioConflictException
+from ..model.data import create
+
+RestoreResult = namedtuple('RestoreResult', ['created', 'existing', 'skipped', 'failed'])
+RestoreResult.__doc__ = """
+outcome of a catalog restore
+
+``created`` and ``existing`` (already on the server or in the checkpoint) are lists of paths, ``skipped`` lists the
+paths not attempted because a dependency failed and ``failed`` is a list of (path, exception) pairs.
+"""
+
+_NOT_RESTORED = ('home', 'file')
+
+
+def restore_catalog(entities, client, max_workers=8, retries=3, checkpoint=None, backoff=None):
+    """
+    create the entities of a serialized catalog on the server of a given client
+
+    Requests which fail with a server error are retried, an entity which already exists is left as it is. Each restored
+    path is appended to the checkpoint file as it is created so an interrupted restore can be resumed by running it
+    again with the same checkpoint.
+
+    :param entities: output of serialize_catalog, a list of entities or an iterable of dump_catalog records
+                     (e.g. from io.iter_catalog)
+    :param client: client for the target dremio host
+    :param max_workers: maximum number of concurrent requests
+    :param retries: number of times a failed request is retried
+    :param checkpoint: file name of a checkpoint to record progress in and resume from
+    :param backoff: PollingStrategy giving the delays between retries, defaults to exponential backoff
+    :return: RestoreResult
+    """
+    nodes = _entities(entities)
+    levels, depends = _levels(nodes)
+    done = _read_checkpoint(checkpoint)
+    backoff = backoff or ExponentialBackoff(initial=0.5, max_sleep=10)
+    root = client.data
+    result = RestoreResult(list(), list(), list(), list())
+    unavailable = set()
+    lock = threading.Lock()
+
+    def restore(key):
+        entity = nodes[key]
+        try:
+            created = _create(entity, root, retries, backoff)
+        except Exception as e:  # NOQA
+            return e
+        _write_checkpoint(checkpoint, lock, entity['path'])
+        return created
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for level in levels:
+            todo = list()
+            for key in level:
+                path = nodes[key]['path']
+                if key in done:
+                    result.existing.append(path)
+                elif depends[key] & unavailable:
+                    result.skipped.append(path)
+                    unavailable.add(key)
+                else:
+                    todo.append(key)
+            for key, outcome in zip(todo, pool.map(restore, todo)):
+                path = nodes[key]['path']
+                if isinstance(outcome, Exception):
+                    logging.warning('could not restore %s: %s', '.'.join(path), outcome)
+                    result.failed.append((path, outcome))
+                    unavailable.add(key)
+                elif outcome:
+                    result.created.append(path)
+                else:
+                    result.existing.append(path)
+    return result
+
+
+def _key(path):
+    return tuple(p.lower() for p in path)
+
+
+def _entities(entities):
+    if isinstance(entities, (str, bytes)):
+        entities = json.loads(entities)
+    nodes = dict()
+    for entity in entities:
+        if isinstance(entity, (str, bytes)):
+            entity = json.loads(entity)
+        if 'entity' in entity and 'path' not in entity:
+            entity = entity['entity']
+        if entity.get('entityType') not in _NOT_RESTORED:
+            nodes[_key(entity['path'])] = entity
+    return nodes
+
+
+def _dependencies(key, entity, nodes):
+    depends = set()
+    for i in range(len(key) - 1, 0, -1):
+        if key[:i] in nodes:
+            depends.add(key[:i])
+            break
+    if entity.get('sql'):
+        context = entity.get('sqlContext') or list()
+        for ref in referenced_datasets(entity['sql']):
+            for candidate in (_key(context + ref), _key(ref)):
+                if candidate in nodes and candidate != key:
+                    depends.add(candidate)
+                    break
+    return depends
+
+
+def _levels(nodes):
+    depends = {key: _dependencies(key, entity, nodes) for key, entity in nodes.items()}
+    remaining = {key: set(deps) for key, deps in depends.items()}
+    levels = list()
+    while remaining:
+        level = sorted(key for key, deps in remaining.items() if not deps)
+        if not level:
+            # a cycle, which a real catalog can't have: most likely a misread reference. Let the server decide
+            logging.warning('circular dependencies between %s', ', '.join('.'.join(k) for k in sorted(remaining)))
+            level = sorted(remaining)
+        levels.append(level)
+        for key in level:
+            del remaining[key]
+        for deps in remaining.values():
+            deps.difference_update(level)
+    return levels, depends
+
+
+def _create(entity, root, retries, backoff):
+    """ create an entity, retrying server errors. Returns False if it already exists """
+    item = {k: v for k, v in entity.items() if k not in ('id', 'tag')}
+    delays = backoff.delays()
+    for attempt in range(retries + 1):
+        _, obj = create(item, root._token, root._base_url, root._flight_endpoint, ssl_verify=root._ssl_verify,
+                        dirty=True)
+        try:
+            obj.commit()
+            return True
+        except DremioConflictException:
+            return False
+        except DremioException as e:
+            status = getattr(getattr(e.original_exception, 'response', None), 'status_code', None)
+            if attempt == retries or (status is not None and status < 500 and status != 429):
+                raise
+        except IOError:
+            if attempt == retries:
+                raise
+        time.sleep(next(delays))
+
+
+def _read_checkpoint(checkpoint):
+    done = set()
+    try:
+        with open(checkpoint, 'r') as f:
+            for line in f:
+                if line.strip():
+                    done.add(_key(json.loads(line)['path']))
+    except (IOError, TypeError):  # no checkpoint (yet)
+        pass
+    return done
+
+
+def _write_checkpoint(checkpoint, lock, path):
+    if checkpoint is None:
+        return
+    with lock:
+        with open(checkpoint, 'a') as f:
+            f.write(json.dumps({'path': path}) + '\n')
@@ -0,0 +1,244 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Local full text search over the catalog
+
+A ranked (BM25) inverted index over entity paths, collaboration tags and wiki text. A refresh walks the catalog
+(see changes.diff_catalog) and fetches the tags and wiki of every entity concurrently; editing them does not change
+an entity's catalog tag. Only entities whose catalog tag or tags or wiki version changed are indexed again. The index
+is saved to a local file so searches never contact the server.
+
+Like diff_catalog the walk does not descend into sources by default, so physical datasets can only be searched once
+the index is refreshed with ``sources=True``.
+"""
+import bisect
+import gzip
+import hashlib
+import logging
+import math
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import simplejson as json
+
+from .changes import diff_catalog
+from .compat import replace
+from ..error import DremioException, DremioBadRequestException, DremioNotFoundException
+from ..model.endpoints import collaboration_tags, collaboration_wiki
+
+SearchHit = namedtuple('SearchHit', ['score', 'id', 'path', 'entity_type', 'tags'])
+SearchHit.__doc__ = """
+an entity matching a search, best matches have the highest ``score``
+"""
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+_QUERY_TOKEN = re.compile(r'[a-z0-9]+\*?')
+#: weight of a term found in each field of an entity
+_WEIGHTS = (('path', 3), ('tags', 2), ('wiki', 1))
+#: sub-catalogs diff_catalog walks on their own, anything else is walked from the root
+_SCOPES = ('space', 'folder', 'source')
+_K1 = 1.2
+_B = 0.75
+
+
+def search_index_path(base_url, user=None):
+    """ default file of the search index of a Dremio instance
+
+    :param base_url: base url of the Dremio instance
+    :param user: name of the user the index is built as, each user sees a different catalog
+    """
+    key = base_url if user is None else '{}\n{}'.format(base_url, user)
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(os.path.expanduser('~'), '.cache', 'dremio_client', 'search-{}.json.gz'.format(digest))
+
+
+def _collaboration(endpoint, token, base_url, cid, ssl_verify):
+    try:
+        return endpoint(token, base_url, cid, ssl_verify)
+    except (DremioBadRequestException, DremioNotFoundException):  # none written
+        return dict()
+    except (DremioException, IOError) as e:
+        # index the entity without it rather than failing the whole refresh, it is fetched again next time
+        logging.warning('could not fetch collaboration data of %s: %s', cid, e)
+        return dict()
+
+
+def _within(path, scope):
+    return tuple(path[:len(scope)]) == scope
+
+
+def _tokens(text):
+    return _TOKEN.findall(text.lower()) if text else list()
+
+
+class SearchIndex(object):
+    """
+    ranked full text index of catalog entities
+
+    :param path: file the index is loaded from (if it exists) and saved to, see search_index_path
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.snapshot = None
+        self._documents = dict()  # entity id -> {'path', 'type', 'tags', 'wiki'}
+        self._postings = dict()  # term -> {entity id: weighted term frequency}
+        self._lengths = dict()  # entity id -> weighted number of terms
+        self._terms = None  # sorted terms, built on demand for prefix queries
+        if path is not None and os.path.exists(path):
+            self._load()
+
+    def refresh(self, catalog, max_workers=8, full=False, sources=False):
+        """
+        bring the index up to date with the server
+
+        :param catalog: dremio data catalog (or sub-catalog) to index. Entities outside of a sub-catalog are kept
+        :param max_workers: maximum number of concurrent requests
+        :param full: index every entity again, not only those whose catalog tag or tags or wiki version changed
+        :param sources: index the folders and physical datasets of sources too. Refreshing without it drops them
+                        from the index again
+        :return: changes.CatalogDiff of the catalog (or sub-catalog) since the last refresh
+        """
+        scope = tuple(catalog.meta.path) if getattr(catalog.meta, 'entityType', None) in _SCOPES else ()
+        snapshot = self.snapshot or dict()
+        inside = {cid: entry for cid, entry in snapshot.items() if _within(entry['path'], scope)}
+        diff = diff_catalog(catalog, inside, max_workers, prune=False, sources=sources)
+        token, base_url, ssl_verify = catalog._token, catalog._base_url, catalog._ssl_verify
+
+        def fetch(item):
+            cid, entry = item
+            tags = _collaboration(collaboration_tags, token, base_url, cid, ssl_verify) \
+                if entry['type'] == 'dataset' else dict()
+            wiki = _collaboration(collaboration_wiki, token, base_url, cid, ssl_verify)
+            return {'path': entry['path'], 'type': entry['type'], 'tags': tags.get('tags') or list(),
+                    'wiki': wiki.get('text') or '', 'version': [entry['tag'], tags.get('version'), wiki.get('version')]}
+
+        entities = list(diff.snapshot.items())
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for (cid, _), document in zip(entities, pool.map(fetch, entities)):
+                before = self._documents.get(cid)
+                if full or before is None or before.get('version') != document['version'] \
+                        or before['path'] != document['path']:
+                    self._add(cid, document)
+        for cid in [cid for cid, document in self._documents.items()
+                    if cid not in diff.snapshot and _within(document['path'], scope)]:
+            self._remove(cid)
+        self.snapshot = {cid: entry for cid, entry in snapshot.items() if cid not in inside}
+        self.snapshot.update(diff.snapshot)
+        return diff
+
+    def search(self, query, limit=20):
+        """
+        find entities matching all terms of a query
+
+        Terms are matched against the words of entity paths, tags and wiki text, case insensitively. A term ending in
+        ``*`` matches any word starting with it
+
+        :param query: search terms
+        :param limit: maximum number of results
+        :return: list of SearchHit, best first
+        """
+        scores = None
+        average = float(sum(self._lengths.values())) / (len(self._lengths) or 1)
+        for term in _QUERY_TOKEN.findall(query.lower()):
+            term_scores = dict()
+            for word in self._expand(term):
+                postings = self._postings[word]
+                idf = math.log(1 + (len(self._documents) - len(postings) + 0.5) / (len(postings) + 0.5))
+                for cid, frequency in postings.items():
+                    norm = _K1 * (1 - _B + _B * self._lengths[cid] / average)
+                    score = idf * frequency * (_K1 + 1) / (frequency + norm)
+                    term_scores[cid] = max(term_scores.get(cid, 0), score)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {cid: score + term_scores[cid] for cid, score in scores.items() if cid in term_scores}
+            if not scores:
+                return list()
+        if scores is None:
+            return list()
+        ranked = sorted(scores.items(), key=lambda i: (-i[1], self._documents[i[0]]['path']))[:limit]
+        return [SearchHit(score, cid, self._documents[cid]['path'], self._documents[cid]['type'],
+                          self._documents[cid]['tags']) for cid, score in ranked]
+
+    def save(self, path=None):
+        """ write the index to its file """
+        path = path or self.path
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with gzip.open(path + '.tmp', 'wb') as f:
+            f.write(json.dumps({'snapshot': self.snapshot, 'documents': self._documents}).encode('utf-8'))
+        replace(path + '.tmp', path)
+
+    def __len__(self):
+        return len(self._documents)
+
+    def _load(self):
+        with gzip.open(self.path, 'rb') as f:
+            data = json.loads(f.read().decode('utf-8'))
+        self.snapshot = data.get('snapshot')
+        for cid, document in data.get('documents', dict()).items():
+            self._add(cid, document)
+
+    def _expand(self, term):
+        if not term.endswith('*'):
+            return [term] if term in self._postings else list()
+        if self._terms is None:
+            self._terms = sorted(self._postings)
+        start = bisect.bisect_left(self._terms, term[:-1])
+        end = bisect.bisect_left(self._terms, term[:-1] + u'\uffff', start)
+        return self._terms[start:end]
+
+    def _add(self, cid, document):
+        self._remove(cid)
+        self._documents[cid] = document
+        frequencies = dict()
+        for field, weight in _WEIGHTS:
+            value = document.get(field)
+            text = ' '.join(value) if isinstance(value, list) else value
+            for term in _tokens(text):
+                frequencies[term] = frequencies.get(term, 0) + weight
+        for term, frequency in frequencies.items():
+            if term not in self._postings:
+                self._postings[term] = dict()
+                self._terms = None
+            self._postings[term][cid] = frequency
+        self._lengths[cid] = sum(frequencies.values())
+
+    def _remove(self, cid):
+        document = self._documents.pop(cid, None)
+        if document is None:
+            return
+        del self._lengths[cid]
+        for field, _ in _WEIGHTS:
+            value = document.get(field)
+            for term in set(_tokens(' '.join(value) if isinstance(value, list) else value)):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(cid, None)
+                    if not postings:
+                        del self._postings[term]
+                        self._terms = None
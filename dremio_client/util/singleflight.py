@@ -0,0 +1,86 @@
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""Coalesce concurrent identical calls into one
+
+Used to make identical queries issued at the same time (eg by the panels of a dashboard) share a single Dremio job.
+"""
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight(object):
+    """
+    coalesce concurrent calls with the same key into a single call
+
+    The first caller of a key runs the function. Callers arriving with the same key while it runs wait for it and
+    receive the same result (or exception). The key is forgotten as soon as the call finishes, results are not cached.
+
+    :example:
+
+    >>> flights = SingleFlight()
+    >>> result, shared = flights.do(('select 1',), lambda: expensive('select 1'))
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = dict()
+
+    def do(self, key, fn):
+        """
+        call fn unless a call with the same key is already running, in which case wait for its result
+
+        :param key: hashable key identifying identical calls
+        :param fn: callable without arguments
+        :return: tuple of the result and whether it was shared with other callers. A shared result must not be
+                 modified in place
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.shared = True
+        if not leader:
+            return call.future.result(), True
+        try:
+            call.future.set_result(fn())
+        except BaseException as e:  # NOQA
+            call.future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return call.future.result(), call.shared
+
+    def __len__(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class _Call(object):
+    __slots__ = ('future', 'shared')
+
+    def __init__(self):
+        self.future = Future()
+        self.shared = False
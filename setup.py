@@ -35,7 +35,6 @@ with open('HISTORY.rst') as history_file:
     history = history_file.read()
 
 requirements = [
-    'pyarrow>=0.15.0',
     'pandas',
     'Click>=6.0',
     'requests>=2.21.0',
@@ -83,7 +82,11 @@ setup(
     version='0.4.3',
     zip_safe=False,
     extras_require={
-        ':python_version == "2.7"': ['futures']
+        ':python_version == "2.7"': ['futures'],
+        # compressed ipc files (result cache, arrow export) need pyarrow 2, which is not built for python < 3.6
+        ':python_version < "3.6"': ['pyarrow>=0.15.0'],
+        ':python_version >= "3.6"': ['pyarrow>=2.0.0'],
+        'async': ['aiohttp']
     },
     entry_points={
         'console_scripts': [
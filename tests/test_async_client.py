@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+
+import asyncio
+import json
+
+import pytest
+
+from dremio_client.conf import build_config
+from dremio_client.error import DremioUnauthorizedException
+
+aiohttp = pytest.importorskip('aiohttp')
+from aiohttp import web  # NOQA: E402
+from aiohttp.test_utils import TestServer  # NOQA: E402
+from dremio_client.dremio_async_client import AsyncSimpleClient  # NOQA: E402
+
+
+def _load(name):
+    with open('tests/data/{}'.format(name)) as f:
+        return json.load(f)
+
+
+def _respond(data=None, status=200):
+    async def handler(request):
+        return web.json_response(data, status=status)
+    return handler
+
+
+async def _run_client(requests_mock):
+    app = web.Application()
+    sql = _load('sql.json')
+    status = _load('job_status.json')
+    results = _load('job_results.json')
+    app.router.add_post('/api/v3/sql', _respond(sql))
+    app.router.add_get('/api/v3/job/{jobid}', _respond(status))
+    app.router.add_get('/api/v3/job/{jobid}/results', _respond(results))
+    app.router.add_get('/api/v3/catalog', _respond(status=401))
+    app.router.add_put('/api/v3/catalog/{cid}', _respond({'id': 'abc', 'tag': '2'}))
+    async with TestServer(app) as server:
+        requests_mock.post('http://{}:{}/apiv2/login'.format(server.host, server.port), json={'token': '12345'})
+        config = build_config({'hostname': server.host, 'port': server.port})
+        async with AsyncSimpleClient(config, max_concurrency=2) as client:
+            pages = await client.query('select * from sys.options', sleep_time=0.01)
+            with pytest.raises(DremioUnauthorizedException):
+                await client.catalog()
+            assert await client.update_catalog('abc', {'id': 'abc', 'tag': '1'}) == {'id': 'abc', 'tag': '2'}
+    return pages
+
+
+def test_async_query(requests_mock):
+    pages = asyncio.run(_run_client(requests_mock))
+    assert len(pages) == 1
+    assert pages[0]['rows'][0]['name'] == 'acceleration.orphan.cleanup_in_milliseconds'
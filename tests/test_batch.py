@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from dremio_client.model.catalog import catalog
+from dremio_client.model.data import create
+
+
+def test_batch_commit(requests_mock):
+    requests_mock.get('https://example.com/api/v3/catalog', json={'data': []})
+    posted = list()
+
+    def post(request, context):
+        body = request.json()
+        if body['path'][0] == 'bad':
+            context.status_code = 400
+            return {'errorMessage': 'no'}
+        posted.append(body['path'])
+        body['id'] = '.'.join(body['path'])
+        return body
+
+    requests_mock.post('https://example.com/api/v3/catalog', json=post)
+    requests_mock.put('https://example.com/api/v3/catalog/d1', status_code=409, json={'errorMessage': 'stale tag'})
+
+    root = catalog('12345', 'https://example.com', print)
+
+    def new(item, dirty=True):
+        return create(item, '12345', 'https://example.com', print, dirty=dirty)[1]
+
+    folder = new({'entityType': 'folder', 'path': ['sp', 'f']})
+    space = new({'entityType': 'space', 'name': 'sp', 'path': ['sp']})
+    orphan = new({'entityType': 'folder', 'path': ['bad', 'f']})
+    bad = new({'entityType': 'space', 'name': 'bad', 'path': ['bad']})
+    dataset = new({'entityType': 'dataset', 'id': 'd1', 'tag': '1', 'path': ['sp', 'v'], 'type': 'VIRTUAL_DATASET',
+                   'sql': 'select 1'}, dirty=False)
+    with root.batch(max_workers=4) as batch:
+        for node in (folder, space, orphan, bad):
+            node.commit()
+        dataset.commit()
+        assert len(batch) == 4 and not posted
+        dataset.meta.sql = 'select 2'
+        batch.add(dataset)
+
+    assert posted == [['sp'], ['sp', 'f']]
+    status = {'.'.join(r.node.meta.path): r.status for r in batch.results}
+    assert status == {'sp': 'created', 'sp.f': 'created', 'sp.v': 'conflict', 'bad': 'failed', 'bad.f': 'skipped'}
+    assert folder.meta.id == 'sp.f' and not folder._dirty
+    assert dataset._dirty
+
+    space.meta.name = 'renamed'
+    space._dirty = True
+    requests_mock.put('https://example.com/api/v3/catalog/sp',
+                      json={'entityType': 'space', 'id': 'sp', 'name': 'x', 'path': ['sp']})
+    space.commit()
+    assert requests_mock.last_request.method == 'PUT' and space.meta.name == 'x'
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+
+import os
+import re
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+from dremio_client.util import ResultCache, run  # NOQA: E402
+from dremio_client.util.cache import is_read_only, normalise_sql, referenced_datasets  # NOQA: E402
+
+_BASE = 'http://localhost:9047'
+
+
+def test_normalise_sql():
+    assert normalise_sql(' select  a,\n b from "My  Space".t  where s = \'x  y\' ;') == \
+        'select a, b from "My  Space".t where s = \'x  y\''
+    assert is_read_only('-- top\n (select * from "insert" where a = \'drop\')') and is_read_only('values (1)')
+    assert not is_read_only('insert into s.t select 1') and not is_read_only('create table s.t as select 1')
+    assert not is_read_only('with c as (select 1) insert into s.t select * from c')
+    assert referenced_datasets('select * from "my.space".t1 a join s2."t 2" on a.x = \'from y\'') == \
+        [['my.space', 't1'], ['s2', 't 2']]
+    assert referenced_datasets('with c as (select * from s.t) select extract(year from d), trim(both \'x\' from n) '
+                               'from c join (select substring(v from 2) from s.u) on true') == \
+        [['s', 't'], ['s', 'u']]
+
+
+def test_cache_ttl_and_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path), compression='lz4')
+    table = pa.table({'n': list(range(100)), 's': ['x'] * 100})
+    assert cache.get('a') is None
+    cache.put('a', table, [[['s', 't'], '1']])
+    assert cache.get('a').equals(table)
+    assert cache.get('a', lambda path: '1').equals(table)
+    assert cache.get('a', lambda path: '2') is None and cache.get('a') is None
+
+    cache.put('a', table)
+    cache.put('b', table)
+    os.utime(os.path.join(str(tmp_path), 'a.arrow'), (1, 1))
+    cache.max_size = cache.size()
+    cache.put('c', table)
+    assert cache.get('a') is None and cache.get('b') is not None and cache.get('c') is not None
+
+    cache.ttl = -1
+    assert cache.get('b') is None
+
+
+def test_cache_without_ipc_write_options(tmp_path, monkeypatch):
+    # pyarrow older than 2.0 has no IpcWriteOptions: uncompressed caches still work, compressed ones are refused
+    monkeypatch.setattr('dremio_client.util.export._IPC_COMPRESSION', False)
+    with pytest.raises(NotImplementedError):
+        ResultCache(str(tmp_path), compression='zstd')
+    cache = ResultCache(str(tmp_path))
+    table = pa.table({'n': [1, 2]})
+    cache.put('a', table)
+    assert cache.get('a').equals(table)
+
+
+def test_run_cached(requests_mock, tmp_path):
+    requests_mock.post(_BASE + '/api/v3/sql', json={'id': '1'})
+    requests_mock.get(_BASE + '/api/v3/job/1', json={'jobState': 'COMPLETED', 'rowCount': 2})
+    schema = [{'name': 'd', 'type': {'name': 'DATE'}}, {'name': 'n', 'type': {'name': 'BIGINT'}},
+              {'name': 'ts', 'type': {'name': 'TIMESTAMP'}},
+              {'name': 'x', 'type': {'name': 'DECIMAL', 'precision': 10, 'scale': 2}}]
+    rows = [{'d': '2020-01-02', 'n': 1, 'ts': '2019-08-08 16:17:05.170', 'x': 1.25}, {'n': 2}]
+    requests_mock.get(_BASE + '/api/v3/job/1/results', json={'rowCount': 2, 'schema': schema, 'rows': rows})
+    tag = {'tag': '1'}
+    requests_mock.get(re.compile(_BASE + '/api/v3/catalog/by-path/.*'), json=tag)
+
+    cache = ResultCache(str(tmp_path))
+    first = list(run('', _BASE, 'select * from s.t', cache=cache))
+    assert first[0]['rows'][1] == {'n': 2}
+    submitted = requests_mock.call_count
+    cached = list(run('', _BASE, 'select *  from s.t;', cache=cache))
+    assert cached == first == [{'rowCount': 2, 'schema': schema, 'rows': rows}]
+    assert requests_mock.call_count == submitted + 1  # only the tag check
+    assert requests_mock.request_history[-1].path == '/api/v3/catalog/by-path/s/t'
+
+    list(run('', _BASE, 'select * from s.t', cache=cache, user='other'))
+    assert requests_mock.call_count > submitted + 2  # another user runs the query
+
+    tag['tag'] = '2'
+    requests_mock.get(re.compile(_BASE + '/api/v3/catalog/by-path/.*'), json=tag)
+    assert list(run('', _BASE, 'select * from s.t', cache=cache)) == first
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+import itertools
+import json
+
+from dremio_client.model.catalog import catalog
+from dremio_client.util.changes import diff_catalog, watch_catalog
+
+_BASE = 'https://example.com/api/v3/catalog'
+
+
+def _listing(space_tag):
+    return {'data': [
+        {'id': 'h', 'path': ['@me'], 'tag': '0', 'type': 'CONTAINER', 'containerType': 'HOME'},
+        {'id': 's1', 'path': ['sp'], 'tag': space_tag, 'type': 'CONTAINER', 'containerType': 'SPACE'}]}
+
+
+def _space(space_tag, dataset_tag):
+    children = [{'id': 'f1', 'path': ['sp', 'f'], 'type': 'CONTAINER', 'containerType': 'FOLDER'},
+                {'id': 'd1', 'path': ['sp', 'v'], 'tag': dataset_tag, 'type': 'DATASET'}]
+    return {'entityType': 'space', 'id': 's1', 'path': ['sp'], 'tag': space_tag, 'children': children}
+
+
+def _mock(requests_mock, space_tag, dataset_tag, with_d2=True):
+    requests_mock.get(_BASE, json=_listing(space_tag))
+    requests_mock.get(_BASE + '/s1', json=_space(space_tag, dataset_tag))
+    requests_mock.get(_BASE + '/f1', json={'entityType': 'folder', 'id': 'f1', 'path': ['sp', 'f'], 'tag': 'f',
+                                           'children': [{'id': 'd2', 'path': ['sp', 'f', 'p'], 'type': 'DATASET'}]
+                                           if with_d2 else []})
+    requests_mock.get(_BASE + '/d2', json={'entityType': 'dataset', 'id': 'd2', 'path': ['sp', 'f', 'p'], 'tag': 'p'})
+
+
+def test_diff_catalog(requests_mock):
+    _mock(requests_mock, '1', 'a')
+    root = catalog('12345', 'https://example.com', print)
+    diff = diff_catalog(root, max_workers=2)
+    assert [c.path for c in diff.added] == [['sp'], ['sp', 'f'], ['sp', 'f', 'p'], ['sp', 'v']]
+    assert not diff.removed and not diff.modified
+    snapshot = json.loads(json.dumps(diff.snapshot))
+
+    _mock(requests_mock, '1', 'b', with_d2=False)
+    diff = diff_catalog(root, snapshot)
+    assert [(c.kind, c.id, c.tag) for c in diff.modified] == [('modified', 'd1', 'b')]
+    assert [(c.kind, c.id) for c in diff.removed] == [('removed', 'd2')]
+    assert not diff.added
+
+    snapshot = diff.snapshot
+    requests_mock.reset_mock()
+    diff = diff_catalog(root, snapshot)
+    assert not diff.added and not diff.removed and not diff.modified
+    assert sorted(r.path for r in requests_mock.request_history) == \
+        ['/api/v3/catalog', '/api/v3/catalog/f1', '/api/v3/catalog/s1']
+
+    # the space tag is unchanged, only pruning would miss the new dataset tag
+    requests_mock.get(_BASE + '/s1', json=_space('1', 'c'))
+    diff = diff_catalog(root, snapshot)
+    assert [(c.id, c.tag) for c in diff.modified] == [('d1', 'c')]
+    assert not diff_catalog(root, snapshot, prune=True).modified
+
+
+def test_diff_catalog_sources(requests_mock):
+    _mock(requests_mock, '1', 'a')
+    listing = _listing('1')
+    listing['data'].append({'id': 'src', 'path': ['lake'], 'type': 'CONTAINER', 'containerType': 'SOURCE'})
+    requests_mock.get(_BASE, json=listing)
+    requests_mock.get(_BASE + '/src', json={
+        'entityType': 'source', 'id': 'src', 'path': ['lake'], 'tag': 's',
+        'children': [{'id': 'pds', 'path': ['lake', 't'], 'type': 'DATASET', 'datasetType': 'PROMOTED'},
+                     {'id': 'raw', 'path': ['lake', 'raw.csv'], 'type': 'FILE'}]})
+    requests_mock.get(_BASE + '/pds', json={'entityType': 'dataset', 'id': 'pds', 'path': ['lake', 't'], 'tag': 't'})
+    root = catalog('12345', 'https://example.com', print)
+    assert ['lake', 't'] not in [c.path for c in diff_catalog(root).added]
+    diff = diff_catalog(root, sources=True)
+    assert [c.path for c in diff.added if c.path[0] == 'lake'] == [['lake'], ['lake', 't']]
+
+    requests_mock.get(_BASE + '/pds', json={'entityType': 'dataset', 'id': 'pds', 'path': ['lake', 't'], 'tag': 'u'})
+    assert [(c.id, c.tag) for c in diff_catalog(root, diff.snapshot, sources=True).modified] == [('pds', 'u')]
+
+
+def test_watch_catalog(requests_mock):
+    _mock(requests_mock, '1', 'a')
+    root = catalog('12345', 'https://example.com', print)
+    requests_mock.get(_BASE + '/s1', [{'json': _space('1', 'a')}, {'json': _space('1', 'b')}])
+    changes = list(itertools.islice(watch_catalog(root, interval=0), 1))
+    assert [(c.kind, c.path) for c in changes] == [('modified', ['sp', 'v'])]
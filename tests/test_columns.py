@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from dremio_client.model.catalog import catalog
+from dremio_client.model.columns import ColumnIndex
+from dremio_client.model.store import CatalogStore, set_store
+
+_BASE = 'https://example.com/api/v3/catalog'
+_FIELDS = [{'name': 'customer_id', 'type': {'name': 'BIGINT'}},
+           {'name': 'address', 'type': {'name': 'STRUCT',
+                                        'subSchema': [{'name': 'city', 'type': {'name': 'VARCHAR'}}]}}]
+
+
+def test_column_index():
+    index = ColumnIndex()
+    index.add(('sp', 'orders'), _FIELDS)
+    index.add(('sp', 'customers'), [{'name': 'Customer_ID', 'type': {'name': 'VARCHAR'}}])
+    index.add(('sp', 'events'), [{'name': 'customer_key', 'type': {'name': 'BIGINT'}}])
+
+    assert [m.path for m in index.find('customer_id')] == [('sp', 'customers'), ('sp', 'orders')]
+    assert index.find('CUSTOMER_ID', 'bigint') == [(('sp', 'orders'), 'customer_id', 'BIGINT')]
+    assert [m.name for m in index.find('address.c', match='prefix')] == ['address.city']
+    assert sorted(m.name for m in index.find('customer', match='prefix')) == ['Customer_ID', 'customer_id',
+                                                                              'customer_key']
+    assert [m.name for m in index.find('custmer_id', match='fuzzy')][:2] == ['Customer_ID', 'customer_id']
+    assert index.find('zzz', match='fuzzy') == []
+
+    index.add(('sp', 'orders'), [{'name': 'total', 'type': {'name': 'DOUBLE'}}])
+    assert [m.path for m in index.find('customer_id')] == [('sp', 'customers')]
+    index.remove(('sp', 'customers'))
+    assert index.find('customer_id') == [] and len(index) == 2
+    with pytest.raises(ValueError):
+        index.find('x', match='regex')
+
+
+def test_column_index_concurrent_adds():
+    index = ColumnIndex()
+    paths = [('sp', 'ds{}'.format(i)) for i in range(200)]
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda path: index.add(path, [{'name': 'c' + path[1][-1], 'type': {'name': 'INTEGER'}}]),
+                      paths))
+    assert len(index) == 200
+    assert sum(len(index.find('c{}'.format(i))) for i in range(10)) == 200
+
+
+def test_columns_indexed_as_loaded_and_stored(requests_mock, tmp_path):
+    listing = {'data': [{'id': 's1', 'path': ['sp'], 'tag': '0', 'type': 'CONTAINER', 'containerType': 'SPACE'}]}
+    space = {'entityType': 'space', 'id': 's1', 'name': 'sp', 'path': ['sp'], 'tag': '0', 'children': [
+        {'id': 'd1', 'path': ['sp', 'v'], 'tag': '1', 'type': 'DATASET'}]}
+    dataset = {'entityType': 'dataset', 'id': 'd1', 'path': ['sp', 'v'], 'tag': '1', 'type': 'VIRTUAL_DATASET',
+               'sql': 'select 1', 'fields': _FIELDS}
+    requests_mock.get(_BASE, json=listing)
+    requests_mock.get(_BASE + '/s1', json=space)
+    requests_mock.get(_BASE + '/d1', json=dataset)
+
+    store = CatalogStore(str(tmp_path / 'catalog.sqlite'))
+    set_store(store)
+    try:
+        cat = catalog('12345', 'https://example.com', print)
+        assert cat.find_columns('customer_id') == []
+        cat.sp.v.get()
+        assert [m.path for m in cat.find_columns('customer_id', 'BIGINT')] == [('sp', 'v')]
+
+        requests_mock.reset_mock()
+        cat = catalog('12345', 'https://example.com', print)
+        assert not cat._index.stored_columns_read
+        assert [m.name for m in cat.find_columns('address.', match='prefix')] == ['address.city']
+        assert not any(r.path.startswith('/api/v3/catalog/') for r in requests_mock.request_history)
+
+        # stored columns age with their dataset and go with it
+        store.max_age = -1
+        assert catalog('12345', 'https://example.com', print).find_columns('customer_id') == []
+        store.max_age = 300
+        store.invalidate('https://example.com', 'd1')
+        assert store._conn.execute('select count(*) from columns').fetchone()[0] == 0
+        assert catalog('12345', 'https://example.com', print).find_columns('customer_id') == []
+    finally:
+        set_store(None)
+        store.close()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+
+import datetime
+import json
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+from dremio_client.util.convert import to_arrow, to_arrow_type, table_to_pandas, RestStream  # NOQA: E402
+
+
+def test_to_arrow_types():
+    assert to_arrow_type({'name': 'BIGINT'}) == pa.int64()
+    assert to_arrow_type({'name': 'DECIMAL', 'precision': 10, 'scale': 2}) == pa.decimal128(10, 2)
+    assert to_arrow_type({'name': 'STRUCT', 'subSchema': [{'name': 'a', 'type': {'name': 'BOOLEAN'}}]}) == \
+        pa.struct([pa.field('a', pa.bool_())])
+    assert to_arrow_type({'name': 'INTERVAL_DAY_SECONDS'}) == pa.string()
+
+
+def test_to_arrow():
+    with open('tests/data/job_results.json') as f:
+        page = json.load(f)
+    second = {'schema': page['schema'], 'rows': page['rows'][:2]}
+    table = to_arrow(iter([page, second]))
+    assert table.num_rows == 102
+    assert table.schema.field('num_val').type == pa.int64()
+    assert table.schema.field('bool_val').type == pa.bool_()
+    assert table.schema.field('float_val').type == pa.float64()
+    assert table.column('num_val').to_pylist()[0] == 14400000
+    assert table.column('num_val').null_count > 0
+
+
+def test_to_arrow_temporal_and_fallback():
+    schema = [{'name': 'ts', 'type': {'name': 'TIMESTAMP'}}, {'name': 'd', 'type': {'name': 'DATE'}},
+              {'name': 'n', 'type': {'name': 'INTEGER'}}]
+    pages = [{'schema': schema, 'rows': [{'ts': '2019-08-08 16:17:05.170', 'd': '2019-08-08', 'n': 1}]},
+             {'schema': schema, 'rows': [{'ts': None, 'd': None, 'n': 'abc'}]}]
+    table = to_arrow(pages)
+    assert table.schema.field('ts').type == pa.timestamp('ms')
+    assert table.schema.field('d').type == pa.date32()
+    assert table.schema.field('n').type == pa.string()
+    assert table.column('n').to_pylist() == ['1', 'abc']
+
+
+def test_nested_column_falls_back_to_json():
+    schema = [{'name': 's', 'type': {'name': 'STRUCT', 'subSchema': [{'name': 'a', 'type': {'name': 'INTEGER'}}]}},
+              {'name': 'l', 'type': {'name': 'LIST', 'subSchema': [{'name': '$data$', 'type': {'name': 'INTEGER'}}]}}]
+    pages = [{'schema': schema, 'rows': [{'s': {'a': 1}, 'l': [1, 2]}, {}]},
+             {'schema': schema, 'rows': [{'s': 'bad', 'l': 'bad'}]}]
+    table = to_arrow(pages)
+    assert table.schema.field('s').type == pa.string() and table.schema.field('l').type == pa.string()
+    assert table.column('s').to_pylist() == ['{"a": 1}', None, 'bad']
+    assert table.column('l').to_pylist() == ['[1, 2]', None, 'bad']
+
+
+def test_rest_stream():
+    with open('tests/data/job_results.json') as f:
+        page = json.load(f)
+    with RestStream(iter([page, page]), pandas=True) as s:
+        assert s.schema.field('num_val').type == pa.int64()
+        frames = list(s)
+    assert [len(f) for f in frames] == [100, 100]
+    assert RestStream(iter([])).schema == pa.schema([])
+
+
+def test_rest_stream_keeps_schema():
+    schema = [{'name': 'n', 'type': {'name': 'INTEGER'}}]
+    pages = [{'schema': schema, 'rows': [{'n': 1}]}, {'schema': schema, 'rows': [{'n': 'abc'}, {'n': '2'}]},
+             {'schema': schema, 'rows': []}]
+    with RestStream(iter(pages)) as s:
+        batches = list(s)
+    assert all(b.schema == s.schema for b in batches)
+    assert [b.column(0).to_pylist() for b in batches] == [[1], [None, 2], []]
+    assert pa.Table.from_batches(batches).num_rows == 3
+
+
+def test_rest_stream_parses_time():
+    schema = [{'name': 't', 'type': {'name': 'TIME'}}]
+    pages = [{'schema': schema, 'rows': [{'t': '12:34:56.789'}, {'t': None}]},
+             {'schema': schema, 'rows': [{'t': '01:02:03'}, {'t': 'abc'}]}]
+    with RestStream(iter(pages)) as s:
+        batches = list(s)
+    assert s.schema.field('t').type == pa.time32('ms')
+    assert [b.column(0).to_pylist() for b in batches] == [
+        [datetime.time(12, 34, 56, 789000), None], [datetime.time(1, 2, 3), None]]
+    assert to_arrow(pages[:1]).column('t').to_pylist() == [datetime.time(12, 34, 56, 789000), None]
+
+
+def test_table_to_pandas_low_memory():
+    def table():
+        return pa.Table.from_batches([pa.record_batch([pa.array([1, 2, None]), pa.array(['a', 'b', 'a'])],
+                                                      names=['n', 's'])] * 2)
+
+    default = table_to_pandas(table())
+    assert str(default['s'].dtype) != 'category'
+    assert default.attrs['conversion_peak_memory'] > 0
+    pool = pa.system_memory_pool()
+    df = table_to_pandas(table(), low_memory=True, memory_pool=pool)
+    assert str(df['s'].dtype) == 'category'
+    assert list(df['s']) == list(default['s']) and df['n'].equals(default['n'])
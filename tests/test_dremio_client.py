@@ -29,11 +29,15 @@ from __future__ import division
 
 
 import json
+import threading
+import time
+import pytest
 from click.testing import CliRunner
 
 from dremio_client.auth import basic_auth
 from dremio_client.model.catalog import catalog
-from dremio_client import cli
+from dremio_client import cli, DremioClient
+from dremio_client.conf import build_config
 
 
 def test_command_line_interface(requests_mock):
@@ -57,6 +61,45 @@ def test_command_line_interface(requests_mock):
     assert 'execute a query given by sql and print results' in help_result.output
 
 
+def _mock_rest_query(requests_mock):
+    requests_mock.post('http://localhost:9047/apiv2/login', text=json.dumps({'token': '12345'}))
+    with open('tests/data/sql.json', 'r+') as f:
+        requests_mock.post('http://localhost:9047/api/v3/sql', text=json.dumps(json.load(f)))
+    with open('tests/data/job_status.json', 'r+') as f:
+        requests_mock.get('http://localhost:9047/api/v3/job/22b3b4fe-669a-4789-a9de-b1fc5ba7b500',
+                          text=json.dumps(json.load(f)))
+    with open('tests/data/job_results.json', 'r+') as f:
+        requests_mock.get('http://localhost:9047/api/v3/job/22b3b4fe-669a-4789-a9de-b1fc5ba7b500/results',
+                          text=json.dumps(json.load(f)))
+
+
+def test_export_falls_back_to_rest(requests_mock, tmp_path):
+    pytest.importorskip('pyarrow.flight')
+    _mock_rest_query(requests_mock)
+    output = str(tmp_path / 'out.arrow')
+    # nothing listens on the flight port
+    result = CliRunner().invoke(cli.export, ['--sql', 'select * from sys.options', '-o', output, '-f', 'arrow'],
+                                obj={}, catch_exceptions=False)
+    assert result.exit_code == 0
+    assert 'wrote 100 rows' in result.output
+
+
+def test_client_falls_back_to_rest(requests_mock, tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow.flight')
+    monkeypatch.setattr('dremio_client.dremio_client._odbc_query', _no_odbc)
+    _mock_rest_query(requests_mock)
+    with open('tests/data/catalog.json', 'r+') as f:
+        requests_mock.get('http://localhost:9047/api/v3/catalog', text=json.dumps(json.load(f)))
+    client = DremioClient(build_config({}))
+    # nothing listens on the flight port
+    assert client.export('select * from sys.options', str(tmp_path / 'out.arrow'), 'arrow') == 100
+    assert client.query('select * from sys.options', pandas=False).num_rows == 100
+
+
+def _no_odbc(*args, **kwargs):
+    raise NotImplementedError('odbc is not installed')
+
+
 def test_auth(requests_mock):
     requests_mock.post('https://example.com/apiv2/login', text=json.dumps({'token': '12345'}))
     token = basic_auth('https://example.com', 'foo', 'bar')
@@ -96,3 +139,87 @@ def test_dataset(requests_mock):
     c = catalog(token, 'https://example.com', lambda x: x)
     sql = c.adls.profiles.sql
     assert sql('hello') == 'hello'
+
+
+def test_catalog_index(requests_mock):
+    with open('tests/data/catalog.json', 'r+') as f:
+        requests_mock.get('https://example.com/api/v3/catalog', text=json.dumps(json.load(f)))
+    with open('tests/data/adls.json', 'r+') as f:
+        requests_mock.get('https://example.com/api/v3/catalog/1a2b82e3-08fc-43f7-a426-76bee4abaaef',
+                          text=json.dumps(json.load(f)))
+    with open('tests/data/nyctaxi.json', 'r+') as f:
+        requests_mock.get('https://example.com/api/v3/catalog/by-path/adls/nyctaxi', text=json.dumps(json.load(f)))
+
+    c = catalog('12345', 'https://example.com', print)
+    assert c.find('1a2b82e3-08fc-43f7-a426-76bee4abaaef') is c.adls
+    with pytest.raises(KeyError):
+        c.find('adls.nyctaxi')
+    c.adls.nyctaxi.get()
+    calls = requests_mock.call_count
+    assert c.find('adls.nyctaxi') is c.adls.nyctaxi
+    assert c.find(['adls', 'nyctaxi']) is c.find('352f1c4b-4772-43d5-8621-23aacd5955c3')
+    ds = c.adls.nyctaxi.yellow_tripdata_2009_01_csv
+    assert c.find('adls.nyctaxi."yellow_tripdata_2009-01.csv"') is ds
+    assert c.find('adls.nyctaxi.yellow_tripdata_2009_01_csv') is ds
+    assert requests_mock.call_count == calls
+
+
+def test_missing_attributes_are_remembered(requests_mock):
+    with open('tests/data/catalog.json', 'r+') as f:
+        requests_mock.get('https://example.com/api/v3/catalog', text=json.dumps(json.load(f)))
+    with open('tests/data/adls.json', 'r+') as f:
+        requests_mock.get('https://example.com/api/v3/catalog/1a2b82e3-08fc-43f7-a426-76bee4abaaef',
+                          text=json.dumps(json.load(f)))
+    with open('tests/data/profiles.json', 'r+') as f:
+        requests_mock.get('https://example.com/api/v3/catalog/by-path/adls/profiles', text=json.dumps(json.load(f)))
+
+    c = catalog('12345', 'https://example.com', print)
+    profiles = c.adls.profiles
+    calls = requests_mock.call_count
+    assert not hasattr(profiles, 'nope')
+    fetched = requests_mock.call_count
+    assert fetched > calls
+    assert not hasattr(profiles, 'nope') and not hasattr(profiles, 'other') and not hasattr(profiles, '__array__')
+    with pytest.raises(KeyError):
+        profiles.nope
+    assert requests_mock.call_count == fetched
+
+    profiles.invalidate()
+    assert not hasattr(profiles, 'nope')
+    assert requests_mock.call_count > fetched
+
+
+def test_prefetch_does_not_block_dir(requests_mock):
+    with open('tests/data/catalog.json', 'r+') as f:
+        requests_mock.get('https://example.com/api/v3/catalog', text=json.dumps(json.load(f)))
+    with open('tests/data/adls.json', 'r+') as f:
+        adls = json.dumps(json.load(f))
+    released = threading.Event()
+
+    def slow(request, context):
+        released.wait(5)
+        return adls
+
+    requests_mock.get('https://example.com/api/v3/catalog/1a2b82e3-08fc-43f7-a426-76bee4abaaef', text=slow)
+
+    c = catalog('12345', 'https://example.com', print)
+    c.enable_prefetch(deadline=0.05)
+    try:
+        source = dict.__getitem__(c, 'adls')
+        start = time.time()
+        assert 'profiles' not in dir(source)
+        assert time.time() - start < 1
+        released.set()
+        while not all(f.done() for f in list(c._index.prefetcher._pending.values())):
+            time.sleep(0.01)
+        assert 'profiles' not in dict.keys(source)  # only applied by the thread touching it
+        assert catalog('12345', 'https://example.com', print)._prefetcher is None
+        assert 'profiles' in dir(c.adls)
+        assert len([i for i in requests_mock.request_history if '1a2b82e3' in i.url]) == 1
+        assert not c._index.prefetcher._pending.get(('adls',))
+        assert ('adls',) in c._index.prefetcher._expanded
+        source.invalidate()
+        assert ('adls',) not in c._index.prefetcher._expanded
+    finally:
+        released.set()
+        c.disable_prefetch()
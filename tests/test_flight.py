@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+
+import gc
+import threading
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+flight = pytest.importorskip('pyarrow.flight')
+from dremio_client.flight import query, stream, FlightClientPool  # NOQA: E402
+from dremio_client.util.export import export  # NOQA: E402
+
+
+class _AuthHandler(flight.ServerAuthHandler):
+    def __init__(self):
+        super(_AuthHandler, self).__init__()
+        self.handshakes = 0
+        self.valid = set()
+
+    def authenticate(self, outgoing, incoming):
+        auth = flight.BasicAuth.deserialize(incoming.read())
+        if auth.username != b'dremio':
+            raise flight.FlightUnauthenticatedError('bad user')
+        self.handshakes += 1
+        token = 'token{}'.format(self.handshakes).encode('utf-8')
+        self.valid.add(token)
+        outgoing.write(token)
+
+    def is_valid(self, token):
+        if token not in self.valid:
+            raise flight.FlightUnauthenticatedError('token expired')
+        return token
+
+
+class _Server(flight.FlightServerBase):
+    """serve 'select n' as a table of n rows split over a few endpoints"""
+
+    def __init__(self, endpoints=1):
+        self.auth = _AuthHandler()
+        super(_Server, self).__init__('grpc://127.0.0.1:0', auth_handler=self.auth)
+        self.endpoints = endpoints
+
+    def get_flight_info(self, context, descriptor):
+        rows = int(descriptor.command.decode('utf-8').split()[-1])
+        tickets = ['{}:{}:{}'.format(rows, i, self.endpoints) for i in range(self.endpoints)]
+        return flight.FlightInfo(_schema(), descriptor, [flight.FlightEndpoint(t, []) for t in tickets], rows, -1)
+
+    def do_get(self, context, ticket):
+        rows, part, parts = [int(i) for i in ticket.ticket.decode('utf-8').split(':')]
+        values = [i for i in range(rows) if i % parts == part]
+        batches = [pa.RecordBatch.from_arrays([pa.array(values[i:i + 10], pa.int64())], schema=_schema())
+                   for i in range(0, len(values), 10)]
+        return flight.RecordBatchStream(pa.Table.from_batches(batches, schema=_schema()))
+
+
+def _schema():
+    return pa.schema([pa.field('n', pa.int64())])
+
+
+@pytest.fixture
+def server():
+    s = _Server()
+    yield s
+    s.shutdown()
+
+
+def test_query(server):
+    table = query('select 25', hostname='127.0.0.1', port=server.port, pandas=False)
+    assert table.column('n').to_pylist() == list(range(25))
+
+
+def test_query_low_memory(server):
+    df = query('select 100', hostname='127.0.0.1', port=server.port, low_memory=True,
+               memory_pool=pa.system_memory_pool())
+    assert list(df['n']) == list(range(100))
+
+
+def test_pool_connects_over_tls(monkeypatch):
+    calls = list()
+    monkeypatch.setattr('dremio_client.flight.pool.connect', lambda *args, **kwargs: calls.append(kwargs) or object())
+    pool = FlightClientPool('127.0.0.1', 1234, tls=True, verify=False)
+    pool.release(pool.acquire())
+    assert calls == [{'tls_root_certs': None, 'tls': True, 'verify': False}]
+
+
+def test_pool_reuses_clients(server):
+    pool = FlightClientPool('127.0.0.1', server.port, max_size=2)
+    results = list()
+
+    def run():
+        for _ in range(5):
+            results.append(pool.run(lambda c: query('select 5', client=c, pandas=False)).num_rows)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    assert results == [5] * 20
+    assert server.auth.handshakes <= 2
+    handshakes = server.auth.handshakes
+    server.auth.valid.clear()
+    assert pool.run(lambda c: query('select 3', client=c, pandas=False)).num_rows == 3
+    assert server.auth.handshakes == handshakes + 1
+    pool.close()
+
+
+def test_query_reads_all_endpoints():
+    server = _Server(endpoints=3)
+    try:
+        ordered = query('select 100', hostname='127.0.0.1', port=server.port, pandas=False)
+        assert ordered.column('n').to_pylist() == [i for p in range(3) for i in range(100) if i % 3 == p]
+        interleaved = query('select 100', hostname='127.0.0.1', port=server.port, pandas=False, ordered=False)
+        assert sorted(interleaved.column('n').to_pylist()) == list(range(100))
+        empty = query('select 0', hostname='127.0.0.1', port=server.port, pandas=False)
+        assert empty.num_rows == 0 and empty.schema == _schema()
+    finally:
+        server.shutdown()
+
+
+def test_stream():
+    server = _Server(endpoints=3)
+    try:
+        with stream('select 100', hostname='127.0.0.1', port=server.port, buffer_size=1) as s:
+            assert s.schema == _schema()
+            batches = list(s)
+        assert [b.num_rows for b in batches] == [10, 10, 10, 4] * 1 + [10, 10, 10, 3] * 2
+        assert [i for b in batches for i in b.column(0).to_pylist()] == \
+            [i for p in range(3) for i in range(100) if i % 3 == p]
+
+        s = stream('select 1000', hostname='127.0.0.1', port=server.port, buffer_size=1, ordered=False, pandas=True)
+        first = next(iter(s))
+        assert len(first) == 10 and list(first.columns) == ['n']
+        s.close()
+    finally:
+        server.shutdown()
+
+
+def test_stream_releases_client():
+    server = _Server(endpoints=3)
+    pool = FlightClientPool('127.0.0.1', server.port, max_size=1)
+    closed = list()
+
+    def open_stream():
+        pooled = pool.acquire()
+        return stream('select 1000', client=pooled.client, buffer_size=1,
+                      on_close=lambda: closed.append('close') or pool.release(pooled),
+                      on_abort=lambda: closed.append('abort') or pool.release(pooled, discard=True))
+
+    try:
+        with open_stream() as s:
+            assert sum(b.num_rows for b in s) == 1000
+        assert closed == ['close']
+
+        s = open_stream()
+        it = iter(s)
+        next(it)
+        threads = set(s._state.threads)
+        assert threads
+        del s, it
+        gc.collect()
+        assert closed == ['close', 'abort']
+        assert not any(t.is_alive() for t in threads)
+        with pool.client() as c:
+            assert query('select 5', client=c, pandas=False).num_rows == 5
+    finally:
+        pool.close()
+        server.shutdown()
+
+
+def test_export(server, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    with stream('select 1000', hostname='127.0.0.1', port=server.port) as s:
+        assert export(s, str(tmp_path / 'out.parquet'), row_group_size=300) == 1000
+    f = pq.ParquetFile(str(tmp_path / 'out.parquet'))
+    assert [f.metadata.row_group(i).num_rows for i in range(f.num_row_groups)] == [300, 300, 300, 100]
+    assert f.read().column('n').to_pylist() == list(range(1000))
+
+    with stream('select 1000', hostname='127.0.0.1', port=server.port) as s:
+        assert export(s, str(tmp_path / 'out.arrow'), 'arrow', compression='zstd') == 1000
+    table = pa.ipc.open_file(str(tmp_path / 'out.arrow')).read_all()
+    assert table.schema == _schema() and table.column('n').to_pylist() == list(range(1000))
+
+
+def test_export_full_row_groups(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    batches = [pa.RecordBatch.from_arrays([pa.array(range(i, i + 70), pa.int64())], schema=_schema())
+               for i in range(0, 700, 70)]
+    assert export(batches, str(tmp_path / 'out.parquet'), schema=_schema(), row_group_size=100) == 700
+    f = pq.ParquetFile(str(tmp_path / 'out.parquet'))
+    assert [f.metadata.row_group(i).num_rows for i in range(f.num_row_groups)] == [100] * 7
+    assert f.read().column('n').to_pylist() == list(range(700))
+
+
+def test_export_arrow_default_compression(tmp_path):
+    batches = [pa.RecordBatch.from_arrays([pa.array(range(10), pa.int64())], schema=_schema())]
+    assert export(batches, str(tmp_path / 'out.arrow'), 'arrow', schema=_schema()) == 10
+    assert pa.ipc.open_file(str(tmp_path / 'out.arrow')).read_all().column('n').to_pylist() == list(range(10))
+    with pytest.raises(ValueError):
+        export(batches, str(tmp_path / 'bad.arrow'), 'arrow', schema=_schema(), compression='snappy')
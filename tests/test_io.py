@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+
+import io
+import json
+import re
+
+from dremio_client.model.catalog import catalog
+from dremio_client.util.crawler import crawl
+from dremio_client.util.io import serialize_catalog, dump_catalog, load_catalog
+
+_BASE = 'https://example.com/api/v3/catalog'
+
+
+def _mock_catalog(requests_mock):
+    requests_mock.get(_BASE, json={'data': [
+        {'id': 'h', 'path': ['@me'], 'type': 'CONTAINER', 'containerType': 'HOME'},
+        {'id': 's1', 'path': ['sp'], 'type': 'CONTAINER', 'containerType': 'SPACE'},
+        {'id': 'src1', 'path': ['src'], 'type': 'CONTAINER', 'containerType': 'SOURCE'}]})
+    entities = {
+        'h': {'entityType': 'home', 'id': 'h', 'path': ['@me'], 'children': []},
+        's1': {'entityType': 'space', 'id': 's1', 'name': 'sp', 'path': ['sp'], 'children': [
+            {'id': 'f1', 'path': ['sp', 'f'], 'type': 'CONTAINER', 'containerType': 'FOLDER'},
+            {'id': 'd1', 'path': ['sp', 'v'], 'type': 'DATASET'}]},
+        'f1': {'entityType': 'folder', 'id': 'f1', 'path': ['sp', 'f'], 'children': [
+            {'id': 'd2', 'path': ['sp', 'f', 'p'], 'type': 'DATASET'}]},
+        'd1': {'entityType': 'dataset', 'id': 'd1', 'path': ['sp', 'v'], 'type': 'VIRTUAL_DATASET', 'sql': 'x'},
+        'd2': {'entityType': 'dataset', 'id': 'd2', 'path': ['sp', 'f', 'p'], 'type': 'PHYSICAL_DATASET'},
+        'src1': {'entityType': 'source', 'id': 'src1', 'name': 'src', 'type': 'NAS', 'path': ['src'], 'children': []},
+    }
+    requests_mock.get(re.compile(_BASE + '/[a-z0-9]+$'),
+                      json=lambda request, context: entities[request.path.split('/')[-1]])
+    requests_mock.get(re.compile(_BASE + '/.*/collaboration/tag'),
+                      json=lambda request, context: {'tags': [request.path.split('/')[-3]], 'version': 0})
+    requests_mock.get(re.compile(_BASE + '/.*/collaboration/wiki'), status_code=404, json={})
+    return catalog('12345', 'https://example.com', print)
+
+
+def test_crawl(requests_mock):
+    cat = _mock_catalog(requests_mock)
+    entities = sorted(crawl(cat, max_workers=3), key=lambda e: e.position)
+    assert [e.item.meta.path for e in entities] == [['sp'], ['sp', 'f'], ['sp', 'f', 'p'], ['sp', 'v'], ['src']]
+    assert [e.tags.tags if e.tags else None for e in entities] == [None, None, ['d2'], ['d1'], ['src1']]
+    assert all(e.wiki is None for e in entities)
+
+
+def test_serialize_catalog(requests_mock):
+    cat = _mock_catalog(requests_mock)
+    data, acls, collabs = serialize_catalog(cat, with_extra=True)
+    assert [json.loads(d)['path'] for d in json.loads(data)] == \
+        [['sp'], ['sp', 'f'], ['sp', 'f', 'p'], ['sp', 'v'], ['src']]
+    assert json.loads(acls) == [None] * 3
+    assert [t['tags'] for t in json.loads(collabs)['tags']] == [['d2'], ['d1'], ['src1']]
+
+    requests_mock.reset_mock()
+    assert len(json.loads(serialize_catalog(_mock_catalog(requests_mock)))) == 5
+    assert not any('collaboration' in r.path for r in requests_mock.request_history)
+
+
+def test_dump_catalog(requests_mock, tmp_path):
+    cat = _mock_catalog(requests_mock)
+    out = io.StringIO()
+    assert dump_catalog(cat, out, with_extra=True, max_workers=3) == 5
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert sorted(r['entity']['path'] for r in records) == \
+        [['sp'], ['sp', 'f'], ['sp', 'f', 'p'], ['sp', 'v'], ['src']]
+    paths = [r['entity']['path'] for r in records]
+    assert paths.index(['sp']) < paths.index(['sp', 'f']) < paths.index(['sp', 'f', 'p'])
+    assert sorted(r['tags']['tags'] for r in records if r['tags']) == [['d1'], ['d2'], ['src1']]
+
+    path = str(tmp_path / 'catalog.jsonl.gz')
+    assert dump_catalog(_mock_catalog(requests_mock), path) == 5
+    with open(path, 'rb') as f:
+        assert f.read(2) == b'\x1f\x8b'
+
+    class Client(object):
+        data = catalog('12345', 'https://example.com', print)
+
+    client = load_catalog(path, Client())
+    assert client.data.find(['sp', 'f', 'p']).meta.type == 'PHYSICAL_DATASET'
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+
+import itertools
+import re
+import threading
+import time
+
+import pytest
+
+from dremio_client.error import DremioException
+from dremio_client.util import ExponentialBackoff, FixedPolling, JobTracker, run, wait_for_job
+from dremio_client.util.query import fetch_results, _inflight
+from dremio_client.util.singleflight import SingleFlight
+
+
+def test_exponential_backoff():
+    polling = ExponentialBackoff(initial=0.01, factor=2, max_sleep=1, jitter=0.1)
+    delays = list(itertools.islice(polling.delays(), 12))
+    assert 0.009 <= delays[0] <= 0.011
+    assert all(d <= 1 for d in delays)
+    assert delays[-1] >= 0.9
+    assert list(itertools.islice(FixedPolling(3).delays(), 2)) == [3, 3]
+
+
+def test_wait_for_job(requests_mock):
+    requests_mock.get('http://localhost:9047/api/v3/job/1', [
+        {'json': {'jobState': 'RUNNING'}},
+        {'json': {'jobState': 'RUNNING'}},
+        {'json': {'jobState': 'COMPLETED', 'rowCount': 5}}])
+    polling = ExponentialBackoff(initial=0.001, max_sleep=0.01)
+    start = time.time()
+    state = wait_for_job('1234', 'http://localhost:9047', '1', polling)
+    assert time.time() - start < 1
+    assert state['rowCount'] == 5
+    assert polling.polls == {'1': 3}
+
+
+def test_fetch_results_in_order(requests_mock):
+    def page(request, context):
+        offset = int(request.qs['offset'][0])
+        limit = int(request.qs['limit'][0])
+        time.sleep(0.01 * (offset % 3))
+        return {'rowCount': 1234, 'rows': [{'i': i} for i in range(offset, min(offset + limit, 1234))]}
+
+    requests_mock.get('http://localhost:9047/api/v3/job/1/results', json=page)
+    pages = list(fetch_results('1234', 'http://localhost:9047', '1', 1234, page_size=1000, prefetch=3))
+    assert [len(p['rows']) for p in pages] == [500, 500, 234]
+    assert [r['i'] for p in pages for r in p['rows']] == list(range(1234))
+
+
+def test_fetch_results_empty(requests_mock):
+    schema = [{'name': 'i', 'type': {'name': 'INTEGER'}}]
+    requests_mock.get('http://localhost:9047/api/v3/job/1/results', json={'rowCount': 0, 'schema': schema, 'rows': []})
+    pages = list(fetch_results('1234', 'http://localhost:9047', '1', 0))
+    assert pages == [{'rowCount': 0, 'schema': schema, 'rows': []}]
+
+
+def test_job_tracker(requests_mock):
+    jobs = itertools.count()
+    running = list()
+
+    def submit(request, context):
+        running.append(tracker.running)
+        return {'id': str(next(jobs))}
+
+    requests_mock.post('http://localhost:9047/api/v3/sql', json=submit)
+    polls = dict()
+
+    def status(request, context):
+        job_id = request.path.split('/')[-1]
+        polls[job_id] = polls.get(job_id, 0) + 1
+        if job_id == '3':
+            return {'jobState': 'FAILED'}
+        return {'jobState': 'COMPLETED' if polls[job_id] > 2 else 'RUNNING', 'rowCount': 1}
+
+    requests_mock.get(re.compile('http://localhost:9047/api/v3/job/[0-9]+$'), json=status)
+    requests_mock.get(re.compile('http://localhost:9047/api/v3/job/[0-9]+/results'),
+                      json=lambda request, context: {'rows': [{'job': request.path.split('/')[-2]}]})
+    tracker = JobTracker(max_running=2, polling=ExponentialBackoff(initial=0.001, max_sleep=0.01))
+    futures = [tracker.submit('1234', 'http://localhost:9047', 'select {}'.format(i)) for i in range(20)]
+    assert tracker.queued + tracker.running <= 20
+    results = list()
+    for f in futures:
+        try:
+            results.append(f.result(timeout=10)[0]['rows'][0]['job'])
+        except DremioException:
+            results.append(None)
+    tracker.shutdown()
+    assert results.count(None) == 1
+    assert sorted(r for r in results if r) == sorted(str(i) for i in range(20) if i != 3)
+    assert all(v == 3 for k, v in polls.items() if k != '3')
+    assert tracker.running == 0
+    assert max(running) <= 2
+
+
+def test_job_tracker_fetch_does_not_block_polling(requests_mock, monkeypatch):
+    jobs = itertools.count()
+    requests_mock.post('http://localhost:9047/api/v3/sql', json=lambda request, context: {'id': str(next(jobs))})
+    polls = dict()
+
+    def status(request, context):
+        job_id = request.path.split('/')[-1]
+        polls[job_id] = polls.get(job_id, 0) + 1
+        return {'jobState': 'COMPLETED' if job_id == '0' or polls[job_id] > 3 else 'RUNNING', 'rowCount': 1}
+
+    released = threading.Event()
+
+    def results(token, base_url, job_id, *args):
+        if job_id == '0':
+            released.wait(5)
+        return [{'rows': [{'job': job_id}]}]
+
+    requests_mock.get(re.compile('http://localhost:9047/api/v3/job/[0-9]+$'), json=status)
+    monkeypatch.setattr('dremio_client.util.jobs.fetch_results', results)
+    tracker = JobTracker(workers=1, polling=ExponentialBackoff(initial=0.001, max_sleep=0.01))
+    try:
+        slow = tracker.submit('1234', 'http://localhost:9047', 'select 0')
+        while not polls.get('0'):
+            time.sleep(0.001)
+        fast = tracker.submit('1234', 'http://localhost:9047', 'select 1')
+        assert fast.result(timeout=5)[0]['rows'] == [{'job': '1'}]
+        assert not slow.done()
+    finally:
+        released.set()
+    assert slow.result(timeout=5)[0]['rows'] == [{'job': '0'}]
+    tracker.shutdown()
+
+
+def test_single_flight():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = list()
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return [1]
+
+    results = list()
+    leader = threading.Thread(target=lambda: results.append(flights.do('k', slow)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flights.do('k', slow))) for _ in range(3)]
+    for t in followers:
+        t.start()
+    time.sleep(0.1)
+    release.set()
+    for t in [leader] + followers:
+        t.join(5)
+    assert calls == [1] and len(flights) == 0
+    assert results == [([1], True)] * 4
+    assert flights.do('k', lambda: 2) == (2, False)
+
+
+@pytest.mark.parametrize('statements, jobs', [(('select 1', ' select  1;'), 1),
+                                               (('insert into s.t select 1', 'insert into s.t select 1'), 2)])
+def test_run_shares_job(requests_mock, statements, jobs):
+    submitted = list()
+
+    def status(request, context):
+        time.sleep(0.2)
+        return {'jobState': 'COMPLETED', 'rowCount': 1}
+
+    requests_mock.post('http://localhost:9047/api/v3/sql', json=lambda r, c: submitted.append(1) or {'id': '1'})
+    requests_mock.get('http://localhost:9047/api/v3/job/1', json=status)
+    requests_mock.get('http://localhost:9047/api/v3/job/1/results', json={'rows': [{'a': 1}]})
+    results = list()
+    threads = [threading.Thread(target=lambda: results.append(list(run('1234', 'http://localhost:9047', sql))))
+               for sql in statements]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert submitted == [1] * jobs and len(_inflight) == 0
+    assert results == [[{'rows': [{'a': 1}]}]] * 2
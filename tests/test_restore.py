@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+import json
+
+from dremio_client.model.catalog import catalog
+from dremio_client.util.polling import FixedPolling
+from dremio_client.util.restore import restore_catalog
+
+_ENTITIES = [
+    {'entityType': 'space', 'id': 's1', 'name': 'sp', 'path': ['sp']},
+    {'entityType': 'dataset', 'id': 'd1', 'path': ['sp', 'f', 'report'], 'type': 'VIRTUAL_DATASET',
+     'sql': 'select * from f.base join "sp"."f"."other" using (x)', 'sqlContext': ['sp']},
+    {'entityType': 'folder', 'id': 'f1', 'path': ['sp', 'f']},
+    {'entityType': 'dataset', 'id': 'd2', 'path': ['sp', 'f', 'base'], 'type': 'VIRTUAL_DATASET', 'sql': 'select 1'},
+    {'entityType': 'dataset', 'id': 'd3', 'path': ['sp', 'f', 'other'], 'type': 'VIRTUAL_DATASET', 'sql': 'select 2'},
+    {'entityType': 'home', 'id': 'h', 'path': ['@me']},
+]
+
+
+class _Client(object):
+
+    def __init__(self, requests_mock):
+        requests_mock.get('https://example.com/api/v3/catalog', json={'data': []})
+        self.data = catalog('12345', 'https://example.com', print)
+
+
+def _mock_server(requests_mock, failures=None):
+    posted = list()
+    failures = failures or dict()
+
+    def post(request, context):
+        body = request.json()
+        name = body['path'][-1]
+        if failures.get(name):
+            context.status_code = failures[name].pop(0)
+            return {'errorMessage': 'no'}
+        posted.append(name)
+        body['id'] = 'new-' + name
+        return body
+
+    requests_mock.post('https://example.com/api/v3/catalog', json=post)
+    return posted
+
+
+def test_restore_in_dependency_order(requests_mock, tmp_path):
+    posted = _mock_server(requests_mock, {'base': [503], 'other': [409]})
+    checkpoint = str(tmp_path / 'restore.jsonl')
+    result = restore_catalog([json.dumps(e) for e in _ENTITIES], _Client(requests_mock), max_workers=4,
+                             checkpoint=checkpoint, backoff=FixedPolling(0.001))
+    assert posted == ['sp', 'f', 'base', 'report']
+    assert result.created == [['sp'], ['sp', 'f'], ['sp', 'f', 'base'], ['sp', 'f', 'report']]
+    assert result.existing == [['sp', 'f', 'other']]
+    assert not result.failed and not result.skipped
+
+    del posted[:]
+    result = restore_catalog(_ENTITIES, _Client(requests_mock), checkpoint=checkpoint)
+    assert posted == []
+    assert len(result.existing) == 5
+
+
+def test_restore_skips_dependents_of_failures(requests_mock):
+    posted = _mock_server(requests_mock, {'f': [400]})
+    result = restore_catalog(_ENTITIES, _Client(requests_mock), retries=1, backoff=FixedPolling(0.001))
+    assert posted == ['sp']
+    assert [path for path, _ in result.failed] == [['sp', 'f']]
+    assert sorted(result.skipped) == [['sp', 'f', 'base'], ['sp', 'f', 'other'], ['sp', 'f', 'report']]
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+import json
+
+from click.testing import CliRunner
+
+from dremio_client import cli
+from dremio_client.model.catalog import catalog
+from dremio_client.util.search import SearchIndex
+
+_BASE = 'https://example.com/api/v3/catalog'
+
+
+def _mock(requests_mock, customers_tag='1', with_orders=True):
+    children = [{'id': 'd1', 'path': ['sp', 'customers'], 'tag': customers_tag, 'type': 'DATASET'}]
+    if with_orders:
+        children.append({'id': 'd2', 'path': ['sp', 'orders'], 'tag': '1', 'type': 'DATASET'})
+    requests_mock.get(_BASE, json={'data': [
+        {'id': 's1', 'path': ['sp'], 'tag': customers_tag, 'type': 'CONTAINER', 'containerType': 'SPACE'}]})
+    requests_mock.get(_BASE + '/s1', json={'entityType': 'space', 'id': 's1', 'path': ['sp'], 'tag': customers_tag,
+                                           'children': children})
+    requests_mock.get(_BASE + '/s1/collaboration/wiki', status_code=404, json={})
+    requests_mock.get(_BASE + '/d1/collaboration/tag', json={'tags': ['pii', 'gold'], 'version': 0})
+    requests_mock.get(_BASE + '/d1/collaboration/wiki', json={'text': 'Customer master data', 'version': 0})
+    requests_mock.get(_BASE + '/d2/collaboration/tag', json={'tags': [], 'version': 0})
+    requests_mock.get(_BASE + '/d2/collaboration/wiki', json={'text': '# Orders\nplaced by each customer',
+                                                              'version': 0})
+
+
+def test_search_index(requests_mock, tmp_path):
+    _mock(requests_mock)
+    path = str(tmp_path / 'search.json.gz')
+    index = SearchIndex(path)
+    index.refresh(catalog('12345', 'https://example.com', print), max_workers=2)
+    index.save()
+    assert len(index) == 3
+
+    assert [h.path for h in index.search('pii')] == [['sp', 'customers']]
+    assert sorted(h.path for h in index.search('customer')) == [['sp', 'customers'], ['sp', 'orders']]
+    assert [h.path for h in index.search('orders CUSTOMER')] == [['sp', 'orders']]
+    assert [h.path for h in index.search('cust*')][0] == ['sp', 'customers']
+    assert index.search('nothing') == [] and index.search('') == []
+
+    requests_mock.reset_mock()
+    loaded = SearchIndex(path)
+    assert [h.id for h in loaded.search('gold')] == ['d1']
+    assert not requests_mock.request_history
+
+    _mock(requests_mock, customers_tag='2', with_orders=False)
+    requests_mock.get(_BASE + '/d1/collaboration/tag', json={'tags': ['silver'], 'version': 1})
+    requests_mock.reset_mock()
+    diff = loaded.refresh(catalog('12345', 'https://example.com', print))
+    assert [c.id for c in diff.removed] == ['d2']
+    assert sorted(r.path for r in requests_mock.request_history if 'collaboration' in r.path) == \
+        ['/api/v3/catalog/d1/collaboration/tag', '/api/v3/catalog/d1/collaboration/wiki',
+         '/api/v3/catalog/s1/collaboration/wiki']
+    assert loaded.search('gold') == [] and loaded.search('orders') == []
+    assert [h.tags for h in loaded.search('silver')] == [['silver']]
+
+    # wiki edits don't change the catalog tag
+    requests_mock.get(_BASE + '/d1/collaboration/wiki', json={'text': 'Clients of the shop', 'version': 1})
+    diff = loaded.refresh(catalog('12345', 'https://example.com', print))
+    assert not diff.modified
+    assert [h.id for h in loaded.search('shop')] == ['d1'] and loaded.search('master') == []
+    loaded.save()
+
+    result = CliRunner().invoke(cli.search, ['silv*', '-i', path], obj={}, catch_exceptions=False)
+    assert result.exit_code == 0
+    assert [h['path'] for h in json.loads(result.output)] == [['sp', 'customers']]
+
+
+def test_refresh_sub_catalog(requests_mock, tmp_path):
+    _mock(requests_mock)
+    requests_mock.get(_BASE, json={'data': [
+        {'id': 's1', 'path': ['sp'], 'tag': '1', 'type': 'CONTAINER', 'containerType': 'SPACE'},
+        {'id': 's2', 'path': ['other'], 'tag': '1', 'type': 'CONTAINER', 'containerType': 'SPACE'}]})
+    requests_mock.get(_BASE + '/s2', json={'entityType': 'space', 'id': 's2', 'path': ['other'], 'tag': '1',
+                                           'children': []})
+    requests_mock.get(_BASE + '/s2/collaboration/wiki', json={'text': 'unrelated', 'version': 0})
+    root = catalog('12345', 'https://example.com', print)
+    index = SearchIndex(str(tmp_path / 'search.json.gz'))
+    index.refresh(root)
+    assert len(index) == 4
+
+    _mock(requests_mock, with_orders=False)
+    requests_mock.get(_BASE + '/d1/collaboration/wiki', status_code=403, json={})
+    diff = index.refresh(root.sp)
+    assert [c.id for c in diff.removed] == ['d2'] and not diff.added
+    assert [h.id for h in index.search('unrelated')] == ['s2']
+    assert sorted(index.snapshot) == ['d1', 's1', 's2']
+    assert index.search('master') == [] and [h.id for h in index.search('pii')] == ['d1']
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+
+from dremio_client.conf import build_config
+from dremio_client.model.endpoints import catalog
+from dremio_client.session import configure_session, get_session, make_session, set_session
+
+
+def test_configure_session():
+    config = build_config({'http.pool.maxsize': 3})
+    session = configure_session(config)
+    assert session is get_session()
+    assert session.get_adapter('http://localhost:9047')._pool_maxsize == 3
+    assert configure_session(config) is session
+    set_session(None)
+
+
+class _CountingSession(object):
+    def __init__(self):
+        self.calls = 0
+        self._session = make_session()
+
+    def get(self, *args, **kwargs):
+        self.calls += 1
+        return self._session.get(*args, **kwargs)
+
+
+def test_endpoints_use_shared_session(requests_mock):
+    requests_mock.get('http://localhost:9047/api/v3/catalog', json={'data': []})
+    session = _CountingSession()
+    set_session(session)
+    assert catalog('1234', 'http://localhost:9047') == {'data': []}
+    assert catalog('1234', 'http://localhost:9047') == {'data': []}
+    assert session.calls == 2
+    assert configure_session(build_config()) is session
+    set_session(None)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2019 Ryan Murray.
+#
+# This file is part of Dremio Client
+# (see https://github.com/rymurr/dremio_client).
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+import sqlite3
+
+import pytest
+
+from dremio_client.model.catalog import catalog
+from dremio_client.model.store import CatalogStore, set_store
+
+_BASE = 'https://example.com/api/v3/catalog'
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CatalogStore(str(tmp_path / 'catalog.sqlite'))
+    set_store(store)
+    yield store
+    set_store(None)
+    store.close()
+
+
+def test_catalog_store(requests_mock, store):
+    listing = {'data': [{'id': 's1', 'path': ['sp'], 'tag': '0', 'type': 'CONTAINER', 'containerType': 'SPACE'}]}
+    space = {'entityType': 'space', 'id': 's1', 'name': 'sp', 'path': ['sp'], 'tag': '0', 'children': [
+        {'id': 'd1', 'path': ['sp', 'v'], 'tag': '1', 'type': 'DATASET'}]}
+    dataset = {'entityType': 'dataset', 'id': 'd1', 'path': ['sp', 'v'], 'tag': '1', 'type': 'VIRTUAL_DATASET'}
+    requests_mock.get(_BASE, json=listing)
+    requests_mock.get(_BASE + '/s1', json=space)
+    requests_mock.get(_BASE + '/d1', json=dataset)
+
+    def walk():
+        cat = catalog('12345', 'https://example.com', print, user='dremio')
+        return [i.meta.path for i in (cat.sp.get(), cat.sp.v.get())]
+
+    assert walk() == [['sp'], ['sp', 'v']]
+    assert requests_mock.call_count == 3
+    assert walk() == [['sp'], ['sp', 'v']]
+    assert requests_mock.call_count == 3
+
+    # past the staleness budget containers are refetched, datasets only if their tag changed
+    store.max_age = -1
+    walk()
+    assert [r.path for r in requests_mock.request_history[3:]] == ['/api/v3/catalog', '/api/v3/catalog/s1']
+    space['children'][0]['tag'] = '2'
+    requests_mock.get(_BASE + '/s1', json=space)
+    walk()
+    assert [r.path for r in requests_mock.request_history[5:]] == \
+        ['/api/v3/catalog', '/api/v3/catalog/s1', '/api/v3/catalog/d1']
+    assert store.get('https://example.com', path=['sp', 'v'], user='dremio')[0]['id'] == 'd1'
+
+    # another user does not see what dremio can
+    assert store.get('https://example.com', path=['sp', 'v']) is None
+    calls = requests_mock.call_count
+    store.max_age = 300
+    catalog('12345', 'https://example.com', print, user='other').sp.get()
+    assert requests_mock.call_count == calls + 2
+
+
+def test_older_store_is_replaced(tmp_path):
+    path = str(tmp_path / 'catalog.sqlite')
+    conn = sqlite3.connect(path)
+    conn.execute('create table entities (server text not null, id text not null, path text, tag text, '
+                 'fetched real not null, data text not null, primary key (server, id))')
+    conn.execute("insert into entities values ('s', 'd1', null, '1', 0, '{}')")
+    conn.commit()
+    conn.close()
+    store = CatalogStore(path)
+    try:
+        assert store.get('s', 'd1') is None
+        store.put('s', {'id': 'd1', 'path': ['sp', 'v'], 'tag': '2'}, user='dremio')
+        assert store.get('s', 'd1', user='dremio')[1] == '2'
+    finally:
+        store.close()